@@ -12,7 +12,19 @@ Requirements:
 - Input error handling:
   * If the target is not an integer, re-prompt the user until a valid integer is entered.
 - Perform a binary search to find the integer in the sorted list.
+- Provide a vectorized batch search API (via np.searchsorted) for searching many targets at once:
+  * Returns an array of indexes, with -1 for targets that were not found.
+  * Leftmost and rightmost variants for lists containing duplicates.
+  * Range count queries (how many values fall between a low and high value).
 - Repeat until the user decides to quit via CTRL+C.
+- Optionally build the sorted list once and persist it as a .npy index file (--index), which later runs open
+  via a read only memory map instead of generating and sorting the list again.
+- Allow selecting the sort algorithm (--sort): quick sort, merge sort or radix sort. Index files with more integers than
+  fit in memory (--sort_memory) are built with an external merge sort of sorted runs written to disk.
+- Allow selecting the search engine (--engine): the textbook loop, np.searchsorted or a cache friendly Eytzinger layout,
+  and benchmark them against each other (--benchmark).
+- The benchmark times one query per call (scalar) and batched lookups for configurable array sizes, hit ratios and
+  query distributions, reports queries per second and p50/p99 latency, and can write the results as JSON.
 - Output:
   * "Welcome to Binary Search Example!" on a newline.
   * "A random list of 20 integers from 1 to 1000 has been generated and sorted." on a newline.
@@ -26,11 +38,107 @@ Requirements:
   * If the choice is not found in the list via the binary search, display "FAILURE! Integer {user_choice} was NOT FOUND in the list."
 """
 
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+
 import numpy as np
 
+arg_defaults = {
+    "int_count": 20,
+    "min_value": 1,
+    "max_value": 1000,
+    "index": None,
+    "build": False,
+    "sort": "quicksort",
+    "sort_memory": 1 << 26,
+    "engine": "numpy",
+    "benchmark": False,
+    "benchmark_sizes": "1e3,1e4,1e5,1e6,1e7,1e8",
+    "benchmark_queries": 100000,
+    "benchmark_scalar_queries": 2000,
+    "benchmark_batch": 4096,
+    "hit_ratio": 0.5,
+    "distribution": "uniform",
+    "benchmark_output": None,
+}
+
+# Lists longer than this are summarised instead of printed in full
+PRINT_LIMIT = 100
+
+# Batched Eytzinger lookups walk the tree for this many targets at a time, so the per level temporaries stay in cache
+SEARCH_BLOCK = 1 << 15
+
+# The sort algorithms of the sort stage ('radix' only supports integers)
+SORT_ALGORITHMS = ["quicksort", "mergesort", "radix"]
+
+# The number of bits sorted by each pass of the radix sort
+RADIX_BITS = 16
+
+
+def binary_search_batch(arr, targets, side="left"):
+    """
+    Performs a vectorized binary search for many targets at once on a sorted array (via np.searchsorted).
+
+    :param arr: The sorted array to search.
+    :param targets: An array (or scalar) of values to search for.
+    :param side: 'left' returns the index of the first match, 'right' the index of the last match.
+    :return: An array of indexes with the same shape as targets, -1 where the target was not found.
+    """
+    arr = np.asarray(arr)
+    targets = np.asarray(targets)
+    if arr.size == 0:
+        return np.full(targets.shape, -1, dtype=np.intp)
+
+    indexes = np.searchsorted(arr, targets, side=side)
+    if side == "right":
+        # The insertion point is just after the last match
+        indexes = indexes - 1
+    in_range = (indexes >= 0) & (indexes < arr.size)
+
+    # Clip so out of range indexes can still be compared (they are masked out by in_range)
+    candidates = arr[np.clip(indexes, 0, arr.size - 1)]
+    return np.where(in_range & (candidates == targets), indexes, -1)
+
+
+def binary_search_leftmost(arr, targets):
+    """Returns the index of the first occurrence of each target in a sorted array (-1 if not found)."""
+    return binary_search_batch(arr, targets, side="left")
+
+
+def binary_search_rightmost(arr, targets):
+    """Returns the index of the last occurrence of each target in a sorted array (-1 if not found)."""
+    return binary_search_batch(arr, targets, side="right")
+
+
+def count_in_range(arr, low, high):
+    """
+    Counts the values of a sorted array that fall in the inclusive range low to high.
+    Low and high may be arrays to answer many range queries at once.
+
+    :return: The count (or an array of counts) of values with low <= value <= high.
+    """
+    arr = np.asarray(arr)
+    counts = np.searchsorted(arr, high, side="right") - np.searchsorted(
+        arr, low, side="left"
+    )
+    return np.maximum(counts, 0)
+
 
 def binary_search(arr, target):
-    """Performs binary search on a sorted array."""
+    """Performs binary search on a sorted array for a single target (returns the index of its first occurrence, or -1)."""
+    # Same result as binary_search_batch, without its array overhead which dominates a single lookup
+    index = int(np.searchsorted(arr, target))
+    if index < len(arr) and arr[index] == target:
+        return index
+    return -1
+
+
+def binary_search_loop(arr, target):
+    """Performs the textbook binary search loop on a sorted array (kept as a reference engine)."""
     low = 0
     high = len(arr) - 1
 
@@ -46,19 +154,612 @@ def binary_search(arr, target):
     return -1
 
 
-def main():
-    # Generate a random list of integers and sort it in ascending order
-    int_count = 20
-    min_value = 1
-    max_value = 1000
-    int_list = np.random.randint(min_value, max_value + 1, size=int_count)
-    sorted_int_list = np.sort(int_list)
+class EytzingerIndex:
+    """
+    A cache friendly search engine which lays the sorted values out in Eytzinger (breadth first) order:
+    the root is at index 1 and the children of node k are at 2k and 2k + 1.
+    The first levels of the tree are stored next to each other, so they stay in the CPU cache,
+    and each batch of lookups walks down the tree one level at a time for all targets together.
+    """
 
-    print("Welcome to Binary Search Example!\n")
+    def __init__(self, arr):
+        """
+        Builds the Eytzinger layout of a sorted array. The tree is padded to a perfect tree with sentinel values
+        larger than any other value, so every level is complete and the layout is a set of strided copies.
+
+        :param arr: The sorted array to index (it is kept to check matches).
+        """
+        self.sorted = np.asarray(arr)
+        self.size = self.sorted.size
+        self.height = int(self.size).bit_length()
+
+        full_size = (1 << self.height) - 1
+        if np.issubdtype(self.sorted.dtype, np.integer):
+            sentinel = np.iinfo(self.sorted.dtype).max
+        else:
+            sentinel = np.inf
+        padded = np.full(full_size, sentinel, dtype=self.sorted.dtype)
+        padded[: self.size] = self.sorted
+
+        # Index 0 is unused, so the children of node k are 2k and 2k + 1
+        self.layout = np.empty(full_size + 1, dtype=self.sorted.dtype)
+        for depth in range(self.height):
+            first = 1 << depth
+            # The in-order (sorted) positions of the nodes on this level are evenly spaced
+            step = 1 << (self.height - depth)
+            self.layout[first : 2 * first] = padded[step // 2 - 1 :: step]
+
+    def search(self, targets):
+        """
+        Searches for many targets at once.
+
+        :param targets: An array (or scalar) of values to search for.
+        :return: An array of indexes into the sorted array (first occurrence), -1 where the target was not found.
+        """
+        targets = np.asarray(targets)
+        if self.size == 0:
+            return np.full(targets.shape, -1, dtype=np.intp)
+
+        flat_targets = targets.ravel()
+        results = np.empty(flat_targets.size, dtype=np.intp)
+        for start in range(0, flat_targets.size, SEARCH_BLOCK):
+            end = start + SEARCH_BLOCK
+            results[start:end] = self.search_block(flat_targets[start:end])
+        return results.reshape(targets.shape)
+
+    def search_block(self, flat_targets):
+        """
+        Searches for a block of targets (a one dimensional array) by walking down the tree for all of them together.
+        """
+        nodes = np.ones(flat_targets.size, dtype=np.int64)
+        for _ in range(self.height):
+            # Branchless descent: go right while the node is smaller than the target
+            nodes = 2 * nodes + (self.layout[nodes] < flat_targets)
+
+        # The lower bound is the node where the path last went left, so drop the trailing right turns (1 bits)
+        lowest_zero = ~nodes & (nodes + 1)
+        nodes = nodes // (2 * lowest_zero)
+
+        # Convert the Eytzinger node back to its sorted position (node 0 means every value is smaller)
+        depth = np.frexp(np.maximum(nodes, 1).astype(np.float64))[1] - 1
+        positions = (2 * (nodes - (1 << depth)) + 1) * (1 << (self.height - 1 - depth)) - 1
+        positions = np.where(nodes == 0, self.size, positions)
+
+        in_range = positions < self.size
+        candidates = self.sorted[np.minimum(positions, self.size - 1)]
+        found = in_range & (candidates == flat_targets)
+        return np.where(found, positions, -1)
+
+
+def create_search_engine(name, sorted_arr):
+    """
+    Creates a function which searches the sorted array for a single target using the selected engine.
+
+    :param name: The engine name: 'loop' (textbook loop), 'numpy' (np.searchsorted) or 'eytzinger'.
+    :param sorted_arr: The sorted array to search.
+    :return: A function taking a target and returning its index, or -1 if not found.
+    """
+    if name == "loop":
+        return lambda target: binary_search_loop(sorted_arr, target)
+    if name == "eytzinger":
+        index = EytzingerIndex(sorted_arr)
+        return lambda target: int(index.search(target))
+    return lambda target: binary_search(sorted_arr, target)
+
+
+def generate_benchmark_queries(sorted_arr, query_count, hit_ratio, distribution, rng):
+    """
+    Generates benchmark queries for an array holding only even numbers, so misses can be made from odd numbers.
+
+    :param sorted_arr: The sorted array of even numbers being searched.
+    :param query_count: The number of queries.
+    :param hit_ratio: The fraction of queries (0 - 1) which are in the array.
+    :param distribution: 'uniform' (random positions), 'zipf' (a few hot positions get most queries)
+        or 'sequential' (ascending positions).
+    :param rng: The numpy random generator.
+    :return: An array of query values.
+    """
+    size = sorted_arr.size
+    if distribution == "zipf":
+        positions = (rng.zipf(1.2, size=query_count) - 1) % size
+    else:
+        positions = rng.integers(0, size, size=query_count)
+        if distribution == "sequential":
+            positions.sort()
+
+    queries = sorted_arr[positions].astype(np.int64)
+    misses = rng.random(query_count) >= hit_ratio
+    queries[misses] += 1
+    return queries
+
+
+def latency_percentiles(latencies):
+    """Returns the p50 and p99 of a list of latencies (in seconds) in microseconds."""
+    p50, p99 = np.percentile(np.asarray(latencies), [50, 99])
+    return float(p50 * 1e6), float(p99 * 1e6)
+
+
+def time_scalar_engine(search, queries):
+    """Times a search function which answers one query per call, returning the per call latencies."""
+    latencies = []
+    for query in queries.tolist():
+        started = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def time_batch_engine(search, queries, batch_size):
+    """Times a search function which answers a batch of queries per call, returning the per batch latencies and results."""
+    latencies = []
+    results = []
+    for start in range(0, queries.size, batch_size):
+        batch = queries[start : start + batch_size]
+        started = time.perf_counter()
+        results.append(search(batch))
+        latencies.append(time.perf_counter() - started)
+    return latencies, np.concatenate(results)
+
+
+def benchmark_size(size, query_count, scalar_query_count, batch_size, hit_ratio, distribution, rng):
+    """
+    Benchmarks every search engine on one random sorted array (see benchmark_engines) and prints a line per engine.
+
+    :return: The list of results (one per engine).
+    """
+    results = []
+    sorted_arr = np.sort(rng.integers(0, size, size=size)) * 2
+    queries = generate_benchmark_queries(
+        sorted_arr, query_count, hit_ratio, distribution, rng
+    )
+    scalar_queries = queries[:scalar_query_count]
+
+    started = time.perf_counter()
+    index = EytzingerIndex(sorted_arr)
+    build_seconds = time.perf_counter() - started
+
+    timings = {
+        "loop": (
+            time_scalar_engine(
+                lambda q: binary_search_loop(sorted_arr, q), scalar_queries
+            ),
+            scalar_queries.size,
+            "call",
+        ),
+        "scalar": (
+            time_scalar_engine(lambda q: binary_search(sorted_arr, q), scalar_queries),
+            scalar_queries.size,
+            "call",
+        ),
+    }
+    numpy_latencies, expected = time_batch_engine(
+        lambda batch: binary_search_batch(sorted_arr, batch), queries, batch_size
+    )
+    eytzinger_latencies, found = time_batch_engine(index.search, queries, batch_size)
+    if not np.array_equal(found, expected):
+        raise AssertionError(f"Eytzinger results differ from numpy for size {size}.")
+    timings["numpy"] = (numpy_latencies, queries.size, "batch")
+    timings["eytzinger"] = (eytzinger_latencies, queries.size, "batch")
+
+    for engine, (latencies, count, unit) in timings.items():
+        p50_us, p99_us = latency_percentiles(latencies)
+        qps = count / sum(latencies)
+        result = {
+            "size": size,
+            "engine": engine,
+            "queries": count,
+            "batch_size": batch_size if unit == "batch" else 1,
+            "hit_ratio": hit_ratio,
+            "distribution": distribution,
+            "queries_per_second": qps,
+            "p50_us": p50_us,
+            "p99_us": p99_us,
+            "latency_of": unit,
+        }
+        if engine == "eytzinger":
+            result["build_seconds"] = build_seconds
+        results.append(result)
+        print(
+            f"{size:>12} {engine:>10} {qps:>14,.0f} {p50_us:>10.2f} {p99_us:>10.2f}  {unit}"
+        )
+    return results
+
+
+def benchmark_engines(
+    sizes,
+    query_count=100000,
+    scalar_query_count=2000,
+    batch_size=4096,
+    hit_ratio=0.5,
+    distribution="uniform",
+    output_path=None,
+):
+    """
+    Compares the search engines on random sorted arrays of the given sizes, printing the queries per second
+    and the p50/p99 latencies of each engine, and optionally writing the results as JSON to track regressions.
+    The engines are:
+        loop: The textbook loop, one query per call.
+        scalar: binary_search (np.searchsorted), one query per call.
+        numpy: binary_search_batch (np.searchsorted), one batch of queries per call.
+        eytzinger: EytzingerIndex.search, one batch of queries per call.
+    Scalar engines are timed on fewer queries since they are far slower, and their latency is per call,
+    while the latency of the batched engines is per batch of batch_size queries.
+
+    :param sizes: The array sizes to benchmark.
+    :param query_count: The number of queries for batched engines per size.
+    :param scalar_query_count: The number of queries for scalar engines per size.
+    :param batch_size: The number of queries per call for batched engines.
+    :param hit_ratio: The fraction of queries which are found.
+    :param distribution: The query distribution (see generate_benchmark_queries).
+    :param output_path: Where to write the JSON results, or None.
+    :return: The list of results.
+    """
+    rng = np.random.default_rng()
+    results = []
     print(
-        f"A random list of {int_count} integers from {min_value} to {max_value} has been generated and sorted."
+        f"Queries: {query_count} batched ({batch_size} per batch), {scalar_query_count} scalar, "
+        f"hit ratio {hit_ratio}, {distribution} distribution\n"
     )
-    print("Sorted List: " + ", ".join(map(str, sorted_int_list)))
+    print(
+        f"{'size':>12} {'engine':>10} {'queries/s':>14} {'p50 us':>10} {'p99 us':>10}  latency of"
+    )
+    for size in sizes:
+        # The arrays of one size are only referenced inside the helper, so they are freed before the next size
+        results.extend(
+            benchmark_size(size, query_count, scalar_query_count, batch_size, hit_ratio, distribution, rng)
+        )
+
+    if output_path:
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "results": results,
+        }
+        with open(output_path, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+        print(f"\nBenchmark results written to '{output_path}'.")
+    return results
+
+
+def radix_sort(arr):
+    """
+    Sorts an integer array with an LSD radix sort, RADIX_BITS bits per pass.
+    Each pass is a stable counting sort of one digit (np.argsort uses a counting sort for stable sorts of 16 bit keys).
+
+    :param arr: The integer array to sort.
+    :return: A sorted copy of the array.
+    """
+    arr = np.asarray(arr)
+    if not np.issubdtype(arr.dtype, np.integer):
+        raise ValueError("Radix sort only supports integer arrays.")
+
+    bits = arr.dtype.itemsize * 8
+    unsigned_dtype = np.dtype(f"u{arr.dtype.itemsize}")
+    keys = arr.view(unsigned_dtype)
+    if np.issubdtype(arr.dtype, np.signedinteger):
+        # Flip the sign bit so negative numbers sort before positive ones
+        sign_bit = unsigned_dtype.type(1 << (bits - 1))
+        keys = keys ^ sign_bit
+
+    digit_mask = (1 << min(RADIX_BITS, bits)) - 1
+    for shift in range(0, bits, RADIX_BITS):
+        digits = ((keys >> shift) & digit_mask).astype(np.uint16)
+        keys = keys[np.argsort(digits, kind="stable")]
+
+    if np.issubdtype(arr.dtype, np.signedinteger):
+        keys = keys ^ sign_bit
+    return keys.view(arr.dtype)
+
+
+def sort_array(arr, algorithm="quicksort"):
+    """
+    Sorts an array in ascending order with the selected algorithm.
+
+    :param arr: The array to sort.
+    :param algorithm: One of SORT_ALGORITHMS.
+    :return: A sorted copy of the array.
+    """
+    if algorithm == "radix":
+        return radix_sort(arr)
+    if algorithm == "mergesort":
+        return np.sort(arr, kind="stable")
+    return np.sort(arr, kind="quicksort")
+
+
+def generate_sorted_array(int_count, min_value, max_value, sort_algorithm="quicksort"):
+    """Generates a random list of integers and sorts it in ascending order."""
+    int_list = np.random.randint(min_value, max_value + 1, size=int_count)
+    return sort_array(int_list, sort_algorithm)
+
+
+def index_dtype(min_value, max_value):
+    """Returns the smallest integer dtype which holds every value from min_value to max_value."""
+    return np.result_type(np.min_scalar_type(min_value), np.min_scalar_type(max_value))
+
+
+def merge_runs(run_paths, out, merge_block):
+    """
+    Merges sorted run files into an output array with a k-way block merge.
+    A block is read from every run, everything up to the smallest last value of those blocks is known to come next
+    in the output, so it is sorted and written out and each run advances past its part. Only k blocks are in memory.
+
+    :param run_paths: The sorted .npy run files.
+    :param out: The output array (e.g. a memory-mapped index) with room for every value of every run.
+    :param merge_block: The number of values read from each run at a time.
+    """
+    runs = [np.load(path, mmap_mode="r") for path in run_paths]
+    positions = [0] * len(runs)
+    written = 0
+    while True:
+        blocks = []
+        for i, run in enumerate(runs):
+            if positions[i] < run.size:
+                blocks.append((i, run[positions[i] : positions[i] + merge_block]))
+        if not blocks:
+            break
+
+        bound = min(block[-1] for _, block in blocks)
+        parts = []
+        for i, block in blocks:
+            take = int(np.searchsorted(block, bound, side="right"))
+            parts.append(block[:take])
+            positions[i] += take
+
+        # The parts are already sorted runs, which the stable sort merges in close to linear time
+        merged = np.sort(np.concatenate(parts), kind="stable")
+        out[written : written + merged.size] = merged
+        written += merged.size
+
+
+def build_index_file(
+    path,
+    int_count,
+    min_value,
+    max_value,
+    sort_algorithm="quicksort",
+    sort_memory=1 << 26,
+):
+    """
+    Builds a sorted array of random integers once and persists it as a .npy index file
+    (a raw array with a small header describing its dtype and shape), so later runs can memory-map it instead.
+    If there are more integers than fit in sort_memory, an external merge sort is used: sorted runs of sort_memory
+    integers are written to disk and then k-way merged into the memory-mapped index.
+
+    :param path: The index file to write.
+    :param int_count: The number of integers to generate.
+    :param min_value: The smallest possible integer.
+    :param max_value: The largest possible integer.
+    :param sort_algorithm: The algorithm used to sort in memory (one of SORT_ALGORITHMS).
+    :param sort_memory: The most integers sorted in memory at once.
+    """
+    dtype = index_dtype(min_value, max_value)
+    rng = np.random.default_rng()
+    tmp_path = path + ".tmp"
+
+    if int_count <= sort_memory:
+        values = rng.integers(min_value, max_value, size=int_count, dtype=dtype, endpoint=True)
+        with open(tmp_path, "wb") as index_file:
+            np.save(index_file, sort_array(values, sort_algorithm))
+    else:
+        index_dir = os.path.dirname(os.path.abspath(path))
+        with tempfile.TemporaryDirectory(prefix="sort-runs-", dir=index_dir) as run_dir:
+            run_paths = []
+            for start in range(0, int_count, sort_memory):
+                count = min(sort_memory, int_count - start)
+                values = rng.integers(min_value, max_value, size=count, dtype=dtype, endpoint=True)
+                run_path = os.path.join(run_dir, f"run-{len(run_paths)}.npy")
+                with open(run_path, "wb") as run_file:
+                    np.save(run_file, sort_array(values, sort_algorithm))
+                run_paths.append(run_path)
+                del values
+
+            index = np.lib.format.open_memmap(
+                tmp_path, mode="w+", dtype=dtype, shape=(int_count,)
+            )
+            merge_runs(run_paths, index, max(1 << 16, sort_memory // (2 * len(run_paths))))
+            index.flush()
+            del index
+
+    # Only replace the index once it is complete, so a crash never leaves a half built index behind
+    os.replace(tmp_path, path)
+
+
+def open_index_file(path):
+    """
+    Opens a sorted .npy index file as a read only memory map. Nothing is read up front, only the pages touched
+    by a search are loaded, and the OS page cache is shared between every process using the same index.
+
+    :param path: The index file to open.
+    :return: The memory-mapped sorted array.
+    """
+    index = np.load(path, mmap_mode="r")
+    if index.ndim != 1 or not np.issubdtype(index.dtype, np.integer):
+        raise ValueError(
+            f"Index file '{path}' must hold a one dimensional array of integers."
+        )
+    return index
+
+
+def format_sorted_list(sorted_int_list):
+    """Formats the sorted list for output, summarising it if it is too long to print in full."""
+    if len(sorted_int_list) <= PRINT_LIMIT:
+        return ", ".join(map(str, sorted_int_list))
+    head = ", ".join(map(str, sorted_int_list[:5]))
+    tail = ", ".join(map(str, sorted_int_list[-5:]))
+    return f"{head}, ... ({len(sorted_int_list) - 10} more) ..., {tail}"
+
+
+def create_arg_parser() -> argparse.ArgumentParser:
+    """
+    Creates and returns the argument parser for command-line arguments.
+
+    Returns:
+        argparse.ArgumentParser: The argument parser.
+    """
+    parser = argparse.ArgumentParser(
+        description="Binary search a sorted list of random integers."
+    )
+    parser.add_argument(
+        "--int_count",
+        type=int,
+        help=f"The number of random integers to generate. Default is {arg_defaults['int_count']}.",
+        default=arg_defaults["int_count"],
+    )
+    parser.add_argument(
+        "--min_value",
+        type=int,
+        help=f"The smallest random integer. Default is {arg_defaults['min_value']}.",
+        default=arg_defaults["min_value"],
+    )
+    parser.add_argument(
+        "--max_value",
+        type=int,
+        help=f"The largest random integer. Default is {arg_defaults['max_value']}.",
+        default=arg_defaults["max_value"],
+    )
+    parser.add_argument(
+        "--index",
+        help="A .npy index file holding the sorted list. It is built once if it does not exist, then memory-mapped on every start.",
+        default=arg_defaults["index"],
+    )
+    parser.add_argument(
+        "--build",
+        action="store_true",
+        help="Rebuild the index file even if it already exists.",
+        default=arg_defaults["build"],
+    )
+    parser.add_argument(
+        "--sort",
+        choices=SORT_ALGORITHMS,
+        help=f"The sort algorithm ('radix' is an LSD radix sort for integers). Default is '{arg_defaults['sort']}'.",
+        default=arg_defaults["sort"],
+    )
+    parser.add_argument(
+        "--sort_memory",
+        type=int,
+        help=f"The most integers sorted in memory at once. Larger index files are built with an external merge sort. Default is {arg_defaults['sort_memory']}.",
+        default=arg_defaults["sort_memory"],
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["loop", "numpy", "eytzinger"],
+        help=f"The search engine: the textbook loop, np.searchsorted or a cache friendly Eytzinger layout. Default is '{arg_defaults['engine']}'.",
+        default=arg_defaults["engine"],
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="Benchmark the search engines instead of searching interactively.",
+        default=arg_defaults["benchmark"],
+    )
+    parser.add_argument(
+        "--benchmark_sizes",
+        help=f"Comma separated array sizes to benchmark. Default is '{arg_defaults['benchmark_sizes']}'.",
+        default=arg_defaults["benchmark_sizes"],
+    )
+    parser.add_argument(
+        "--benchmark_queries",
+        type=int,
+        help=f"The number of queries per size for the batched engines. Default is {arg_defaults['benchmark_queries']}.",
+        default=arg_defaults["benchmark_queries"],
+    )
+    parser.add_argument(
+        "--benchmark_scalar_queries",
+        type=int,
+        help=f"The number of queries per size for the one query per call engines. Default is {arg_defaults['benchmark_scalar_queries']}.",
+        default=arg_defaults["benchmark_scalar_queries"],
+    )
+    parser.add_argument(
+        "--benchmark_batch",
+        type=int,
+        help=f"The number of queries per call for the batched engines. Default is {arg_defaults['benchmark_batch']}.",
+        default=arg_defaults["benchmark_batch"],
+    )
+    parser.add_argument(
+        "--hit_ratio",
+        type=float,
+        help=f"The fraction (0 - 1) of benchmark queries which are found. Default is {arg_defaults['hit_ratio']}.",
+        default=arg_defaults["hit_ratio"],
+    )
+    parser.add_argument(
+        "--distribution",
+        choices=["uniform", "zipf", "sequential"],
+        help=f"The benchmark query distribution. Default is '{arg_defaults['distribution']}'.",
+        default=arg_defaults["distribution"],
+    )
+    parser.add_argument(
+        "--benchmark_output",
+        help="Write the benchmark results as JSON to this file (to track regressions between versions).",
+        default=arg_defaults["benchmark_output"],
+    )
+    return parser
+
+
+def main():
+    args = create_arg_parser().parse_args()
+    int_count = args.int_count
+    min_value = args.min_value
+    max_value = args.max_value
+
+    print("Welcome to Binary Search Example!\n")
+
+    if args.benchmark:
+        try:
+            sizes = [int(float(size)) for size in args.benchmark_sizes.split(",")]
+        except ValueError:
+            print(f"Invalid benchmark sizes: {args.benchmark_sizes}")
+            return
+        benchmark_engines(
+            sizes,
+            args.benchmark_queries,
+            args.benchmark_scalar_queries,
+            max(1, args.benchmark_batch),
+            args.hit_ratio,
+            args.distribution,
+            args.benchmark_output,
+        )
+        return
+
+    if args.index:
+        if args.build or not os.path.exists(args.index):
+            print(f"Building index file '{args.index}'...")
+            try:
+                build_index_file(
+                    args.index,
+                    int_count,
+                    min_value,
+                    max_value,
+                    args.sort,
+                    args.sort_memory,
+                )
+            except (OSError, ValueError) as e:
+                print(f"Failed to build index file: {e}")
+                return
+        try:
+            sorted_int_list = open_index_file(args.index)
+        except (OSError, ValueError) as e:
+            print(f"Failed to open index file: {e}")
+            return
+        int_count = len(sorted_int_list)
+        if int_count:
+            min_value = int(sorted_int_list[0])
+            max_value = int(sorted_int_list[-1])
+        print(
+            f"A sorted list of {int_count} integers from {min_value} to {max_value} has been memory-mapped from '{args.index}'."
+        )
+    else:
+        # Generate a random list of integers and sort it in ascending order
+        sorted_int_list = generate_sorted_array(
+            int_count, min_value, max_value, args.sort
+        )
+        print(
+            f"A random list of {int_count} integers from {min_value} to {max_value} has been generated and sorted."
+        )
+    print("Sorted List: " + format_sorted_list(sorted_int_list))
+    search = create_search_engine(args.engine, sorted_int_list)
+    print(f"Search engine: {args.engine}")
     print("\nPress CTRL+C to quit.")
 
     while True:
@@ -74,7 +775,7 @@ def main():
                 continue
 
             # Perform binary search
-            result = binary_search(sorted_int_list, user_choice)
+            result = search(user_choice)
 
             if result != -1:
                 print(f"SUCCESS! Integer {user_choice} was FOUND at index {result}.")
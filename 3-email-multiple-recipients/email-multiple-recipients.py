@@ -11,20 +11,109 @@ Requirements:
 - Input validation:
   * Ensure that required email properties are present and non-empty after resolving the configuration.
   * Ensure that all email addresses are in a valid format.
+  * Validate whole recipient lists in one call with one precompiled pattern, normalizing the addresses (lower-case domain),
+    dropping duplicates and caching the domain checks, including optional domain allow and deny lists.
 - Input error handling:
   * If any required property is missing or empty, display an error message and do not attempt to send the email.
-  * If any email address is invalid, display an error message and do not attempt to send the email.
+  * If any email address is invalid, display an error message for every invalid address and do not attempt to send the email.
+- Bulk mail merge mode (--recipients):
+  * Send a personalized message to every recipient of a CSV or JSON lines file, filling {field} placeholders in a template.
+  * Keep a pool of authenticated SMTP connections open and reuse them across messages, replacing a connection after a
+    maximum number of messages or when it fails (the message is then retried on a new connection).
+  * Report the number of messages sent and failed, and the messages per second.
+  * Optionally send over asyncio SMTP connections (--async) with a token bucket rate limit, per domain concurrency caps
+    and exponential backoff of temporary (4xx) failures, so one slow relay does not stall the whole run.
+- Recipient batching (--batch_size):
+  * Split large recipient lists into envelopes of at most --batch_size recipients (servers limit the RCPT commands per
+    message), serialize the message once and send the batches over a pool of connections.
+  * Report the refused recipients of each batch instead of failing the whole list.
+- Durable spool (--spool):
+  * Messages are written to an SQLite spool before they are sent, with the delivery state of every recipient.
+  * The spool is drained with exponential backoff of temporary failures (e.g. the SMTP server being down), so a run which
+    is interrupted or can not reach the server is resumed by running it again, without sending a message twice.
+  * Spooled messages are keyed by a digest of their content and recipients, so only a changed message is spooled again.
+  * Temporary failures are retried for hours (capped exponential backoff) and --retry_failed requeues failed recipients.
+- Instrumentation (--metrics) and load testing (--load_test):
+  * Time every SMTP phase (connect, STARTTLS, login, MAIL, RCPT, DATA) and write the timings as JSON lines or a
+    Prometheus text dump.
+  * Start a local aiosmtpd sink and drive the sender at a target rate, reporting the throughput and the latency
+    percentiles for the chosen concurrency and batch settings.
 - Output:
   * "Email sent successfully to {to_addresses} with CC to {cc_addresses} and BCC to {bcc_addresses}." on a newline upon successful sending.
   * "Failed to send email: {error_message}" on a newline if there is an error during sending.
 """
 
+import argparse
+import asyncio
+import base64
+import contextlib
+import csv
+import hashlib
 import json
 import os
+import queue
+import random
 import re
 import smtplib
+import socket
+import sqlite3
+import ssl
+import string
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from email.mime.text import MIMEText
-from email.utils import formataddr
+from email.utils import formataddr, make_msgid
+
+arg_defaults = {
+    "recipients": None,
+    "template": None,
+    "pool_size": 4,
+    "max_per_connection": 100,
+    "retries": 2,
+    "use_async": False,
+    "rate": 0.0,
+    "per_domain": 2,
+    "backoff": 5.0,
+    "spool": None,
+    "drain": False,
+    "max_attempts": 25,
+    "retry_failed": False,
+    "batch_size": 100,
+    "allow_domains": None,
+    "deny_domains": None,
+    "metrics": None,
+    "metrics_format": "jsonl",
+    "load_test": False,
+    "load_messages": 1000,
+    "load_rate": 200.0,
+}
+
+# The upper bounds (in seconds) of the SMTP phase duration histogram buckets in the Prometheus metrics
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# The number of spooled messages written per transaction when spooling a mail merge
+SPOOL_COMMIT_INTERVAL = 1000
+
+# The longest delay (in seconds) between retries of a message which got a temporary (4xx) failure.
+# With the default --backoff and --max_attempts a spooled message is retried for about four hours.
+MAX_BACKOFF = 900.0
+
+# The longest wait (in seconds) for the SMTP server to accept a connection or reply to a command
+SMTP_TIMEOUT = 30.0
+
+# One precompiled pattern for every address: a local part and a dotted domain, without whitespace or a second '@'
+EMAIL_REGEX = re.compile(r"([^@\s]+)@([^@\s]+\.[^@\s]+)")
+DOMAIN_LABEL_REGEX = re.compile(r"(?!-)[a-z0-9-]{1,63}(?<!-)")
+
+# Errors after which an SMTP connection can not be reused, so it is replaced and the message retried
+CONNECTION_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    smtplib.SMTPConnectError,
+    smtplib.SMTPHeloError,
+    ConnectionError,
+    TimeoutError,
+)
 
 
 def read_config():
@@ -62,6 +151,93 @@ def read_config():
     return ret_val
 
 
+def read_domain_list(path):
+    """Reads a domain allow or deny list: one domain per line, blank lines and # comments are skipped."""
+    with open(path, "r", encoding="utf-8") as domains_file:
+        lines = (line.split("#", 1)[0].strip().lower() for line in domains_file)
+        return {line for line in lines if line}
+
+
+class AddressValidator:
+    """
+    Validates and normalizes email addresses with one precompiled pattern.
+    The domain checks (syntax, allow and deny lists) are cached per domain, since large recipient lists share few
+    domains. A listed domain also matches its subdomains.
+    """
+
+    def __init__(self, allow_domains=None, deny_domains=None):
+        """
+        :param allow_domains: If given, only addresses in these domains are valid.
+        :param deny_domains: Addresses in these domains are invalid.
+        """
+        self.allow_domains = allow_domains
+        self.deny_domains = deny_domains or set()
+        self.domain_errors = {}
+
+    @staticmethod
+    def listed(domain, domains):
+        """Checks whether the domain or one of its parent domains is in the list."""
+        labels = domain.split(".")
+        return any(".".join(labels[i:]) in domains for i in range(len(labels)))
+
+    def domain_error(self, domain):
+        """Returns why addresses in the domain are invalid, or None if they are valid."""
+        if domain in self.domain_errors:
+            return self.domain_errors[domain]
+        error = None
+        try:
+            labels = domain.encode("idna").decode("ascii").split(".")
+        except UnicodeError:
+            labels = None
+        if not labels or len(domain) > 253 or not all(DOMAIN_LABEL_REGEX.fullmatch(label) for label in labels):
+            error = "invalid domain"
+        elif self.listed(domain, self.deny_domains):
+            error = "denied domain"
+        elif self.allow_domains is not None and not self.listed(domain, self.allow_domains):
+            error = "domain not allowed"
+        self.domain_errors[domain] = error
+        return error
+
+    def check(self, address):
+        """
+        Validates and normalizes one address (surrounding whitespace removed, domain lower-cased).
+
+        :return: Tuple (normalized_address, None) if valid, otherwise (address, reason).
+        """
+        address = (address or "").strip()
+        match = EMAIL_REGEX.fullmatch(address)
+        if match is None:
+            return address, "invalid format"
+        local_part, domain = match.groups()
+        if len(local_part) > 64:
+            return address, "local part too long"
+        domain = domain.lower()
+        error = self.domain_error(domain)
+        if error is not None:
+            return address, error
+        return f"{local_part}@{domain}", None
+
+    def validate(self, addresses):
+        """
+        Validates a whole list of addresses in one call.
+
+        :return: Tuple (valid_addresses, invalid_addresses): the valid addresses normalized and without duplicates
+                 (compared case-insensitively, like mailbox providers do, in their original order), and every invalid
+                 address as an (address, reason) tuple.
+        """
+        valid = []
+        invalid = []
+        seen = set()
+        for address in addresses:
+            normalized, error = self.check(address)
+            if error is not None:
+                invalid.append((address, error))
+            elif normalized.lower() not in seen:
+                seen.add(normalized.lower())
+                valid.append(normalized)
+        return valid, invalid
+
+
 def validate_email_address(address):
     """
     Validates the format of an email address.
@@ -69,8 +245,7 @@ def validate_email_address(address):
     :param address: The email address to validate.
     :return: True if valid, False otherwise.
     """
-    email_regex = r"[^@]+@[^@]+\.[^@]+"
-    return re.match(email_regex, address) is not None
+    return address_validator.check(address)[1] is None
 
 
 def validate_email_address_list(addresses):
@@ -78,14 +253,18 @@ def validate_email_address_list(addresses):
     Validates a list of email addresses.
 
     :param addresses: List of email addresses to validate.
-    :return: Tuple (True, None) if all are valid, otherwise (False, invalid_address).
+    :return: Tuple (True, None) if all are valid, otherwise (False, invalid_addresses) with every invalid address.
     """
-    for address in addresses:
-        if not validate_email_address(address):
-            return False, address
+    _, invalid = address_validator.validate(addresses)
+    if invalid:
+        return False, [address for address, _ in invalid]
     return True, None
 
 
+# The validator of the sender and of single addresses, shared so its per domain cache is reused
+address_validator = AddressValidator()
+
+
 def validate_required_email_props(props):
     """
     Validates that all required email properties are present and non-empty.
@@ -107,20 +286,1492 @@ def validate_required_email_props(props):
     return True, None
 
 
-def main():
-    config = read_config()
-    print(f"Configuration loaded:{config}\n")
+def percentile(sorted_values, fraction):
+    """Returns the value at a fraction (0 to 1) of a sorted list (nearest rank), or 0.0 for an empty list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class SMTPMetrics:
+    """
+    Records the duration of every SMTP phase (connect, starttls, login, mail, rcpt, data) of the sending paths.
+    Each phase is optionally streamed as a JSON line as it completes, and the totals can be dumped in the Prometheus
+    text format (a histogram per phase) or summarized with percentiles. Safe to use from several threads.
+    """
+
+    def __init__(self, events_file=None):
+        """:param events_file: A text file to write a JSON line per timed phase to, or None."""
+        self.events_file = events_file
+        self.lock = threading.Lock()
+        self.durations = {}
+        self.errors = {}
+
+    @contextlib.contextmanager
+    def time(self, phase):
+        """Times the enclosed block as one occurrence of the phase (an exception counts as an error)."""
+        started = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(phase, time.perf_counter() - started, ok)
+
+    def record(self, phase, seconds, ok=True):
+        with self.lock:
+            self.durations.setdefault(phase, []).append(seconds)
+            if not ok:
+                self.errors[phase] = self.errors.get(phase, 0) + 1
+            if self.events_file is not None:
+                event = {"time": time.time(), "phase": phase, "seconds": round(seconds, 6), "ok": ok}
+                self.events_file.write(json.dumps(event) + "\n")
+
+    def summary(self):
+        """Returns {phase: {count, errors, total, p50, p90, p99, max}} with the durations in seconds."""
+        with self.lock:
+            phases = {phase: sorted(durations) for phase, durations in self.durations.items()}
+            errors = dict(self.errors)
+        return {
+            phase: {
+                "count": len(durations),
+                "errors": errors.get(phase, 0),
+                "total": sum(durations),
+                "p50": percentile(durations, 0.50),
+                "p90": percentile(durations, 0.90),
+                "p99": percentile(durations, 0.99),
+                "max": durations[-1],
+            }
+            for phase, durations in phases.items()
+        }
+
+    def prometheus_text(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        with self.lock:
+            phases = {phase: list(durations) for phase, durations in self.durations.items()}
+            errors = dict(self.errors)
+        lines = [
+            "# HELP smtp_phase_duration_seconds Duration of the SMTP phases.",
+            "# TYPE smtp_phase_duration_seconds histogram",
+        ]
+        for phase, durations in sorted(phases.items()):
+            for bucket in METRICS_BUCKETS:
+                count = sum(1 for duration in durations if duration <= bucket)
+                lines.append(f'smtp_phase_duration_seconds_bucket{{phase="{phase}",le="{bucket}"}} {count}')
+            lines.append(f'smtp_phase_duration_seconds_bucket{{phase="{phase}",le="+Inf"}} {len(durations)}')
+            lines.append(f'smtp_phase_duration_seconds_sum{{phase="{phase}"}} {sum(durations):.6f}')
+            lines.append(f'smtp_phase_duration_seconds_count{{phase="{phase}"}} {len(durations)}')
+        lines.append("# HELP smtp_phase_errors_total SMTP phases which failed.")
+        lines.append("# TYPE smtp_phase_errors_total counter")
+        for phase in sorted(phases):
+            lines.append(f'smtp_phase_errors_total{{phase="{phase}"}} {errors.get(phase, 0)}')
+        return "\n".join(lines) + "\n"
+
+
+def timed(metrics, phase):
+    """Returns a context manager timing a phase, or doing nothing without metrics."""
+    return metrics.time(phase) if metrics is not None else contextlib.nullcontext()
+
+
+class InstrumentedSMTP(smtplib.SMTP):
+    """An smtplib.SMTP which times every SMTP phase, including the ones sendmail runs, in an SMTPMetrics."""
+
+    def __init__(self, host, port, metrics, timeout=SMTP_TIMEOUT):
+        self.metrics = metrics
+        super().__init__(host, port, timeout=timeout)
+
+    def connect(self, *args, **kwargs):
+        with self.metrics.time("connect"):
+            return super().connect(*args, **kwargs)
+
+    def starttls(self, *args, **kwargs):
+        with self.metrics.time("starttls"):
+            return super().starttls(*args, **kwargs)
+
+    def login(self, *args, **kwargs):
+        with self.metrics.time("login"):
+            return super().login(*args, **kwargs)
+
+    def mail(self, *args, **kwargs):
+        with self.metrics.time("mail"):
+            return super().mail(*args, **kwargs)
+
+    def rcpt(self, *args, **kwargs):
+        with self.metrics.time("rcpt"):
+            return super().rcpt(*args, **kwargs)
+
+    def data(self, *args, **kwargs):
+        with self.metrics.time("data"):
+            return super().data(*args, **kwargs)
+
+
+def open_smtp_connection(config, metrics=None):
+    """
+    Opens an SMTP connection, upgrading it to TLS and logging in as configured.
+
+    :param config: Dictionary of email properties (see read_config).
+    :param metrics: An SMTPMetrics to time the SMTP phases in, or None.
+    :return: The connected smtplib.SMTP instance.
+    """
+    if metrics is not None:
+        server = InstrumentedSMTP(config["smtp_server"], int(config["smtp_port"]), metrics, timeout=SMTP_TIMEOUT)
+    else:
+        server = smtplib.SMTP(config["smtp_server"], int(config["smtp_port"]), timeout=SMTP_TIMEOUT)
+    try:
+        if config.get("use_tls", True):
+            server.starttls()
+        if config["smtp_username"] and config["smtp_password"]:
+            server.login(config["smtp_username"], config["smtp_password"])
+    except BaseException:
+        server.close()
+        raise
+    return server
+
+
+class SMTPConnectionPool:
+    """
+    A pool of authenticated SMTP connections which are reused across messages, so the connect, STARTTLS and login
+    round trips are paid once per connection instead of once per message.
+    Connections are opened lazily, replaced after max_messages_per_connection messages (servers often limit this)
+    and replaced when they fail.
+    """
+
+    def __init__(self, config, size=4, max_messages_per_connection=100, metrics=None):
+        """
+        :param config: Dictionary of email properties (see read_config).
+        :param size: The most connections open at once.
+        :param max_messages_per_connection: The number of messages sent on a connection before it is replaced.
+        :param metrics: An SMTPMetrics to time the SMTP phases in, or None.
+        """
+        self.config = config
+        self.metrics = metrics
+        self.size = size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.slots = queue.Queue()
+        for _ in range(size):
+            self.slots.put({"server": None, "sent": 0})
+
+    def reset(self, slot):
+        """Closes the connection of a slot (if any), so the next message opens a new one."""
+        server = slot["server"]
+        slot["server"] = None
+        slot["sent"] = 0
+        if server is not None:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+
+    def send(self, from_address, recipients, message, retries=2):
+        """
+        Sends a message on a pooled connection, reconnecting and retrying if the connection fails.
+
+        :param from_address: The envelope sender.
+        :param recipients: The envelope recipients.
+        :param message: The serialized message (str or bytes).
+        :param retries: The number of times a message is retried on a new connection.
+        :return: A dictionary of refused recipients (empty if all were accepted), as returned by smtplib's sendmail.
+        """
+        last_error = None
+        for _ in range(retries + 1):
+            slot = self.slots.get()
+            try:
+                if (
+                    slot["server"] is None
+                    or slot["sent"] >= self.max_messages_per_connection
+                ):
+                    self.reset(slot)
+                    slot["server"] = open_smtp_connection(self.config, self.metrics)
+                refused = slot["server"].sendmail(from_address, recipients, message)
+                slot["sent"] += 1
+                return refused
+            except CONNECTION_ERRORS as e:
+                self.reset(slot)
+                last_error = e
+            finally:
+                self.slots.put(slot)
+        raise last_error
+
+    def close(self):
+        """Closes every open connection."""
+        while not self.slots.empty():
+            self.reset(self.slots.get())
+
+
+def chunk_recipients(recipients, batch_size):
+    """Splits the envelope recipients into batches of at most batch_size recipients."""
+    return [recipients[i : i + batch_size] for i in range(0, len(recipients), batch_size)]
+
+
+def send_in_batches(pool, from_address, recipients, message, batch_size, retries=2):
+    """
+    Sends one message to a large recipient list in envelopes of at most batch_size recipients, concurrently over a pool
+    of SMTP connections. The message is serialized once by the caller and the same bytes are sent in every envelope.
+
+    :param pool: The SMTPConnectionPool (one sending thread per connection).
+    :param message: The serialized message (bytes).
+    :return: List of (batch, result) tuples in batch order, where result is the dictionary of refused recipients
+             (empty if all were accepted) or the exception which failed the whole batch.
+    """
+    batches = chunk_recipients(recipients, batch_size)
+    results = [None] * len(batches)
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        futures = {
+            executor.submit(pool.send, from_address, batch, message, retries): index
+            for index, batch in enumerate(batches)
+        }
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                results[futures[future]] = e
+    return list(zip(batches, results))
+
+
+def read_valid_recipients(path, validator, on_invalid):
+    """
+    Reads the mail merge recipients, validating and normalizing their addresses and skipping duplicates.
+
+    :param path: The .csv or .jsonl file (see read_recipients).
+    :param validator: The AddressValidator.
+    :param on_invalid: Called with (line_number, email_address, error) for every skipped recipient.
+    :return: A generator of (line_number, email_address, recipient) tuples.
+    """
+    seen = set()
+    for line_number, recipient in enumerate(read_recipients(path), start=1):
+        email_address, error = validator.check(recipient.get("email"))
+        if error is not None:
+            on_invalid(line_number, email_address, f"Invalid recipient email address: {email_address} ({error})")
+        elif email_address.lower() in seen:
+            on_invalid(line_number, email_address, "Duplicate recipient, skipped")
+        else:
+            seen.add(email_address.lower())
+            yield line_number, email_address, recipient
+
+
+def read_recipients(path):
+    """
+    Reads mail merge recipients from a CSV file (with a header row) or a JSON lines file, one recipient at a time.
+    Each recipient must have an 'email' field, the other fields can be used as placeholders in the template.
+
+    :param path: The .csv or .jsonl file.
+    :return: A generator of recipient dictionaries.
+    """
+    with open(path, "r", newline="", encoding="utf-8") as recipients_file:
+        if path.lower().endswith((".jsonl", ".json")):
+            for line in recipients_file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(recipients_file)
+
+
+def read_template(path, config):
+    """
+    Reads the mail merge template. The file starts with a 'Subject: ...' line, then a blank line, then the body.
+    Without a template file the subject and body from the configuration are used as the template.
+
+    :return: Tuple (subject_template, body_template).
+    """
+    if not path:
+        return config["subject"], config["body"]
+    with open(path, "r", encoding="utf-8") as template_file:
+        first_line = template_file.readline()
+        body = template_file.read()
+    if not first_line.lower().startswith("subject:"):
+        raise ValueError("The template must start with a 'Subject: ...' line.")
+    return first_line[len("subject:") :].strip(), body.lstrip("\n")
+
+
+def compile_template(template):
+    """
+    Parses a str.format style template once so it can be rendered for every recipient without parsing it again.
+
+    :return: A function rendering the template from a recipient dictionary (raises KeyError for a missing field).
+    """
+    parts = list(string.Formatter().parse(template))
+
+    def render(fields):
+        values = []
+        for literal, field, spec, conversion in parts:
+            values.append(literal)
+            if field is not None:
+                value = fields[field]
+                if value is None:
+                    # csv.DictReader fills the fields missing from short rows with None
+                    raise KeyError(field)
+                if conversion == "r":
+                    value = repr(value)
+                elif conversion == "s":
+                    value = str(value)
+                values.append(format(value, spec))
+        return "".join(values)
+
+    return render
+
+
+def create_personalized_message(config, subject, body, email_address):
+    """Creates a plain text message for one mail merge recipient."""
+    msg = MIMEText(body)
+    msg["Subject"] = subject
+    msg["From"] = formataddr(("Sender Name", config["from_address"]))
+    msg["To"] = email_address
+    return msg
+
+
+def serialize_message(msg):
+    """
+    Serializes a message to the bytes sent after DATA, once, so they can be spooled or sent in many envelopes.
+    smtplib only fixes the line endings of str messages, so bytes are produced with CRLF line endings here.
+    """
+    return msg.as_bytes(policy=msg.policy.clone(linesep="\r\n"))
+
+
+def send_bulk(
+    config, recipients_path, template_path, pool_size, max_per_connection, retries, validator, metrics=None
+):
+    """
+    Sends a personalized message to every recipient of a CSV or JSON lines file over a pool of reused SMTP connections.
+
+    :param config: Dictionary of email properties (see read_config).
+    :param recipients_path: The recipients file (see read_recipients).
+    :param template_path: The template file (see read_template), or None to use the configured subject and body.
+    :param pool_size: The number of SMTP connections (and sending threads).
+    :param max_per_connection: The number of messages sent on a connection before it is replaced.
+    :param retries: The number of times a message is retried after a connection failure.
+    :param validator: The AddressValidator of the recipient addresses.
+    :param metrics: An SMTPMetrics to time the SMTP phases in, or None.
+    """
+    try:
+        subject_template, body_template = read_template(template_path, config)
+        render_subject = compile_template(subject_template)
+        render_body = compile_template(body_template)
+    except (OSError, ValueError) as e:
+        print(f"Invalid template: {e}")
+        return
+
+    from_address = config["from_address"]
+    pool = SMTPConnectionPool(config, pool_size, max_per_connection, metrics)
+    print_lock = threading.Lock()
+
+    def send_one(line_number, email_address, recipient):
+        try:
+            msg = create_personalized_message(
+                config, render_subject(recipient), render_body(recipient), email_address
+            )
+        except (KeyError, IndexError, ValueError) as e:
+            return line_number, email_address, f"Template error: missing or invalid field {e}"
+        try:
+            refused = pool.send(from_address, [email_address], msg.as_string(), retries)
+        except Exception as e:
+            return line_number, email_address, f"Failed to send email: {e}"
+        if refused:
+            return line_number, email_address, f"Recipient refused: {refused}"
+        return line_number, email_address, None
+
+    sent = 0
+    failed = 0
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            pending = set()
+
+            def report(line_number, email_address, error):
+                nonlocal sent, failed
+                if error is None:
+                    sent += 1
+                else:
+                    failed += 1
+                    with print_lock:
+                        print(f"Recipient {line_number} ({email_address}): {error}")
+
+            def collect(done):
+                for future in done:
+                    report(*future.result())
+
+            try:
+                recipients = read_valid_recipients(recipients_path, validator, report)
+                for line_number, email_address, recipient in recipients:
+                    # Keep a bounded number of messages in flight, so huge recipient lists are streamed
+                    if len(pending) >= pool_size * 4:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending.add(executor.submit(send_one, line_number, email_address, recipient))
+            except (OSError, ValueError, csv.Error) as e:
+                print(f"Failed to read recipients: {e}")
+            done, _ = wait(pending)
+            collect(done)
+    finally:
+        pool.close()
+
+    elapsed = time.perf_counter() - started
+    rate = sent / elapsed if elapsed > 0 else 0.0
+    print(
+        f"\nBulk send complete: {sent} sent, {failed} failed in {elapsed:.2f}s ({rate:.1f} messages/s)."
+    )
+
+
+def is_transient_error(error):
+    """Checks whether a sending error is temporary (a 4xx reply or a lost connection), so the message should be retried."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, CONNECTION_ERRORS)
+
+
+def prepare_smtp_data(message):
+    """Converts a serialized message to the DATA payload: CRLF line endings, with leading dots doubled (RFC 5321)."""
+    if isinstance(message, str):
+        message = message.encode("utf-8")
+    data = re.sub(rb"(?:\r\n|\n|\r(?!\n))", b"\r\n", message)
+    data = re.sub(rb"(?m)^\.", b"..", data)
+    if not data.endswith(b"\r\n"):
+        data += b"\r\n"
+    return data + b".\r\n"
+
+
+class AsyncSMTPConnection:
+    """
+    A minimal asyncio SMTP client (EHLO, STARTTLS, AUTH PLAIN, MAIL, RCPT, DATA, QUIT), so many connections
+    can be driven from one thread without a slow relay blocking the others. Errors are raised as smtplib exceptions,
+    so they are handled the same way as on the blocking path, and a server which stops responding for longer than
+    the timeout is treated as a lost connection.
+    """
+
+    def __init__(self, config, metrics=None, timeout=SMTP_TIMEOUT):
+        """
+        :param config: Dictionary of email properties (see read_config).
+        :param metrics: An SMTPMetrics to time the SMTP phases in, or None.
+        :param timeout: The longest wait (in seconds) to connect or for a reply.
+        """
+        self.config = config
+        self.metrics = metrics
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def wait(self, awaitable):
+        """Awaits a network operation, raising smtplib.SMTPServerDisconnected if it takes longer than the timeout."""
+        try:
+            return await asyncio.wait_for(awaitable, self.timeout)
+        except asyncio.TimeoutError:
+            raise smtplib.SMTPServerDisconnected(
+                f"No response from the server within {self.timeout}s"
+            ) from None
+
+    async def reply(self):
+        """Reads a (possibly multi-line) reply and returns its code and text."""
+        lines = []
+        while True:
+            line = await self.wait(self.reader.readline())
+            if not line:
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            if not line[:3].isdigit():
+                # The reply can not be matched to the command any more, so the connection can not be reused
+                raise smtplib.SMTPServerDisconnected(f"Malformed reply from the server: {line[:80]!r}")
+            lines.append(line[4:].strip())
+            if line[3:4] != b"-":
+                return int(line[:3]), b"\n".join(lines)
+
+    async def command(self, line, expected):
+        """Sends a command and checks its reply code, raising smtplib.SMTPResponseException if it is not expected."""
+        self.writer.write(line.encode("utf-8") + b"\r\n")
+        await self.wait(self.writer.drain())
+        code, text = await self.reply()
+        if code not in expected:
+            raise smtplib.SMTPResponseException(code, text)
+        return code, text
+
+    async def reset(self):
+        """Aborts the current mail transaction (RSET), so the connection can send the next message."""
+        try:
+            await self.command("RSET", (250,))
+        except smtplib.SMTPResponseException:
+            pass
+
+    async def connect(self):
+        """Connects, upgrades to TLS and logs in as configured."""
+        with timed(self.metrics, "connect"):
+            self.reader, self.writer = await self.wait(
+                asyncio.open_connection(self.config["smtp_server"], int(self.config["smtp_port"]))
+            )
+            code, text = await self.reply()
+            if code != 220:
+                raise smtplib.SMTPConnectError(code, text)
+            await self.command("EHLO localhost", (250,))
+        if self.config.get("use_tls", True):
+            with timed(self.metrics, "starttls"):
+                await self.command("STARTTLS", (220,))
+                await self.wait(
+                    self.writer.start_tls(
+                        ssl.create_default_context(), server_hostname=self.config["smtp_server"]
+                    )
+                )
+                await self.command("EHLO localhost", (250,))
+        if self.config["smtp_username"] and self.config["smtp_password"]:
+            credentials = f"\0{self.config['smtp_username']}\0{self.config['smtp_password']}"
+            token = base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+            with timed(self.metrics, "login"):
+                await self.command(f"AUTH PLAIN {token}", (235,))
+
+    async def sendmail(self, from_address, recipients, message):
+        """
+        Sends a message, returning a dictionary of refused recipients like smtplib's sendmail.
+        Raises smtplib.SMTPRecipientsRefused if every recipient was refused.
+        A rejected transaction is reset (RSET), so the connection can be reused for the next message.
+        """
+        with timed(self.metrics, "mail"):
+            try:
+                await self.command(f"MAIL FROM:<{from_address}>", (250,))
+            except smtplib.SMTPResponseException:
+                await self.reset()
+                raise
+        refused = {}
+        for recipient in recipients:
+            try:
+                with timed(self.metrics, "rcpt"):
+                    await self.command(f"RCPT TO:<{recipient}>", (250, 251))
+            except smtplib.SMTPResponseException as e:
+                refused[recipient] = (e.smtp_code, e.smtp_error)
+        if len(refused) == len(recipients):
+            await self.reset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+        with timed(self.metrics, "data"):
+            try:
+                await self.command("DATA", (354,))
+            except smtplib.SMTPResponseException:
+                await self.reset()
+                raise
+            self.writer.write(prepare_smtp_data(message))
+            await self.wait(self.writer.drain())
+            code, text = await self.reply()
+            if code != 250:
+                await self.reset()
+                raise smtplib.SMTPDataError(code, text)
+        return refused
+
+    async def close(self, quit=True):
+        """
+        Says goodbye (if still connected) and closes the connection.
+
+        :param quit: Whether to send QUIT first; a connection in an unknown state (e.g. in the middle of DATA) is
+            closed without waiting for a reply which may never come.
+        """
+        if self.writer is None:
+            return
+        if quit:
+            try:
+                await asyncio.wait_for(self.command("QUIT", (221,)), 5)
+            except (smtplib.SMTPException, OSError, asyncio.TimeoutError):
+                pass
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except OSError:
+            pass
+        self.writer = None
+
+
+class TokenBucket:
+    """A token bucket rate limiter: allows bursts of up to 'burst' messages, and 'rate' messages per second on average."""
+
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: The average number of messages per second (0 for no limit).
+        :param burst: The most messages sent back to back. Default is one second's worth.
+        """
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        """Waits until a message may be sent."""
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def send_bulk_async_run(
+    config,
+    messages,
+    concurrency,
+    max_per_connection,
+    retries,
+    rate,
+    per_domain,
+    backoff,
+    on_result,
+    metrics=None,
+    burst=None,
+):
+    """
+    Sends messages over 'concurrency' asyncio SMTP connections.
+
+    :param config: Dictionary of email properties (see read_config).
+    :param messages: An iterable of (key, recipient_address, message) tuples, consumed lazily.
+    :param concurrency: The number of SMTP connections.
+    :param max_per_connection: The number of messages sent on a connection before it is replaced.
+    :param retries: The number of times a message is retried after a temporary failure.
+    :param rate: The most messages per second (0 for no limit).
+    :param per_domain: The most messages sent to the same recipient domain at once.
+    :param backoff: The delay (in seconds) before the first retry, doubled for each further retry.
+    :param on_result: Called with (key, recipient_address, error) once a message is sent (error is None) or has failed.
+    :param metrics: An SMTPMetrics to time the SMTP phases in, or None.
+    :param burst: The most messages sent back to back under the rate limit. Default is one second's worth.
+    """
+    from_address = config["from_address"]
+    pending = asyncio.Queue(maxsize=concurrency * 4)
+    bucket = TokenBucket(rate, burst)
+    domain_limits = {}
+    retry_tasks = set()
+
+    def domain_limit(address):
+        domain = address.rpartition("@")[2].lower()
+        if domain not in domain_limits:
+            domain_limits[domain] = asyncio.Semaphore(per_domain)
+        return domain_limits[domain]
+
+    async def retry_later(item, delay):
+        # The retried message is queued before the original is marked done, so pending.join() waits for it
+        await asyncio.sleep(delay)
+        await pending.put(item)
+        pending.task_done()
+
+    async def worker():
+        connection = None
+        sent_on_connection = 0
+        try:
+            while True:
+                item = await pending.get()
+                key, address, message, attempt = item
+                error = None
+                retried = False
+                try:
+                    async with domain_limit(address):
+                        await bucket.acquire()
+                        if connection is None or sent_on_connection >= max_per_connection:
+                            if connection is not None:
+                                await connection.close()
+                            connection = None
+                            connection = AsyncSMTPConnection(config, metrics)
+                            sent_on_connection = 0
+                            await connection.connect()
+                        refused = await connection.sendmail(from_address, [address], message)
+                        sent_on_connection += 1
+                        if refused:
+                            error = smtplib.SMTPRecipientsRefused(refused)
+                except (smtplib.SMTPException, OSError, asyncio.TimeoutError) as e:
+                    error = e
+                    if isinstance(e, CONNECTION_ERRORS) or not isinstance(
+                        e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)
+                    ):
+                        if connection is not None:
+                            await connection.close(quit=False)
+                        connection = None
+                except Exception as e:
+                    # An unexpected error fails only this message; the connection is in an unknown state
+                    error = e
+                    if connection is not None:
+                        await connection.close(quit=False)
+                    connection = None
+
+                try:
+                    if error is not None and attempt < retries and is_transient_error(error):
+                        delay = min(MAX_BACKOFF, backoff * (2**attempt)) * random.uniform(0.5, 1.5)
+                        task = asyncio.create_task(
+                            retry_later((key, address, message, attempt + 1), delay)
+                        )
+                        retry_tasks.add(task)
+                        task.add_done_callback(retry_tasks.discard)
+                        retried = True
+                    else:
+                        on_result(key, address, error)
+                finally:
+                    # A retried message is marked done by retry_later once it is queued again
+                    if not retried:
+                        pending.task_done()
+        finally:
+            if connection is not None:
+                await connection.close()
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        for key, address, message in messages:
+            await pending.put((key, address, message, 0))
+        await pending.join()
+    finally:
+        for task in workers + list(retry_tasks):
+            task.cancel()
+        await asyncio.gather(*workers, *retry_tasks, return_exceptions=True)
+
+
+def send_bulk_async(
+    config,
+    recipients_path,
+    template_path,
+    concurrency,
+    max_per_connection,
+    retries,
+    rate,
+    per_domain,
+    backoff,
+    validator,
+    metrics=None,
+):
+    """
+    Sends a personalized message to every recipient of a CSV or JSON lines file on the asyncio sending path,
+    with a rate limit, per domain concurrency caps and exponential backoff of temporary (4xx) failures.
+    """
+    try:
+        subject_template, body_template = read_template(template_path, config)
+        render_subject = compile_template(subject_template)
+        render_body = compile_template(body_template)
+    except (OSError, ValueError) as e:
+        print(f"Invalid template: {e}")
+        return
+
+    counts = {"sent": 0, "failed": 0}
+
+    def report(line_number, email_address, error):
+        if error is None:
+            counts["sent"] += 1
+        else:
+            counts["failed"] += 1
+            print(f"Recipient {line_number} ({email_address}): {error}")
+
+    def messages():
+        try:
+            for line_number, email_address, recipient in read_valid_recipients(
+                recipients_path, validator, report
+            ):
+                try:
+                    msg = create_personalized_message(
+                        config, render_subject(recipient), render_body(recipient), email_address
+                    )
+                except (KeyError, IndexError, ValueError) as e:
+                    report(line_number, email_address, f"Template error: missing or invalid field {e}")
+                    continue
+                yield line_number, email_address, serialize_message(msg)
+        except (OSError, ValueError, csv.Error) as e:
+            print(f"Failed to read recipients: {e}")
+
+    started = time.perf_counter()
+    asyncio.run(
+        send_bulk_async_run(
+            config,
+            messages(),
+            concurrency,
+            max_per_connection,
+            retries,
+            rate,
+            per_domain,
+            backoff,
+            report,
+            metrics,
+        )
+    )
+    elapsed = time.perf_counter() - started
+    sent_rate = counts["sent"] / elapsed if elapsed > 0 else 0.0
+    print(
+        f"\nAsync bulk send complete: {counts['sent']} sent, {counts['failed']} failed in {elapsed:.2f}s ({sent_rate:.1f} messages/s)."
+    )
+
+
+class Spool:
+    """
+    A durable outbound queue in an SQLite database.
+    Messages are spooled (serialized, with their envelope) before they are sent and the delivery state of every recipient
+    (pending, sent or failed, the number of attempts and the time of the next attempt) is committed as soon as it changes,
+    so a run which crashes or is stopped is resumed from the spool without sending a message to a recipient twice.
+    Only a crash between the server accepting a message and the state being committed can cause a duplicate,
+    which the spooled Message-ID header lets the receiver detect.
+    """
+
+    def __init__(self, path):
+        """:param path: The SQLite database file (created if it does not exist)."""
+        self.db = sqlite3.connect(path)
+        # WAL keeps every committed state across a crash of the process without an fsync per delivery
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY,
+                key TEXT NOT NULL UNIQUE,
+                from_address TEXT NOT NULL,
+                data BLOB NOT NULL,
+                created REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS deliveries (
+                message_id INTEGER NOT NULL REFERENCES messages (id),
+                recipient TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                PRIMARY KEY (message_id, recipient)
+            );
+            CREATE INDEX IF NOT EXISTS deliveries_due ON deliveries (status, next_attempt);
+            """
+        )
+        self.db.commit()
+
+    def contains(self, key):
+        """Checks whether a message with this key was spooled already."""
+        return self.find(key) is not None
+
+    def find(self, key):
+        """Returns the id of the message spooled with this key, or None."""
+        row = self.db.execute("SELECT id FROM messages WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def enqueue(self, key, from_address, recipients, message):
+        """
+        Adds a message to the spool (the caller commits). A message whose key was spooled already is not added again,
+        so spooling the same campaign twice only sends it once.
+
+        :param key: A unique key of the message.
+        :param from_address: The envelope sender.
+        :param recipients: The envelope recipients.
+        :param message: The serialized message (bytes).
+        :return: The id of the spooled message, or None if it was spooled already.
+        """
+        cursor = self.db.execute(
+            "INSERT OR IGNORE INTO messages (key, from_address, data, created) VALUES (?, ?, ?, ?)",
+            (key, from_address, message, time.time()),
+        )
+        if cursor.rowcount == 0:
+            return None
+        message_id = cursor.lastrowid
+        self.db.executemany(
+            "INSERT OR IGNORE INTO deliveries (message_id, recipient) VALUES (?, ?)",
+            [(message_id, recipient) for recipient in recipients],
+        )
+        return message_id
+
+    def commit(self):
+        self.db.commit()
+
+    def due(self, limit):
+        """
+        Returns the messages with recipients due for a delivery attempt.
+
+        :param limit: The most recipients returned.
+        :return: List of (message_id, from_address, data, {recipient: attempts}) tuples.
+        """
+        rows = self.db.execute(
+            "SELECT message_id, recipient, attempts FROM deliveries "
+            "WHERE status = 'pending' AND next_attempt <= ? ORDER BY next_attempt LIMIT ?",
+            (time.time(), limit),
+        ).fetchall()
+        recipients = {}
+        for message_id, recipient, attempts in rows:
+            recipients.setdefault(message_id, {})[recipient] = attempts
+        messages = []
+        for message_id, attempts in recipients.items():
+            from_address, data = self.db.execute(
+                "SELECT from_address, data FROM messages WHERE id = ?", (message_id,)
+            ).fetchone()
+            messages.append((message_id, from_address, data, attempts))
+        return messages
+
+    def next_attempt(self):
+        """Returns the time of the next delivery attempt, or None if nothing is pending."""
+        return self.db.execute(
+            "SELECT MIN(next_attempt) FROM deliveries WHERE status = 'pending'"
+        ).fetchone()[0]
+
+    def update(self, message_id, recipient, status, attempts, next_attempt=0.0, error=None):
+        """Records the outcome of a delivery attempt (the caller commits)."""
+        self.db.execute(
+            "UPDATE deliveries SET status = ?, attempts = ?, next_attempt = ?, last_error = ? "
+            "WHERE message_id = ? AND recipient = ?",
+            (status, attempts, next_attempt, error, message_id, recipient),
+        )
+
+    def retry_failed(self):
+        """
+        Requeues every failed recipient for an immediate delivery attempt, with its attempts reset (the caller commits).
+
+        :return: The number of recipients requeued.
+        """
+        cursor = self.db.execute(
+            "UPDATE deliveries SET status = 'pending', attempts = 0, next_attempt = 0 WHERE status = 'failed'"
+        )
+        return cursor.rowcount
+
+    def deliveries(self, message_id):
+        """Returns {recipient: (status, last_error)} for a message."""
+        rows = self.db.execute(
+            "SELECT recipient, status, last_error FROM deliveries WHERE message_id = ?", (message_id,)
+        )
+        return {recipient: (status, error) for recipient, status, error in rows}
+
+    def counts(self):
+        """Returns the number of recipients by delivery status."""
+        rows = self.db.execute("SELECT status, COUNT(*) FROM deliveries GROUP BY status")
+        return dict(rows.fetchall())
+
+    def close(self):
+        self.db.close()
+
+
+def delivery_errors(recipients, result):
+    """
+    Maps the outcome of sending a message to the error of each recipient.
+
+    :param recipients: The envelope recipients.
+    :param result: The refused recipients dictionary returned by sendmail, or the exception it raised.
+    :return: Dictionary {recipient: error} of the recipients which were not delivered.
+    """
+    if isinstance(result, smtplib.SMTPRecipientsRefused):
+        result = result.recipients
+    if isinstance(result, Exception):
+        return {recipient: result for recipient in recipients}
+    return {
+        recipient: smtplib.SMTPResponseException(code, text)
+        for recipient, (code, text) in result.items()
+    }
+
+
+def drain_spool(
+    spool, config, pool_size, max_per_connection, max_attempts, backoff, batch_size=100, metrics=None
+):
+    """
+    Delivers the pending messages of a spool over a pool of SMTP connections, in envelopes of at most batch_size
+    recipients, until every recipient is delivered or failed. Temporary failures (4xx replies, connection failures) are retried with exponential backoff up to max_attempts
+    times, permanent failures (5xx replies) are not retried.
+
+    :return: Tuple (sent, failed) of the number of recipients delivered and failed by this run.
+    """
+    pool = SMTPConnectionPool(config, pool_size, max_per_connection, metrics)
+    sent = 0
+    failed = 0
+    try:
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            while True:
+                messages = spool.due(pool_size * batch_size)
+                if not messages:
+                    next_attempt = spool.next_attempt()
+                    if next_attempt is None:
+                        break
+                    time.sleep(max(0.0, next_attempt - time.time()))
+                    continue
+
+                futures = {}
+                for message_id, from_address, data, attempts in messages:
+                    for batch in chunk_recipients(list(attempts), batch_size):
+                        batch_attempts = {recipient: attempts[recipient] for recipient in batch}
+                        # Retries are scheduled by the spool, so the pool does not retry on its own
+                        future = executor.submit(pool.send, from_address, batch, data, 0)
+                        futures[future] = (message_id, batch_attempts)
+
+                for future in as_completed(futures):
+                    message_id, attempts = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = e
+                    errors = delivery_errors(list(attempts), result)
+                    for recipient, attempt in attempts.items():
+                        attempt += 1
+                        error = errors.get(recipient)
+                        if error is None:
+                            spool.update(message_id, recipient, "sent", attempt)
+                            sent += 1
+                        elif is_transient_error(error) and attempt < max_attempts:
+                            delay = min(MAX_BACKOFF, backoff * (2 ** (attempt - 1)))
+                            delay *= random.uniform(0.5, 1.5)
+                            spool.update(
+                                message_id, recipient, "pending", attempt, time.time() + delay, str(error)
+                            )
+                            print(f"Retrying {recipient} in {delay:.1f}s (attempt {attempt}): {error}")
+                        else:
+                            spool.update(message_id, recipient, "failed", attempt, error=str(error))
+                            failed += 1
+                            print(f"Failed to deliver to {recipient}: {error}")
+                    spool.commit()
+    finally:
+        pool.close()
+    return sent, failed
+
+
+def message_key(*parts):
+    """
+    Returns a digest of the parts of a message (its addresses, subject and body), the same on every run,
+    so a message spooled again is recognized by its content rather than by when it was created.
+    """
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+def spool_bulk(spool, config, recipients_path, template_path, validator):
+    """
+    Spools a personalized message for every recipient of a CSV or JSON lines file.
+    Each message is keyed by the recipients file, the normalized address and a digest of the rendered subject and
+    body (not the line, so adding or removing rows does not change the other keys). Spooling the same campaign again
+    (e.g. after a crash or an edit of the recipients file) skips the messages spooled already instead of sending them
+    twice, while a new template or subject for the same recipients is spooled as new messages.
+
+    :return: The number of messages spooled.
+    """
+    try:
+        subject_template, body_template = read_template(template_path, config)
+        render_subject = compile_template(subject_template)
+        render_body = compile_template(body_template)
+    except (OSError, ValueError) as e:
+        print(f"Invalid template: {e}")
+        return 0
+
+    def report(line_number, email_address, error):
+        print(f"Recipient {line_number} ({email_address}): {error}")
+
+    campaign = os.path.abspath(recipients_path)
+    spooled = 0
+    try:
+        for line_number, email_address, recipient in read_valid_recipients(recipients_path, validator, report):
+            try:
+                subject = render_subject(recipient)
+                body = render_body(recipient)
+            except (KeyError, IndexError, ValueError) as e:
+                print(f"Recipient {line_number} ({email_address}): Template error: missing or invalid field {e}")
+                continue
+            # Lower-cased like the duplicate check of the validator
+            key = f"{campaign}:{email_address.lower()}:{message_key(subject, body)}"
+            if spool.contains(key):
+                continue
+            msg = create_personalized_message(config, subject, body, email_address)
+            msg["Message-ID"] = make_msgid()
+            spool.enqueue(key, config["from_address"], [email_address], serialize_message(msg))
+            spooled += 1
+            if spooled % SPOOL_COMMIT_INTERVAL == 0:
+                spool.commit()
+    except (OSError, ValueError, csv.Error) as e:
+        print(f"Failed to read recipients: {e}")
+    spool.commit()
+    return spooled
+
+
+def deliver_spool(spool, config, args, metrics=None):
+    """Drains the spool with the sending options from the command line and reports the outcome."""
+    started = time.perf_counter()
+    sent, failed = drain_spool(
+        spool,
+        config,
+        max(1, args.pool_size),
+        max(1, args.max_per_connection),
+        max(1, args.max_attempts),
+        max(0.0, args.backoff),
+        max(1, args.batch_size),
+        metrics,
+    )
+    elapsed = time.perf_counter() - started
+    counts = spool.counts()
+    print(
+        f"\nSpool drained: {sent} sent, {failed} failed in {elapsed:.2f}s "
+        f"(spool totals: {counts.get('sent', 0)} sent, {counts.get('failed', 0)} failed, {counts.get('pending', 0)} pending)."
+    )
+
+
+class LoadTestSink:
+    """An aiosmtpd handler which accepts and counts every message, the local SMTP server of the load test."""
+
+    def __init__(self):
+        self.messages = 0
+        self.recipients = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        self.recipients += len(envelope.rcpt_tos)
+        return "250 Message accepted"
+
+
+def find_free_port():
+    """Returns a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def load_test_threads(config, message, count, rate, pool_size, batch_size, max_per_connection, metrics):
+    """
+    Sends count messages over a pool of blocking SMTP connections, starting one every 1/rate seconds.
+
+    :return: Tuple (latencies, failed) with the latency of every sent message in seconds and the number of failures.
+    """
+    pool = SMTPConnectionPool(config, pool_size, max_per_connection, metrics)
+    recipients = [f"load{i}@example.com" for i in range(batch_size)]
+
+    def send_one(scheduled):
+        try:
+            pool.send(config["from_address"], recipients, message, 0)
+            error = None
+        except Exception as e:
+            error = e
+        return time.perf_counter() - scheduled, error
+
+    latencies = []
+    failed = 0
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            futures = []
+            for i in range(count):
+                scheduled = started + i / rate if rate > 0 else started
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(executor.submit(send_one, scheduled))
+            for future in futures:
+                latency, error = future.result()
+                if error is None:
+                    latencies.append(latency)
+                else:
+                    failed += 1
+    finally:
+        pool.close()
+    return latencies, failed
+
+
+def load_test_async(config, message, count, rate, pool_size, max_per_connection, metrics):
+    """
+    Sends count single recipient messages over asyncio SMTP connections, paced by the token bucket at rate per second.
+
+    :return: Tuple (latencies, failed) with the latency of every sent message in seconds and the number of failures.
+    """
+    latencies = []
+    failures = []
+    started = time.perf_counter()
+
+    def on_result(index, address, error):
+        if error is None:
+            scheduled = started + index / rate if rate > 0 else started
+            latencies.append(max(0.0, time.perf_counter() - scheduled))
+        else:
+            failures.append(error)
+
+    messages = ((i, f"load{i}@example.com", message) for i in range(count))
+    asyncio.run(
+        send_bulk_async_run(
+            config,
+            messages,
+            pool_size,
+            max_per_connection,
+            0,
+            rate,
+            pool_size,
+            0.0,
+            on_result,
+            metrics,
+            # A burst of 10ms worth of messages, so the sleep overshoot of the pacing is caught up instead of lost
+            burst=max(1.0, rate * 0.01),
+        )
+    )
+    return latencies, len(failures)
+
+
+def run_load_test(config, count, rate, pool_size, batch_size, max_per_connection, use_async, metrics):
+    """
+    Starts a local aiosmtpd sink and drives the sender at a target rate, reporting the throughput, the latency
+    percentiles and the time spent in each SMTP phase, to compare concurrency and batch settings.
+    The latency of a message is measured from when it was scheduled to be sent, so messages queueing behind a saturated
+    pool show up in the tail latency instead of slowing the schedule down.
+    """
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        print("The load test needs aiosmtpd (pip install aiosmtpd).")
+        return
+
+    metrics = metrics or SMTPMetrics()
+    sink = LoadTestSink()
+    controller = Controller(sink, hostname="127.0.0.1", port=find_free_port())
+    controller.start()
+    sink_config = dict(
+        config,
+        smtp_server="127.0.0.1",
+        smtp_port=controller.port,
+        smtp_username="",
+        smtp_password="",
+        use_tls=False,
+        from_address=config["from_address"] or "load-test@example.com",
+    )
+    msg = create_personalized_message(
+        sink_config, "Load test", "This is a load test message.\n", "load@example.com"
+    )
+    message = serialize_message(msg)
+    if use_async:
+        batch_size = 1
+
+    started = time.perf_counter()
+    try:
+        if use_async:
+            latencies, failed = load_test_async(
+                sink_config, message, count, rate, pool_size, max_per_connection, metrics
+            )
+        else:
+            latencies, failed = load_test_threads(
+                sink_config, message, count, rate, pool_size, batch_size, max_per_connection, metrics
+            )
+    finally:
+        elapsed = time.perf_counter() - started
+        controller.stop()
+
+    latencies.sort()
+    sent = len(latencies)
+    print(
+        f"Load test: {count} messages x {batch_size} recipients, {'async' if use_async else 'threads'} with "
+        f"{pool_size} connections, target {f'{rate:g}/s' if rate > 0 else 'unlimited'}."
+    )
+    print(
+        f"Sent {sent}, failed {failed} in {elapsed:.2f}s: {sent / elapsed:.1f} messages/s, "
+        f"{sent * batch_size / elapsed:.1f} recipients/s (sink received {sink.messages} messages)."
+    )
+    print(
+        "Latency: "
+        + ", ".join(
+            f"{name} {percentile(latencies, fraction) * 1000:.1f}ms"
+            for name, fraction in (("p50", 0.50), ("p90", 0.90), ("p99", 0.99), ("max", 1.0))
+        )
+    )
+    for phase, stats in metrics.summary().items():
+        print(
+            f"  {phase:<8} {stats['count']:>7} x  p50 {stats['p50'] * 1000:.2f}ms  p99 {stats['p99'] * 1000:.2f}ms  "
+            f"total {stats['total']:.2f}s  errors {stats['errors']}"
+        )
+
+
+def create_arg_parser() -> argparse.ArgumentParser:
+    """
+    Creates and returns the argument parser for command-line arguments.
+
+    Returns:
+        argparse.ArgumentParser: The argument parser.
+    """
+    parser = argparse.ArgumentParser(
+        description="Send an email to multiple recipients, or a personalized email to every recipient of a list."
+    )
+    parser.add_argument(
+        "--recipients",
+        help="Bulk mail merge mode: a CSV (with a header row) or JSON lines file of recipients, each with an 'email' field.",
+        default=arg_defaults["recipients"],
+    )
+    parser.add_argument(
+        "--template",
+        help="The mail merge template: a 'Subject: ...' line, a blank line, then the body. {field} placeholders are "
+        "filled from each recipient. Default is the subject and body from config.json.",
+        default=arg_defaults["template"],
+    )
+    parser.add_argument(
+        "--pool_size",
+        type=int,
+        help=f"The number of SMTP connections kept open in bulk mode. Default is {arg_defaults['pool_size']}.",
+        default=arg_defaults["pool_size"],
+    )
+    parser.add_argument(
+        "--max_per_connection",
+        type=int,
+        help=f"The number of messages sent on a connection before it is replaced. Default is {arg_defaults['max_per_connection']}.",
+        default=arg_defaults["max_per_connection"],
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        help=f"The number of times a message is retried after a connection failure. Default is {arg_defaults['retries']}.",
+        default=arg_defaults["retries"],
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Send in bulk mode over asyncio SMTP connections (--pool_size of them) instead of blocking smtplib connections.",
+        default=arg_defaults["use_async"],
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        help="The most messages per second in async bulk mode (token bucket). Default is no limit.",
+        default=arg_defaults["rate"],
+    )
+    parser.add_argument(
+        "--per_domain",
+        type=int,
+        help=f"The most messages sent to the same recipient domain at once in async bulk mode. Default is {arg_defaults['per_domain']}.",
+        default=arg_defaults["per_domain"],
+    )
+    parser.add_argument(
+        "--backoff",
+        type=float,
+        help=f"The delay in seconds before retrying a temporary (4xx) failure in async bulk mode or from the --spool, doubled on each retry up to {MAX_BACKOFF:.0f}s. Default is {arg_defaults['backoff']}.",
+        default=arg_defaults["backoff"],
+    )
+    parser.add_argument(
+        "--spool",
+        type=str,
+        help="An SQLite spool file. Messages are written to it before they are sent and delivered from it with retries, "
+        "so an interrupted run is resumed by running it again. Default is sending without a spool.",
+        default=arg_defaults["spool"],
+    )
+    parser.add_argument(
+        "--drain",
+        action="store_true",
+        help="Only deliver the messages pending in the --spool, without adding a new one.",
+        default=arg_defaults["drain"],
+    )
+    parser.add_argument(
+        "--max_attempts",
+        type=int,
+        help=f"The number of delivery attempts of a spooled message after temporary failures. Default is {arg_defaults['max_attempts']}.",
+        default=arg_defaults["max_attempts"],
+    )
+    parser.add_argument(
+        "--retry_failed",
+        action="store_true",
+        help="Requeue the recipients of the --spool which failed (e.g. after --max_attempts temporary failures) before delivering.",
+        default=arg_defaults["retry_failed"],
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        help=f"The most recipients per message envelope (RCPT TO commands); larger recipient lists are sent in batches over --pool_size connections. Default is {arg_defaults['batch_size']}.",
+        default=arg_defaults["batch_size"],
+    )
+    parser.add_argument(
+        "--allow_domains",
+        type=str,
+        help="A file of recipient domains (one per line, subdomains included) to send to; other domains are rejected. Default is any domain.",
+        default=arg_defaults["allow_domains"],
+    )
+    parser.add_argument(
+        "--deny_domains",
+        type=str,
+        help="A file of recipient domains (one per line, subdomains included) to reject. Default is none.",
+        default=arg_defaults["deny_domains"],
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        help="A file to write the duration of every SMTP phase (connect, starttls, login, mail, rcpt, data) to. Default is no metrics.",
+        default=arg_defaults["metrics"],
+    )
+    parser.add_argument(
+        "--metrics_format",
+        choices=["jsonl", "prometheus"],
+        help=f"The --metrics format: a JSON line per phase as it completes, or a Prometheus text dump at the end. Default is {arg_defaults['metrics_format']}.",
+        default=arg_defaults["metrics_format"],
+    )
+    parser.add_argument(
+        "--load_test",
+        action="store_true",
+        help="Start a local aiosmtpd sink and send --load_messages messages of --batch_size recipients to it at --load_rate, "
+        "over --pool_size connections (or --async ones), then report the throughput and latency.",
+        default=arg_defaults["load_test"],
+    )
+    parser.add_argument(
+        "--load_messages",
+        type=int,
+        help=f"The number of messages sent by the load test. Default is {arg_defaults['load_messages']}.",
+        default=arg_defaults["load_messages"],
+    )
+    parser.add_argument(
+        "--load_rate",
+        type=float,
+        help=f"The target messages per second of the load test (0 for as fast as possible). Default is {arg_defaults['load_rate']}.",
+        default=arg_defaults["load_rate"],
+    )
+    return parser
+
+
+def send_email(args, config, spool, metrics):
+    """Sends the configured email (or the mail merge, or the pending spooled messages) as selected on the command line."""
+    if args.load_test:
+        run_load_test(
+            config,
+            max(1, args.load_messages),
+            max(0.0, args.load_rate),
+            max(1, args.pool_size),
+            max(1, args.batch_size),
+            max(1, args.max_per_connection),
+            args.use_async,
+            metrics,
+        )
+        return
+
+    if args.retry_failed:
+        if spool is None:
+            print("--retry_failed needs a --spool file.")
+            return
+        requeued = spool.retry_failed()
+        spool.commit()
+        print(f"Requeued {requeued} failed recipients.")
+
+    if args.drain:
+        if spool is None:
+            print("--drain needs a --spool file.")
+            return
+        deliver_spool(spool, config, args, metrics)
+        return
+
+    try:
+        validator = AddressValidator(
+            read_domain_list(args.allow_domains) if args.allow_domains else None,
+            read_domain_list(args.deny_domains) if args.deny_domains else None,
+        )
+    except OSError as e:
+        print(f"Failed to read domain list: {e}")
+        return
+
+    if args.recipients:
+        if not validate_email_address(config["from_address"]):
+            print(f"Invalid sender email address: {config['from_address']}")
+            return
+        if spool is not None:
+            spooled = spool_bulk(spool, config, args.recipients, args.template, validator)
+            print(f"Spooled {spooled} new messages.")
+            deliver_spool(spool, config, args, metrics)
+        elif args.use_async:
+            send_bulk_async(
+                config,
+                args.recipients,
+                args.template,
+                max(1, args.pool_size),
+                max(1, args.max_per_connection),
+                max(0, args.retries),
+                max(0.0, args.rate),
+                max(1, args.per_domain),
+                max(0.0, args.backoff),
+                validator,
+                metrics,
+            )
+        else:
+            send_bulk(
+                config,
+                args.recipients,
+                args.template,
+                max(1, args.pool_size),
+                max(1, args.max_per_connection),
+                max(0, args.retries),
+                validator,
+                metrics,
+            )
+        return
 
     is_valid, invalid_prop = validate_required_email_props(config)
     if not is_valid:
         print(f"Missing or empty required property: {invalid_prop}")
         return
 
-    smtp_server = config["smtp_server"]
-    smtp_port = int(config["smtp_port"])
-    smtp_username = config["smtp_username"]
-    smtp_password = config["smtp_password"]
-    use_tls = config.get("use_tls", True)
     from_address = config["from_address"]
     to_addresses = config["to_addresses"]
     cc_addresses = config["cc_addresses"]
@@ -133,12 +1784,12 @@ def main():
         print(f"Invalid sender email address: {from_address}")
         return
 
-    # Validate recipient email addresses
-    recipients = to_addresses + cc_addresses + bcc_addresses
-    for address in recipients:
-        if not validate_email_address_list(address):
-            print(f"Invalid recipient email address: {address}")
-            return
+    # Validate recipient email addresses (all at once, so every invalid one is reported), without duplicates
+    recipients, invalid_addresses = validator.validate(to_addresses + cc_addresses + bcc_addresses)
+    if invalid_addresses:
+        for address, error in invalid_addresses:
+            print(f"Invalid recipient email address: {address} ({error})")
+        return
 
     # Create the email message
     msg = MIMEText(body)
@@ -147,18 +1798,83 @@ def main():
     msg["To"] = ", ".join(to_addresses)
     msg["Cc"] = ", ".join(cc_addresses)
 
-    try:
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            if use_tls:
-                server.starttls()
-            if smtp_username and smtp_password:
-                server.login(smtp_username, smtp_password)
-            server.sendmail(from_address, recipients, msg.as_string())
+    # Serialize once, every envelope batch (and every retry from the spool) sends the same bytes
+    if spool is not None:
+        # The same message to the same recipients gets the same key, so running it again after a crash does not resend it
+        key = message_key(from_address, to_addresses, cc_addresses, sorted(recipients), subject, body)
+        msg["Message-ID"] = make_msgid()
+        message_id = spool.enqueue(key, from_address, recipients, serialize_message(msg))
+        if message_id is None:
+            message_id = spool.find(key)
+            print("This message was spooled already, delivering its pending recipients.")
+        spool.commit()
+        deliver_spool(spool, config, args, metrics)
+        failed = {
+            recipient: error
+            for recipient, (status, error) in spool.deliveries(message_id).items()
+            if status != "sent"
+        }
+    else:
+        pool = SMTPConnectionPool(config, max(1, args.pool_size), max(1, args.max_per_connection), metrics)
+        try:
+            results = send_in_batches(
+                pool,
+                from_address,
+                recipients,
+                serialize_message(msg),
+                max(1, args.batch_size),
+                max(0, args.retries),
+            )
+        finally:
+            pool.close()
+
+        failed = {}
+        for number, (batch, result) in enumerate(results, start=1):
+            errors = delivery_errors(batch, result)
+            if isinstance(result, Exception) and not isinstance(result, smtplib.SMTPRecipientsRefused):
+                print(f"Batch {number} of {len(results)} ({len(batch)} recipients) failed: {result}")
+            elif errors:
+                print(
+                    f"Batch {number} of {len(results)} ({len(batch)} recipients): {len(errors)} refused: "
+                    + ", ".join(f"{recipient} {error}" for recipient, error in errors.items())
+                )
+            failed.update(errors)
+
+    if not failed:
         print(
             f"Email sent successfully to {to_addresses} with CC to {cc_addresses} and BCC to {bcc_addresses}."
         )
-    except Exception as e:
-        print(f"Failed to send email: {e}")
+    elif len(failed) == len(recipients):
+        print(f"Failed to send email: {next(iter(failed.values()))}")
+    else:
+        print(
+            f"Email sent to {len(recipients) - len(failed)} of {len(recipients)} recipients, "
+            f"failed: {', '.join(failed)}."
+        )
+
+
+def main():
+    args = create_arg_parser().parse_args()
+    config = read_config()
+    print(f"Configuration loaded:{config}\n")
+
+    spool = Spool(args.spool) if args.spool else None
+    metrics_file = None
+    metrics = None
+    if args.metrics:
+        if args.metrics_format == "jsonl":
+            metrics_file = open(args.metrics, "a", encoding="utf-8")
+        metrics = SMTPMetrics(metrics_file)
+    try:
+        send_email(args, config, spool, metrics)
+    finally:
+        if spool is not None:
+            spool.close()
+        if metrics_file is not None:
+            metrics_file.close()
+        elif metrics is not None:
+            with open(args.metrics, "w", encoding="utf-8") as prometheus_file:
+                prometheus_file.write(metrics.prometheus_text())
 
 
 if __name__ == "__main__":
@@ -3,7 +3,7 @@
 A simple zodiac sign calculator in Python.
 
 Requirements:
-- Use pandas to handle CSV file operations.
+- Use the csv module to handle CSV file operations (pandas is only imported by batch mode, see Fast startup).
 - The user will be prompted to enter their NAME then their BIRTHDATE (in the format DD-MM).
 - Input validation
   * The NAME must be at least 2 characters long after trimming leading and trailing whitespace.
@@ -12,76 +12,328 @@ Requirements:
   * If name is invalid, display an error message: "Invalid input: Name must be at least 2 characters long."
   * If birthdate is invalid, display an error message: "Invalid input: Birthdate must be in the format DD-MM and represent a valid date."
 - The program will extract the month and day from the birthdate.
-- Use pandas to load the zodiac sign date ranges from a predefined CSV file named zodiac_signs.csv. This will be loaded into a DataFrame.
-- Based on the extracted month and day, the program will determine the corresponding Zodiac sign by comparing the date against the date ranges in the DataFrame.
+- Load the zodiac sign date ranges from a predefined CSV file named zodiac_signs.csv.
+- Based on the extracted month and day, the program will determine the corresponding Zodiac sign by comparing the date against the date ranges.
+  * The date ranges are compiled once at load time into a 366-entry day-of-year lookup table (29 February included), so
+    each lookup is a single index operation. Loading fails if the ranges leave a gap or overlap.
 - If a matching Zodiac sign is found, the program will output: "Hello {NAME}, your Zodiac sign is {ZODIAC_SIGN}."
 - If no matching sign is found, display an error message: "Could not determine Zodiac sign for the given birthdate."
-- The program will store the user's NAME, BIRTHDATE, and determined ZODIAC_SIGN in a CSV file named user_zodiac_signs.csv using pandas. If the file already exists, it will append the new entry; otherwise, it will create a new file with appropriate headers.
+- The program will store the user's NAME, BIRTHDATE, and determined ZODIAC_SIGN in a CSV file named user_zodiac_signs.csv using the csv module. If the file already exists, it will append the new entry; otherwise, it will create a new file with appropriate headers.
+  * The CSV file is append-only, with a persistent index of its (NAME, BIRTHDATE) keys in an SQLite sidecar file, so
+    saving an entry takes constant time however large the file grows. Compaction (automatic when duplicate or malformed
+    rows are found, or --compact) rewrites it as a clean CSV file.
 - If a record already exists for the same NAME and BIRTHDATE, it will not create a duplicate entry and will instead display: "Record for {NAME} with birthdate {BIRTHDATE} already exists."
 - Once the data is stored, display: "Your Zodiac sign information has been saved successfully."
+- Batch mode (--batch):
+  * Classify a CSV or Parquet file of (Name, Birth_Date) rows, parsing the DD-MM dates and assigning the signs for a
+    whole chunk of rows at once with NumPy operations against the lookup table, and write the results (CSV or Parquet).
+  * Process the input in chunks so memory stays bounded, and report the rows per second.
+- Fast startup:
+  * pandas and NumPy are only imported by batch mode, so the interactive mode and single lookups (--birthdate) start fast.
 - The program will repeat this workflow until the user decides to quit via CTRL+C.
 - When capturing any particular input then failure will only result in re-prompting for that specific input, not restarting the entire workflow.
 """
 
+import argparse
+import csv
+import hashlib
+import io
 import os
 import re
+import sqlite3
+import time
 from datetime import datetime
 
-import pandas as pd
+# The day of the year (0-based, in a leap year so 29 February has its own day) on which each month starts
+DAYS_BEFORE_MONTH = (0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335)
+DAYS_IN_YEAR = 366
+
+arg_defaults = {
+    "batch": None,
+    "output": None,
+    "chunk_size": 1_000_000,
+    "name_column": "Name",
+    "date_column": "Birth_Date",
+    "compact": False,
+    "birthdate": None,
+    "name": None,
+}
+
+
+def day_of_year(month, day):
+    """Returns the 0-based day of the year of a month and day, counting 29 February (as in a leap year)."""
+    return DAYS_BEFORE_MONTH[month - 1] + day - 1
+
+
+def format_day_of_year(day):
+    """Formats a 0-based day of the year as DD-MM."""
+    month = max(m for m in range(1, 13) if DAYS_BEFORE_MONTH[m - 1] <= day)
+    return f"{day - DAYS_BEFORE_MONTH[month - 1] + 1:02d}-{month:02d}"
 
 
 def load_zodiac_signs_dataset():
-    """Loads the zodiac signs and their date ranges from a CSV file into a Pandas DataFrame."""
+    """
+    Loads the zodiac signs and their date ranges from a CSV file with the csv module (a dozen rows do not need pandas).
+
+    :return: A list of dictionaries with the Sign, Start_Month, Start_Day, End_Month and End_Day of each sign.
+    """
     script_dir = os.path.dirname(os.path.abspath(__file__))
     csv_name = "zodiac_signs.csv"
     csv_path = os.path.join(script_dir, csv_name)
 
     try:
-        zodiac_signs_df = pd.read_csv(csv_path)
+        with open(csv_path, "r", newline="", encoding="utf-8") as csv_file:
+            zodiac_signs = list(csv.DictReader(csv_file))
     except FileNotFoundError:
         print("Zodiac signs data file not found.")
         raise
 
-    if zodiac_signs_df.empty:
+    if not zodiac_signs:
         print("Zodiac signs data file is empty.")
         raise ValueError("Empty zodiac signs data.")
 
-    return zodiac_signs_df
-
+    return zodiac_signs
+
+
+def format_zodiac_signs_dataset(zodiac_signs):
+    """Formats the zodiac signs as a table with aligned columns."""
+    columns = list(zodiac_signs[0])
+    widths = [max(len(column), *(len(str(row[column])) for row in zodiac_signs)) for column in columns]
+    lines = ["  ".join(column.rjust(width) for column, width in zip(columns, widths))]
+    for row in zodiac_signs:
+        lines.append("  ".join(str(row[column]).rjust(width) for column, width in zip(columns, widths)))
+    return "\n".join(lines)
+
+
+class ZodiacLookup:
+    """The zodiac signs' date ranges compiled into a day-of-year table, so finding a sign is a single index operation."""
+
+    def __init__(self, zodiac_signs):
+        """
+        Compiles the date ranges (which may wrap around the end of the year, e.g. Capricorn).
+
+        :param zodiac_signs: The zodiac signs (see load_zodiac_signs_dataset).
+        :raises ValueError: If a range is not a valid date range, or if the ranges leave a day uncovered or overlap.
+        """
+        self.signs = []
+        # The index into self.signs of the sign of each day of the year (-1 until a range covers the day)
+        self.table = [-1] * DAYS_IN_YEAR
+
+        for row in zodiac_signs:
+            sign = row["Sign"]
+            try:
+                start_month, start_day = int(row["Start_Month"]), int(row["Start_Day"])
+                end_month, end_day = int(row["End_Month"]), int(row["End_Day"])
+                # Validate both ends with the same leap year placeholder the birthdates are parsed with
+                datetime(1980, start_month, start_day)
+                datetime(1980, end_month, end_day)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid date range for {sign}.")
+            start = day_of_year(start_month, start_day)
+            end = day_of_year(end_month, end_day)
+            length = (end - start) % DAYS_IN_YEAR + 1
+
+            for day in (day % DAYS_IN_YEAR for day in range(start, start + length)):
+                if self.table[day] != -1:
+                    other = self.signs[self.table[day]]
+                    raise ValueError(f"The date ranges of {other} and {sign} overlap on {format_day_of_year(day)}.")
+                self.table[day] = len(self.signs)
+            self.signs.append(sign)
+
+        if -1 in self.table:
+            raise ValueError(f"No zodiac sign covers {format_day_of_year(self.table.index(-1))}.")
+
+    def find(self, month, day):
+        """Returns the zodiac sign of a month and day."""
+        return self.signs[self.table[day_of_year(month, day)]]
+
+
+class UserZodiacStore:
+    """
+    The users' zodiac signs: an append-only CSV file with a persistent index of its (Name, Birth_Date) keys in an SQLite
+    sidecar file, so saving a record (and checking it is not a duplicate) takes constant time instead of re-reading and
+    rewriting the whole file.
+
+    The index remembers how much of the CSV file it covers, so rows appended by a run which crashed before indexing
+    them (or by another program) are indexed when the store is opened. It also keeps a fingerprint of the start and
+    the end of the indexed part, so a file which was replaced or edited (even if it grew) is indexed again from the
+    start. Duplicates found then, and malformed rows, are removed by compacting the CSV file, which stays a plain CSV
+    file throughout.
+    """
+
+    FIELDS = ["Name", "Birth_Date", "Zodiac_Sign"]
+
+    # The bytes at the start and at the end of the indexed part of the CSV file which are fingerprinted
+    FINGERPRINT_BYTES = 4096
+
+    def __init__(self, csv_path):
+        """:param csv_path: The CSV file (created with a header row on the first save)."""
+        self.csv_path = csv_path
+        self.index_path = os.path.splitext(csv_path)[0] + ".index.sqlite3"
+        self.db = sqlite3.connect(self.index_path)
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                name TEXT NOT NULL,
+                birth_date TEXT NOT NULL,
+                PRIMARY KEY (name, birth_date)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            """
+        )
+        self.db.commit()
+        self.stale_rows = self.catch_up()
+
+    def meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def fingerprint(self, size):
+        """Returns a hash of the first and last bytes of the first 'size' bytes of the CSV file (header and last rows)."""
+        digest = hashlib.blake2b(str(size).encode("ascii"), digest_size=16)
+        if size > 0:
+            with open(self.csv_path, "rb") as csv_file:
+                digest.update(csv_file.read(min(size, self.FINGERPRINT_BYTES)))
+                csv_file.seek(max(0, size - self.FINGERPRINT_BYTES))
+                digest.update(csv_file.read(size - csv_file.tell()))
+        return digest.hexdigest()
+
+    def mark_indexed(self, size):
+        """Records that the index covers the first 'size' bytes of the CSV file and their fingerprint (the caller commits)."""
+        self.set_meta("csv_size", size)
+        self.set_meta("csv_fingerprint", self.fingerprint(size))
+
+    def csv_size(self):
+        try:
+            return os.path.getsize(self.csv_path)
+        except FileNotFoundError:
+            return 0
+
+    def read_rows(self, offset=0):
+        """Reads the CSV rows from a byte offset (at the start of a line), skipping the header row."""
+        with open(self.csv_path, "rb") as csv_file:
+            csv_file.seek(offset)
+            reader = csv.reader(io.TextIOWrapper(csv_file, encoding="utf-8", newline=""))
+            if offset == 0:
+                next(reader, None)
+            yield from reader
+
+    def catch_up(self):
+        """
+        Indexes the rows appended to the CSV file since it was last indexed (all of them if the file was replaced).
+
+        :return: The number of duplicate or malformed rows found, which compact() removes.
+        """
+        indexed_size = self.meta("csv_size")
+        size = self.csv_size()
+        if size < indexed_size or self.fingerprint(min(size, indexed_size)) != self.meta("csv_fingerprint"):
+            # The file was replaced, truncated or edited, so index it from the start
+            self.db.execute("DELETE FROM users")
+            indexed_size = 0
+            self.set_meta("stale_rows", 0)
+        elif size == indexed_size:
+            return self.meta("stale_rows")
+
+        stale_rows = self.meta("stale_rows")
+        if size > 0:
+            for row in self.read_rows(indexed_size):
+                if len(row) != len(self.FIELDS):
+                    stale_rows += 1
+                    continue
+                cursor = self.db.execute(
+                    "INSERT OR IGNORE INTO users (name, birth_date) VALUES (?, ?)", (row[0], row[1])
+                )
+                stale_rows += 1 - cursor.rowcount
+        self.mark_indexed(size)
+        self.set_meta("stale_rows", stale_rows)
+        self.db.commit()
+        return stale_rows
+
+    def contains(self, name, birth_date):
+        return (
+            self.db.execute(
+                "SELECT 1 FROM users WHERE name = ? AND birth_date = ?", (name, birth_date)
+            ).fetchone()
+            is not None
+        )
 
-def write_user_zodiac_sign_dataset(name, birthdate, zodiac_sign):
-    """Writes the user's zodiac sign information to a CSV file via Pandas."""
+    def append(self, name, birth_date, zodiac_sign):
+        """
+        Appends a record unless one already exists for the name and birthdate.
+
+        :return: True if the record was saved, False if it is a duplicate.
+        """
+        if self.contains(name, birth_date):
+            return False
+        new_file = self.csv_size() == 0
+        with open(self.csv_path, "a", newline="", encoding="utf-8") as csv_file:
+            writer = csv.writer(csv_file, lineterminator="\n")
+            if new_file:
+                writer.writerow(self.FIELDS)
+            writer.writerow([name, birth_date, zodiac_sign])
+        self.db.execute("INSERT INTO users (name, birth_date) VALUES (?, ?)", (name, birth_date))
+        self.mark_indexed(self.csv_size())
+        self.db.commit()
+        return True
+
+    def compact(self):
+        """
+        Rewrites the CSV file without duplicate (keeping the first record) and malformed rows, atomically,
+        and rebuilds the index.
+
+        :return: The number of rows removed.
+        """
+        if self.csv_size() == 0:
+            return 0
+        seen = set()
+        removed = 0
+        temp_path = self.csv_path + ".compact"
+        with open(temp_path, "w", newline="", encoding="utf-8") as temp_file:
+            writer = csv.writer(temp_file, lineterminator="\n")
+            writer.writerow(self.FIELDS)
+            for row in self.read_rows():
+                key = tuple(row[:2])
+                if len(row) != len(self.FIELDS) or key in seen:
+                    removed += 1
+                    continue
+                seen.add(key)
+                writer.writerow(row)
+        os.replace(temp_path, self.csv_path)
+
+        self.db.execute("DELETE FROM users")
+        self.db.executemany("INSERT INTO users (name, birth_date) VALUES (?, ?)", seen)
+        self.mark_indexed(self.csv_size())
+        self.set_meta("stale_rows", 0)
+        self.db.commit()
+        self.stale_rows = 0
+        return removed
+
+    def close(self):
+        self.db.close()
+
+
+def open_user_zodiac_store():
+    """Opens the users' zodiac signs store (user_zodiac_signs.csv in the script directory), compacting it if needed."""
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    csv_name = "user_zodiac_signs.csv"
-    csv_path = os.path.join(script_dir, csv_name)
-
-    birthdate_dd_mm = birthdate.strftime("%d-%m")
-
-    user_data = {
-        "Name": [name],
-        "Birth_Date": [birthdate_dd_mm],
-        "Zodiac_Sign": [zodiac_sign],
-    }
-    user_df = pd.DataFrame(user_data)
-
-    try:
-        existing_df = pd.read_csv(csv_path)
+    store = UserZodiacStore(os.path.join(script_dir, "user_zodiac_signs.csv"))
+    if store.stale_rows:
+        removed = store.compact()
+        print(f"Compacted '{os.path.basename(store.csv_path)}': removed {removed} duplicate or malformed rows.")
+    return store
 
-        # Check for duplicates
-        duplicate = existing_df[
-            (existing_df["Name"] == name)
-            & (existing_df["Birth_Date"] == birthdate_dd_mm)
-        ]
 
-        if not duplicate.empty:
-            print(f"Record for {name} with birthdate {birthdate_dd_mm} already exists.")
-            return
+def write_user_zodiac_sign_dataset(user_store, name, birthdate, zodiac_sign):
+    """Appends the user's zodiac sign information to the users' zodiac signs store."""
+    birthdate_dd_mm = birthdate.strftime("%d-%m")
 
-        updated_df = pd.concat([existing_df, user_df], ignore_index=True)
-        updated_df.to_csv(csv_path, index=False)
-    except FileNotFoundError:
-        user_df.to_csv(csv_path, index=False)
+    if not user_store.append(name, birthdate_dd_mm, zodiac_sign):
+        print(f"Record for {name} with birthdate {birthdate_dd_mm} already exists.")
+        return
 
+    csv_name = os.path.basename(user_store.csv_path)
     print(f"Your Zodiac sign information has been saved successfully to '{csv_name}'.")
 
 
@@ -107,7 +359,12 @@ def repeat_capture_name():
 
 def capture_birthdate():
     """Captures and validates the user's birthdate input."""
-    birthdate_input = input("Enter your BIRTHDATE (DD-MM): ").strip()
+    return parse_birthdate(input("Enter your BIRTHDATE (DD-MM): "))
+
+
+def parse_birthdate(birthdate_input):
+    """Validates and parses a DD-MM birthdate, displaying an error message and returning None if it is invalid."""
+    birthdate_input = birthdate_input.strip()
     try:
         # Make sure the format is DD-MM using a regular expression
         if not re.match(r"^\d{2}-\d{2}$", birthdate_input):
@@ -137,73 +394,295 @@ def repeat_capture_birthdate():
     return birthdate
 
 
-def find_zodiac_sign(birthdate: datetime, zodiac_signs_df: pd.DataFrame):
-    """Finds the zodiac sign for the given birthdate using the zodiac signs DataFrame."""
-    for _, row in zodiac_signs_df.iterrows():
-        start_month = row["Start_Month"]
-        start_day = row["Start_Day"]
-        end_month = row["End_Month"]
-        end_day = row["End_Day"]
-        birth_month = birthdate.month
-        birth_day = birthdate.day
-
-        # Handle date ranges that span the end of the year
-        if start_month > end_month:  # Wraps around year end (e.g., Capricorn)
-            if birth_month >= start_month or birth_month <= end_month:
-                if (
-                    (birth_month == start_month and birth_day >= start_day)
-                    or (birth_month == end_month and birth_day <= end_day)
-                    or (birth_month > start_month or birth_month < end_month)
-                ):
-                    return row["Sign"]
-        else:  # Normal range within same year
-            if start_month <= birth_month <= end_month:
-                if (
-                    (birth_month == start_month and birth_day >= start_day)
-                    or (birth_month == end_month and birth_day <= end_day)
-                    or (start_month < birth_month < end_month)
-                ):
-                    return row["Sign"]
-    return None
-
-
-def zodiac_sign_capture(zodiac_signs_df: pd.DataFrame):
+def find_zodiac_sign(birthdate: datetime, zodiac_lookup: ZodiacLookup):
+    """Finds the zodiac sign for the given birthdate using the compiled zodiac lookup table."""
+    return zodiac_lookup.find(birthdate.month, birthdate.day)
+
+
+def parse_birthdates(birth_dates):
+    """
+    Parses DD-MM birthdates to days of the year in vectorized form.
+
+    :param birth_dates: A sequence of birthdate strings (missing values are invalid).
+    :return: A NumPy array with the 0-based day of the year of each birthdate, -1 where it is not a valid DD-MM date.
+    """
+    import numpy as np
+
+    values = np.asarray(birth_dates, dtype=object)
+    try:
+        # Fixed width bytes, so the characters of all the dates can be checked as one uint8 matrix
+        raw = values.astype("S")
+    except UnicodeEncodeError:
+        raw = np.array([str(value).encode("ascii", "replace") for value in values], dtype="S")
+    if raw.dtype.itemsize < 5:
+        return np.full(len(values), -1, dtype=np.int16)
+    chars = raw.view(np.uint8).reshape(len(raw), raw.dtype.itemsize)
+
+    digits = chars[:, [0, 1, 3, 4]].astype(np.int16) - ord("0")
+    day = digits[:, 0] * 10 + digits[:, 1]
+    month = digits[:, 2] * 10 + digits[:, 3]
+    month_index = np.clip(month - 1, 0, 11)
+    days_before = np.asarray(DAYS_BEFORE_MONTH + (DAYS_IN_YEAR,), dtype=np.int16)
+    valid = (
+        ((digits >= 0) & (digits <= 9)).all(axis=1)
+        & (chars[:, 2] == ord("-"))
+        # Exactly 5 characters: shorter values are padded with NUL bytes
+        & (chars[:, 5:] == 0).all(axis=1)
+        & (month >= 1)
+        & (month <= 12)
+        & (day >= 1)
+        & (day <= days_before[month_index + 1] - days_before[month_index])
+    )
+    return np.where(valid, days_before[month_index] + day - 1, -1).astype(np.int16)
+
+
+def read_birthdate_chunks(path, columns, chunk_size):
+    """
+    Reads the columns of a CSV or Parquet file in chunks of rows, so large files are processed in bounded memory.
+
+    :return: A generator of DataFrames with the columns as strings.
+    """
+    import pandas as pd
+
+    if path.lower().endswith(".parquet"):
+        # pyarrow is only needed for Parquet files
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(
+            path,
+            usecols=columns,
+            dtype=str,
+            keep_default_na=False,
+            chunksize=chunk_size,
+        )
+
+
+def classify_birthdates_file(input_path, output_path, zodiac_lookup, chunk_size, name_column, date_column):
+    """
+    Assigns the zodiac sign of every row of a CSV or Parquet file and writes the rows with a Zodiac_Sign column
+    (empty where the birthdate is invalid) to a CSV or Parquet file, chunk by chunk.
+
+    :return: Tuple (rows, invalid_rows, elapsed_seconds).
+    """
+    # pandas and NumPy are only needed here, importing them on startup would slow down every single lookup
+    import numpy as np
+    import pandas as pd
+
+    columns = [name_column, date_column]
+    signs = pd.Index(zodiac_lookup.signs)
+    table = np.asarray(zodiac_lookup.table, dtype=np.int16)
+    parquet_writer = None
+    rows = 0
+    invalid_rows = 0
+    started = time.perf_counter()
+    try:
+        for chunk in read_birthdate_chunks(input_path, columns, chunk_size):
+            days = parse_birthdates(chunk[date_column].to_numpy())
+            codes = np.where(days >= 0, table[days], -1)
+            invalid_rows += int((codes < 0).sum())
+            chunk = chunk[columns].assign(Zodiac_Sign=pd.Categorical.from_codes(codes, categories=signs))
+
+            if output_path.lower().endswith(".parquet"):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                arrow_table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if parquet_writer is None:
+                    parquet_writer = pq.ParquetWriter(output_path, arrow_table.schema)
+                parquet_writer.write_table(arrow_table)
+            else:
+                chunk.to_csv(output_path, mode="w" if rows == 0 else "a", header=rows == 0, index=False)
+            rows += len(chunk)
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+    return rows, invalid_rows, time.perf_counter() - started
+
+
+def zodiac_sign_capture(zodiac_lookup: ZodiacLookup, user_store: UserZodiacStore):
     """Captures user input for name and birthdate, determines zodiac sign, and stores the information."""
     print("-----------------------------")
     name = repeat_capture_name()
     birthdate = repeat_capture_birthdate()
-    zodiac_sign = find_zodiac_sign(birthdate, zodiac_signs_df)
+    zodiac_sign = find_zodiac_sign(birthdate, zodiac_lookup)
 
     if zodiac_sign:
         print(f"\nHello {name}, your Zodiac sign is {zodiac_sign}.")
-        write_user_zodiac_sign_dataset(name, birthdate, zodiac_sign)
+        write_user_zodiac_sign_dataset(user_store, name, birthdate, zodiac_sign)
     else:
         print("\nCould not determine Zodiac sign for the given birthdate.")
 
 
+def run_batch(args):
+    """Classifies the --batch file and reports the rows per second."""
+    output_path = args.output
+    if not output_path:
+        root, ext = os.path.splitext(args.batch)
+        output_path = f"{root}_zodiac_signs{ext or '.csv'}"
+
+    try:
+        zodiac_lookup = ZodiacLookup(load_zodiac_signs_dataset())
+        rows, invalid_rows, elapsed = classify_birthdates_file(
+            args.batch,
+            output_path,
+            zodiac_lookup,
+            max(1, args.chunk_size),
+            args.name_column,
+            args.date_column,
+        )
+    except ImportError:
+        print("Parquet files need pyarrow (pip install pyarrow).")
+        return
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Failed to classify '{args.batch}': {e}")
+        return
+
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(
+        f"Classified {rows} rows ({invalid_rows} with an invalid birthdate) in {elapsed:.2f}s "
+        f"({rate:,.0f} rows/s), saved to '{output_path}'."
+    )
+
+
+def run_single_lookup(args):
+    """Determines the zodiac sign of --birthdate (and saves it for --name), without the interactive prompts."""
+    birthdate = parse_birthdate(args.birthdate)
+    if birthdate is None:
+        return
+    name = args.name.strip() if args.name is not None else None
+    if name is not None and len(name) < 2:
+        print("Invalid input: Name must be at least 2 characters long.")
+        return
+
+    try:
+        zodiac_lookup = ZodiacLookup(load_zodiac_signs_dataset())
+    except Exception as e:
+        print(f"Failed to load zodiac signs data: {e}")
+        return
+    zodiac_sign = find_zodiac_sign(birthdate, zodiac_lookup)
+
+    if name is None:
+        print(f"Your Zodiac sign is {zodiac_sign}.")
+        return
+    print(f"Hello {name}, your Zodiac sign is {zodiac_sign}.")
+    user_store = open_user_zodiac_store()
+    try:
+        write_user_zodiac_sign_dataset(user_store, name, birthdate, zodiac_sign)
+    finally:
+        user_store.close()
+
+
+def create_arg_parser() -> argparse.ArgumentParser:
+    """
+    Creates and returns the argument parser for command-line arguments.
+
+    Returns:
+        argparse.ArgumentParser: The argument parser.
+    """
+    parser = argparse.ArgumentParser(
+        description="Determine Zodiac signs interactively, or for a whole file of birthdates with --batch."
+    )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        help="A CSV or Parquet file of names and DD-MM birthdates to classify instead of prompting. Default is interactive mode.",
+        default=arg_defaults["batch"],
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="The CSV or Parquet file the --batch results are written to. Default is the input name with a '_zodiac_signs' suffix.",
+        default=arg_defaults["output"],
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        help=f"The number of rows classified at once in --batch mode. Default is {arg_defaults['chunk_size']}.",
+        default=arg_defaults["chunk_size"],
+    )
+    parser.add_argument(
+        "--name_column",
+        type=str,
+        help=f"The name column of the --batch file. Default is '{arg_defaults['name_column']}'.",
+        default=arg_defaults["name_column"],
+    )
+    parser.add_argument(
+        "--date_column",
+        type=str,
+        help=f"The DD-MM birthdate column of the --batch file. Default is '{arg_defaults['date_column']}'.",
+        default=arg_defaults["date_column"],
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Rewrite user_zodiac_signs.csv without duplicate or malformed rows and rebuild its index, then exit.",
+        default=arg_defaults["compact"],
+    )
+    parser.add_argument(
+        "--birthdate",
+        type=str,
+        help="Determine the zodiac sign of this DD-MM birthdate and exit, without prompting (and without pandas). Default is interactive mode.",
+        default=arg_defaults["birthdate"],
+    )
+    parser.add_argument(
+        "--name",
+        type=str,
+        help="With --birthdate, also save the sign for this name to user_zodiac_signs.csv.",
+        default=arg_defaults["name"],
+    )
+    return parser
+
+
 def main():
+    args = create_arg_parser().parse_args()
+    if args.batch:
+        run_batch(args)
+        return
+    if args.birthdate is not None:
+        run_single_lookup(args)
+        return
+    if args.compact:
+        user_store = open_user_zodiac_store()
+        removed = user_store.compact()
+        user_store.close()
+        print(f"Compacted '{os.path.basename(user_store.csv_path)}': removed {removed} duplicate or malformed rows.")
+        return
+
     print("Welcome to Zodiac Sign Calculator!\n")
     print("\nPress CTRL+C at any point to quit.")
 
     try:
-        zodiac_signs_df = load_zodiac_signs_dataset()
+        zodiac_signs = load_zodiac_signs_dataset()
+        zodiac_lookup = ZodiacLookup(zodiac_signs)
     except Exception as e:
         print(f"Failed to load zodiac signs data: {e}")
         return
 
+    try:
+        user_store = open_user_zodiac_store()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Failed to open the user zodiac signs store: {e}")
+        return
+
     print("\nZodiac Sign Data Loaded Successfully")
     print("Zodiac Signs Dataset:")
-    print(zodiac_signs_df)
+    print(format_zodiac_signs_dataset(zodiac_signs))
 
-    while True:
-        try:
-            zodiac_sign_capture(zodiac_signs_df)
-        except KeyboardInterrupt:
-            print("\nGoodbye!")
-            break
-        except Exception as e:
-            print(f"An unexpected error occurred: {e}")
-            return
+    try:
+        while True:
+            try:
+                zodiac_sign_capture(zodiac_lookup, user_store)
+            except KeyboardInterrupt:
+                print("\nGoodbye!")
+                break
+            except Exception as e:
+                print(f"An unexpected error occurred: {e}")
+                return
+    finally:
+        user_store.close()
 
 
 if __name__ == "__main__":
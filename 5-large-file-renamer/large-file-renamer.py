@@ -7,21 +7,102 @@ Requirements:
   * --in_dir: The path to the directory containing files to rename.
   * --out_dir: The path to the directory where renamed files will be saved.
   * --pattern: The renaming pattern. Use {name} for original name, {ext} for extension, and {num} for a sequential number.
+    Also {size} for the size in bytes, {date} for the modification date and {hash} for a content hash prefix (each accepts a format spec, e.g. {num:06}).
+  * --jobs: The number of files to copy in parallel.
+  * --resume: Resume an interrupted run using the journal kept in the output directory.
+  * --recursive: Also rename files in sub-directories, keeping the directory layout in the output directory.
+  * --skip_unchanged: Skip files whose copy in the output directory is unchanged.
+  * --dedupe: Link files whose content already exists in the output directory instead of copying them (identical files
+    copied in parallel are copied once, the others wait for that copy and link to it).
+  * --digest: The content digest (blake2b or xxhash) computed during the copy and used to compare files.
+  * --dry_run: Print and check the rename plan without copying any files.
 - The program should create a COPY of the original files with the new names in a specified output directory.
 - The new names should follow the specified pattern, replacing the placeholders with the appropriate values.
+  * The pattern is compiled and checked once, and the whole plan is checked for name collisions before any bytes are copied.
 - The program should handle large files efficiently, ensuring that it does not load the entire file into memory at once.
+  * Copies are done inside the kernel where possible (reflink clone, copy_file_range, sendfile) with a chunked read/write fallback.
+  * Files are copied on a bounded pool of worker threads and the per-file and total throughput is reported.
+- The program should handle huge input directories efficiently.
+  * The directory is scanned lazily via os.scandir, once to check the plan and once more while copying, so memory use
+    only grows by the map of checked destinations. Files whose new name differs from the checked plan when they are
+    copied (e.g. a file appeared or disappeared in between) are skipped.
+- Repeated runs should not copy the same bytes again.
+  * Unchanged files (same size and mtime, or same content digest) can be skipped.
+  * Files whose content already exists in the output directory can be reflinked or hardlinked instead.
+  * Content digests are kept in an index keyed by (device, inode, size, mtime) so unchanged files are never re-hashed.
+- The program should be able to resume an interrupted run without copying everything again.
+  * Each completed copy is recorded in a journal in the output directory as a (source, size, mtime, destination) tuple.
+  * Large files commit their progress to the journal periodically, so a half-copied file continues from its last committed offset.
 - The program should handle errors gracefully, such as invalid directory paths or permission issues.
 - For security reasons the the program should not allow directory traversal outside of the specified input directory. This applies to be input and output directories.
 """
 
 import argparse
+import errno
+import hashlib
 import json
 import os
+import string
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+try:
+    import xxhash
+except ImportError:  # Optional, blake2b from hashlib is used instead
+    xxhash = None
 
 arg_defaults = {
     "in_dir": "./sample_files",
     "out_dir": "./renamed_sample_files",
     "pattern": "renamed_{num}_{name}.{ext}",
+    "jobs": 4,
+    "resume": False,
+    "recursive": False,
+    "skip_unchanged": False,
+    "dedupe": False,
+    "digest": None,
+    "dry_run": False,
+}
+
+# Read and write in chunks of 1MB when falling back to a user-space copy
+CHUNK_SIZE = 1024 * 1024
+
+# How often (in bytes) the progress of a large copy is synced to disk and committed to the journal
+COMMIT_INTERVAL = 256 * 1024 * 1024
+
+# The journal file written to the output directory, used to resume an interrupted run
+JOURNAL_NAME = ".large-file-renamer-journal.jsonl"
+
+# The digest index written to the output directory (one per digest algorithm), used to avoid re-hashing unchanged files
+DIGEST_INDEX_NAME = ".large-file-renamer-digests-{algorithm}.jsonl"
+
+# The placeholders supported in rename patterns
+PATTERN_FIELDS = {"name", "ext", "num", "size", "date", "hash"}
+
+# The number of dry run plan lines written to stdout at once
+DRY_RUN_BATCH = 10000
+
+# Linux ioctl request number for cloning a whole file (reflink) on CoW filesystems (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+# Errors which mean "this copy method is not supported here", so the next method should be tried
+FALLBACK_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.ENOTTY,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EBADF,
+    errno.EPERM,
 }
 
 
@@ -47,31 +128,1017 @@ def create_safe_path_abs(root_dir, path) -> str:
     return abs_path
 
 
-def copy_file(src_path, dst_path):
+# Serialises output from the copy worker threads so lines do not interleave
+print_lock = threading.Lock()
+
+
+def log(message):
+    """
+    Prints a message from any thread without interleaving it with output from other threads.
+    """
+    with print_lock:
+        print(message)
+
+
+def format_bytes(num_bytes) -> str:
+    """
+    Formats a number of bytes as a human readable string (e.g. 1.5 GB).
+    """
+    size = float(num_bytes)
+    for unit in ["B", "KB", "MB", "GB", "TB"]:
+        if size < 1024 or unit == "TB":
+            break
+        size /= 1024
+    return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+
+
+def format_rate(num_bytes, seconds) -> str:
+    """
+    Formats a throughput as a human readable string (e.g. 250.0 MB/s).
+    """
+    if seconds <= 0:
+        return "n/a"
+    return f"{format_bytes(num_bytes / seconds)}/s"
+
+
+def clone_file(src_fd, dst_fd):
+    """
+    Clones the whole source file into the destination via a reflink (copy-on-write, no data is copied).
+    Raises OSError if the filesystem does not support it.
+    """
+    if fcntl is None:
+        raise OSError(errno.ENOSYS, "Reflinks are not supported on this platform")
+    fcntl.ioctl(dst_fd, FICLONE, src_fd)
+
+
+def copy_range_kernel(src_fd, dst_fd, offset, size) -> int:
+    """
+    Copies bytes from offset to size inside the kernel via os.copy_file_range.
+
+    Returns:
+        int: The offset reached, which equals size unless the source shrank during the copy.
+
+    Raises:
+        OSError: If the copy fails, with the offset reached so far as its 'offset' attribute.
     """
-    Copies a file by reading and writing in binary chunks.
+    if not hasattr(os, "copy_file_range"):
+        raise OSError(errno.ENOSYS, "os.copy_file_range is not available")
+    try:
+        while offset < size:
+            copied = os.copy_file_range(
+                src_fd, dst_fd, size - offset, offset_src=offset, offset_dst=offset
+            )
+            if copied == 0:
+                break
+            offset += copied
+    except OSError as e:
+        e.offset = offset
+        raise
+    return offset
+
+
+def copy_range_sendfile(src_fd, dst_fd, offset, size) -> int:
     """
+    Copies bytes from offset to size inside the kernel via os.sendfile.
+
+    Returns:
+        int: The offset reached, which equals size unless the source shrank during the copy.
+
+    Raises:
+        OSError: If the copy fails, with the offset reached so far as its 'offset' attribute.
+    """
+    if not hasattr(os, "sendfile"):
+        raise OSError(errno.ENOSYS, "os.sendfile is not available")
     try:
-        with open(src_path, "rb") as src_file, open(dst_path, "wb") as dst_file:
-            # Read and write in chunks of 1MB
-            chunk_size = 1024 * 1024
-            while True:
-                chunk = src_file.read(chunk_size)
-                if not chunk:
-                    break
-                dst_file.write(chunk)
-        print("File copied successfully.")
+        os.lseek(dst_fd, offset, os.SEEK_SET)
+        while offset < size:
+            sent = os.sendfile(dst_fd, src_fd, offset, min(size - offset, 1 << 30))
+            if sent == 0:
+                break
+            offset += sent
+    except OSError as e:
+        e.offset = offset
+        raise
+    return offset
+
+
+def copy_range_chunked(src_fd, dst_fd, offset, size, hasher=None) -> int:
+    """
+    Copies bytes from offset to size by reading and writing in binary chunks (works everywhere).
+    If a hasher is given, the data is also fed to it as it is copied.
+
+    Returns:
+        int: The offset reached, which equals size unless the source shrank during the copy.
+    """
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(src_fd, "rb", buffering=0, closefd=False) as src_file:
+        while offset < size:
+            read = src_file.readinto(view[: min(CHUNK_SIZE, size - offset)])
+            if not read:
+                break
+            if hasher is not None:
+                hasher.update(view[:read])
+            written = 0
+            while written < read:
+                written += os.write(dst_fd, view[written:read])
+            offset += read
+    return offset
+
+
+def new_hasher(algorithm):
+    """
+    Creates a streaming content hash for the given digest algorithm ('blake2b' or 'xxhash').
+    """
+    if algorithm == "xxhash":
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=20)
+
+
+def hash_range(fd, offset, size, hasher):
+    """
+    Feeds the bytes from offset to size of an open file into a hasher.
+    """
+    os.lseek(fd, offset, os.SEEK_SET)
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(fd, "rb", buffering=0, closefd=False) as src_file:
+        while offset < size:
+            read = src_file.readinto(view[: min(CHUNK_SIZE, size - offset)])
+            if not read:
+                break
+            hasher.update(view[:read])
+            offset += read
+
+
+def hash_file(path, algorithm) -> str:
+    """
+    Computes the content digest of a file without loading it into memory.
+    """
+    hasher = new_hasher(algorithm)
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        hash_range(fd, 0, os.fstat(fd).st_size, hasher)
+    finally:
+        os.close(fd)
+    return hasher.hexdigest()
+
+
+def link_file(existing_path, dst_path, verify=None):
+    """
+    Makes dst_path share the content of existing_path without copying any bytes,
+    via a reflink clone where the filesystem supports it, otherwise via a hardlink.
+
+    Args:
+        existing_path (str): The file whose content is shared.
+        dst_path (str): The file to create (or replace).
+        verify (callable): Called with the os.stat_result of the file that was actually linked, returns whether it
+            is still the expected version. existing_path may be replaced by another worker at any moment.
+
+    Returns:
+        str: The link method used ('reflink' or 'hardlink'), or None if verify rejected the file (dst_path is unchanged).
+    """
+    tmp_path = dst_path + ".dedupe-tmp"
+    try:
+        src_fd = os.open(existing_path, os.O_RDONLY)
+        try:
+            if verify is not None and not verify(os.fstat(src_fd)):
+                return None
+            dst_fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                clone_file(src_fd, dst_fd)
+            finally:
+                os.close(dst_fd)
+        finally:
+            os.close(src_fd)
+        method = "reflink"
+    except OSError as e:
+        if e.errno not in FALLBACK_ERRNOS:
+            raise
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        os.link(existing_path, tmp_path)
+        if verify is not None and not verify(os.stat(tmp_path)):
+            os.remove(tmp_path)
+            return None
+        method = "hardlink"
+    os.replace(tmp_path, dst_path)
+    return method
+
+
+def copy_file_data(
+    src_path, dst_path, offset=0, on_progress=None, hasher=None
+) -> dict:
+    """
+    Copies a file using the fastest method the platform and filesystem support.
+    Methods are tried in order: reflink clone, copy_file_range, sendfile, then the chunked read/write loop.
+    A copy from offset 0 replaces the destination with a new file, so files hardlinked to it are left unchanged.
+    A method that is not supported hands over to the next one from the offset it reached.
+    When a content digest is wanted the data has to pass through user space, so only the chunked loop is used.
+
+    Args:
+        src_path (str): The file to copy.
+        dst_path (str): The file to write.
+        offset (int): Continue a partial copy from this byte offset instead of starting again at byte 0.
+        on_progress (callable): Called with each committed offset (data up to it is synced to disk)
+            every COMMIT_INTERVAL bytes.
+        hasher (hashlib hash): Streams the copied data into this hash (see new_hasher).
+
+    Returns:
+        dict: The number of bytes copied, the time taken in seconds, the copy method used,
+            the size and mtime of the source that was copied, plus its digest if a hasher was given.
+    """
+    started = time.perf_counter()
+    src_fd = os.open(src_path, os.O_RDONLY)
+    try:
+        src_stat = os.fstat(src_fd)
+        size = src_stat.st_size
+        offset = min(offset, size)
+        try:
+            # A destination hardlinked by --dedupe shares its inode with another output file
+            if offset and os.stat(dst_path).st_nlink > 1:
+                offset = 0
+            if offset == 0:
+                # Write a new inode instead of truncating the old one in place, which would also change its links
+                os.unlink(dst_path)
+        except FileNotFoundError:
+            offset = 0
+        flags = os.O_WRONLY | os.O_CREAT
+        if offset == 0:
+            flags |= os.O_TRUNC
+        dst_fd = os.open(dst_path, flags, 0o644)
+        try:
+            start = offset
+            method = None
+
+            copy_methods = [
+                ("copy_file_range", copy_range_kernel),
+                ("sendfile", copy_range_sendfile),
+                ("chunked", copy_range_chunked),
+            ]
+            if hasher is not None:
+                # The part copied by an earlier run still has to be hashed
+                hash_range(src_fd, 0, offset, hasher)
+                copy_methods = [
+                    (
+                        "chunked",
+                        lambda src, dst, start, end: copy_range_chunked(
+                            src, dst, start, end, hasher
+                        ),
+                    )
+                ]
+            elif offset == 0 and size > 0:
+                try:
+                    clone_file(src_fd, dst_fd)
+                    offset = size
+                    method = "reflink"
+                except OSError as e:
+                    if e.errno not in FALLBACK_ERRNOS:
+                        raise
+
+            while method is None or offset < size:
+                end = size
+                if on_progress is not None:
+                    end = min(size, offset + COMMIT_INTERVAL)
+
+                name, copy_range = copy_methods[0]
+                try:
+                    reached = copy_range(src_fd, dst_fd, offset, end)
+                except OSError as e:
+                    if e.errno not in FALLBACK_ERRNOS or len(copy_methods) == 1:
+                        raise
+                    # The next method continues from the offset the failed one reached
+                    offset = getattr(e, "offset", offset)
+                    copy_methods.pop(0)
+                    continue
+
+                method = name
+                if reached == offset:
+                    break  # The source shrank while it was being copied
+                offset = reached
+
+                if on_progress is not None and offset < size:
+                    os.fsync(dst_fd)
+                    on_progress(offset)
+
+            os.ftruncate(dst_fd, offset)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+    return {
+        "bytes": offset - start,
+        "seconds": time.perf_counter() - started,
+        "method": method,
+        "size": size,
+        "mtime_ns": src_stat.st_mtime_ns,
+        "digest": hasher.hexdigest() if hasher is not None else None,
+    }
+
+
+def copy_file(src_path, dst_path, offset=0, on_progress=None, hasher=None):
+    """
+    Copies a file and reports the throughput achieved.
+
+    Returns:
+        dict: The copy result (see copy_file_data), or None if the copy failed.
+    """
+    try:
+        result = copy_file_data(src_path, dst_path, offset, on_progress, hasher)
+        log(
+            f"File copied successfully: {os.path.basename(dst_path)} "
+            f"({format_bytes(result['bytes'])} in {result['seconds']:.3f}s, "
+            f"{format_rate(result['bytes'], result['seconds'])} via {result['method']})."
+        )
+        return result
     except FileNotFoundError:
-        print(f"Error: The file at {src_path} was not found.")
+        log(f"Error: The file at {src_path} was not found.")
     except PermissionError:
-        print(
+        log(
             "Error: You do not have permission to read the source or write to the destination."
         )
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+        log(f"An unexpected error occurred: {e}")
+    return None
+
+
+class Journal:
+    """
+    An append-only JSON lines journal kept in the output directory which records every completed copy
+    as a (source, size, mtime, destination) tuple, plus the last committed offset of partially copied files,
+    so an interrupted batch can be resumed.
+    """
+
+    def __init__(self, path, resume=False):
+        """
+        Opens the journal. When resuming, the existing entries are loaded (and compacted), otherwise the journal starts empty.
+
+        Args:
+            path (str): The journal file path.
+            resume (bool): Whether to keep and load the entries of a previous run.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.done = {}
+        self.partial = {}
+
+        if resume and os.path.exists(path):
+            self.load()
+            self.compact()
+
+        self.file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def load(self):
+        """
+        Loads the journal entries, keeping the latest entry per source file.
+        """
+        with open(self.path, "r", encoding="utf-8") as journal_file:
+            for line in journal_file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A torn final line from an interrupted run
+
+                source = entry.get("source")
+                if entry.get("event") == "done":
+                    self.done[source] = entry
+                    self.partial.pop(source, None)
+                elif entry.get("event") == "partial":
+                    self.partial[source] = entry
+
+    def compact(self):
+        """
+        Rewrites the journal with only the latest entry per source file, dropping superseded partial offsets.
+        """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as journal_file:
+            for entry in list(self.done.values()) + list(self.partial.values()):
+                journal_file.write(json.dumps(entry) + "\n")
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        os.replace(tmp_path, self.path)
+
+    def write(self, entry, sync=False):
+        """
+        Appends an entry to the journal.
+        """
+        with self.lock:
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+            if sync:
+                os.fsync(self.file.fileno())
+
+    def record_partial(self, source, size, mtime_ns, destination, offset):
+        """
+        Records the last committed offset of a file that is still being copied.
+        """
+        self.write(
+            {
+                "event": "partial",
+                "source": source,
+                "size": size,
+                "mtime_ns": mtime_ns,
+                "destination": destination,
+                "offset": offset,
+            },
+            sync=True,
+        )
+
+    def record_done(self, source, size, mtime_ns, destination):
+        """
+        Records a completed copy.
+        """
+        self.write(
+            {
+                "event": "done",
+                "source": source,
+                "size": size,
+                "mtime_ns": mtime_ns,
+                "destination": destination,
+            }
+        )
+
+    def matches(self, entry, size, mtime_ns, destination) -> bool:
+        """
+        Checks that a journal entry is for the same version of the source file and the same destination.
+        """
+        return (
+            entry is not None
+            and entry["size"] == size
+            and entry["mtime_ns"] == mtime_ns
+            and entry["destination"] == destination
+        )
+
+    def is_done(self, source, size, mtime_ns, destination, destination_path) -> bool:
+        """
+        Checks whether a file was already copied by a previous run and the copy is still intact.
+        """
+        entry = self.done.get(source)
+        if not self.matches(entry, size, mtime_ns, destination):
+            return False
+        try:
+            return os.path.getsize(destination_path) == size
+        except OSError:
+            return False
+
+    def resume_offset(self, source, size, mtime_ns, destination, destination_path) -> int:
+        """
+        Returns the offset a partially copied file can continue from, or 0 to copy it from the start.
+        """
+        entry = self.partial.get(source)
+        if not self.matches(entry, size, mtime_ns, destination):
+            return 0
+        try:
+            if os.path.getsize(destination_path) < entry["offset"]:
+                return 0
+        except OSError:
+            return 0
+        return entry["offset"]
+
+    def close(self):
+        """
+        Flushes and closes the journal.
+        """
+        with self.lock:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+
+
+class DigestIndex:
+    """
+    A persistent index of content digests kept in the output directory, keyed by (device, inode, size, mtime),
+    so files which have not changed since they were last hashed are never read again.
+    Digests of files written to the output directory also remember their path, which is used to find existing
+    copies of the same content when deduplicating.
+    """
+
+    def __init__(self, path, algorithm, persist=True):
+        """
+        Opens the index, loading (and compacting) the digests recorded by previous runs.
+
+        Args:
+            path (str): The index file path.
+            algorithm (str): The digest algorithm ('blake2b' or 'xxhash').
+            persist (bool): Whether new digests are written to the index file (False for a dry run).
+        """
+        self.path = path
+        self.algorithm = algorithm
+        self.lock = threading.Lock()
+        self.digests = {}
+        self.copies = {}
+        # Digests being copied to the output directory right now, so other workers link to the copy instead
+        self.copying = threading.Condition()
+        self.in_flight = {}
+        self.file = None
+
+        if os.path.exists(path):
+            self.load()
+            if persist:
+                self.compact()
+
+        if persist:
+            self.file = open(path, "a", encoding="utf-8")
+
+    @staticmethod
+    def key(file_stat) -> tuple:
+        """
+        Returns the index key identifying a version of a file.
+        """
+        return (
+            file_stat.st_dev,
+            file_stat.st_ino,
+            file_stat.st_size,
+            file_stat.st_mtime_ns,
+        )
+
+    def load(self):
+        """
+        Loads the recorded digests, keeping the latest entry per key.
+        """
+        with open(self.path, "r", encoding="utf-8") as index_file:
+            for line in index_file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A torn final line from an interrupted run
+                self.digests[tuple(entry["key"])] = (entry["digest"], entry["path"])
+                if entry["path"] is not None:
+                    self.copies[entry["digest"]] = entry["path"]
+
+    def compact(self):
+        """
+        Rewrites the index with only the latest entry per key.
+        """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as index_file:
+            for key, (digest, path) in self.digests.items():
+                index_file.write(
+                    json.dumps({"key": list(key), "digest": digest, "path": path})
+                    + "\n"
+                )
+            index_file.flush()
+            os.fsync(index_file.fileno())
+        os.replace(tmp_path, self.path)
+
+    def record(self, file_stat, digest, path=None):
+        """
+        Records the digest of a file. Pass the path for files in the output directory so they can be found by find_copy.
+        """
+        key = self.key(file_stat)
+        with self.lock:
+            self.digests[key] = (digest, path)
+            if path is not None:
+                self.copies[digest] = path
+            if self.file is not None:
+                self.file.write(
+                    json.dumps({"key": list(key), "digest": digest, "path": path})
+                    + "\n"
+                )
+                self.file.flush()
+
+    def lookup(self, file_stat):
+        """
+        Returns the recorded digest of a file, or None if this version of the file has not been hashed.
+        """
+        entry = self.digests.get(self.key(file_stat))
+        return entry[0] if entry is not None else None
+
+    def digest_file(self, path, file_stat) -> str:
+        """
+        Returns the digest of a file, only reading the file if this version of it has not been hashed before.
+        """
+        digest = self.lookup(file_stat)
+        if digest is None:
+            digest = hash_file(path, self.algorithm)
+            self.record(file_stat, digest)
+        return digest
+
+    def find_copy(self, digest):
+        """
+        Returns the path of a file in the output directory with the given content, or None if there is none.
+        The file must still be the version that was hashed.
+        """
+        path = self.copies.get(digest)
+        if path is None:
+            return None
+        try:
+            if self.lookup(os.stat(path)) == digest:
+                return path
+        except OSError:
+            pass
+        return None
+
+    def claim_copy(self, digest, path):
+        """
+        Returns the path of an existing copy of the content (see find_copy), waiting for a copy another worker is
+        still writing. If there is none, the caller claims the digest and must copy the file to path, record it
+        and then call release_copy, so workers with the same content link to that copy instead of copying it again.
+
+        Returns:
+            str: The path of the existing copy, or None if the caller claimed the digest.
+        """
+        with self.copying:
+            while digest in self.in_flight:
+                self.copying.wait()
+            existing_path = self.find_copy(digest)
+            if existing_path is not None and existing_path != path:
+                return existing_path
+            self.in_flight[digest] = path
+            return None
+
+    def release_copy(self, digest):
+        """
+        Releases a digest claimed by claim_copy, waking the workers waiting for the copy (whether or not it succeeded).
+        """
+        with self.copying:
+            self.in_flight.pop(digest, None)
+            self.copying.notify_all()
+
+    def close(self):
+        """
+        Flushes and closes the index.
+        """
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+
+
+def is_unchanged(src_path, src_stat, dst_path, digests) -> bool:
+    """
+    Checks whether the destination already holds an up to date copy of the source.
+    The size and mtime are compared first. If only the mtime differs and a digest index is available,
+    the content digests are compared (each file is only hashed if it changed since it was last hashed).
+    """
+    try:
+        dst_stat = os.stat(dst_path)
+    except FileNotFoundError:
+        return False
+
+    if dst_stat.st_size != src_stat.st_size:
+        return False
+    if dst_stat.st_mtime_ns == src_stat.st_mtime_ns:
+        return True
+    if digests is None:
+        return False
+    return digests.digest_file(src_path, src_stat) == digests.digest_file(
+        dst_path, dst_stat
+    )
+
+
+def run_bounded(executor, func, tasks, max_pending):
+    """
+    Submits func(*task) to the executor for each task while keeping at most max_pending tasks in flight,
+    so a huge batch never queues every task up front. Tasks may be a generator, which is consumed lazily.
+
+    Yields:
+        The results of the completed tasks (in completion order).
+    """
+    pending = set()
+    for task in tasks:
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        pending.add(executor.submit(func, *task))
+    for future in as_completed(pending):
+        yield future.result()
 
 
-def rename_files(in_dir_safe, out_dir_safe, pattern):
+def scan_files(in_dir, recursive=False, exclude_dirs=()):
+    """
+    Lazily scans a directory for files via os.scandir, so copying can start while the listing is still running.
+    The file type info cached on each DirEntry is used, so no extra stat call is made per entry.
+
+    Args:
+        in_dir (str): The directory to scan.
+        recursive (bool): Whether to descend into sub-directories.
+        exclude_dirs (iterable): Absolute paths of directories to skip (e.g. an output directory inside the input directory).
+
+    Yields:
+        tuple: The directory relative to in_dir ('' for in_dir itself) and the os.DirEntry of each file.
+    """
+    exclude_dirs = set(exclude_dirs)
+    pending_dirs = [""]
+    while pending_dirs:
+        rel_dir = pending_dirs.pop()
+        abs_dir = os.path.join(in_dir, rel_dir)
+        try:
+            with os.scandir(abs_dir) as entries:
+                sub_dirs = []
+                for entry in entries:
+                    if entry.is_file():
+                        yield rel_dir, entry
+                    elif (
+                        recursive
+                        and entry.is_dir(follow_symlinks=False)
+                        and entry.path not in exclude_dirs
+                    ):
+                        sub_dirs.append(os.path.join(rel_dir, entry.name))
+        except PermissionError as e:
+            if not rel_dir:
+                raise
+            log(f"Error: Permission denied to access directory '{e.filename}'")
+            continue
+        pending_dirs.extend(reversed(sub_dirs))
+
+
+class RenamePattern:
+    """
+    A rename pattern compiled once into a renderer which is reused for every file.
+
+    Placeholders (each accepts a format spec, e.g. {num:06}):
+        {name}: The original file name without extension.
+        {ext}: The original extension (without the dot).
+        {num}: A sequential number starting at 1.
+        {size}: The file size in bytes.
+        {date}: The file modification date, the spec is a strftime format (default {date:%Y-%m-%d}).
+        {hash}: A prefix of the content digest, the spec is the prefix length (default {hash:8}).
+    """
+
+    def __init__(self, pattern):
+        """
+        Compiles the pattern.
+
+        Raises:
+            ValueError: If the pattern is malformed, uses an unknown placeholder or an invalid format spec.
+        """
+        self.pattern = pattern
+        self.parts = []
+        try:
+            parsed = list(string.Formatter().parse(pattern))
+        except ValueError as e:
+            raise ValueError(f"Malformed pattern '{pattern}': {e}")
+
+        for literal, field, spec, conversion in parsed:
+            if literal:
+                self.parts.append((literal, None))
+            if field is None:
+                continue
+            if field not in PATTERN_FIELDS:
+                raise ValueError(
+                    f"Unknown placeholder '{{{field}}}' in pattern '{pattern}'. "
+                    f"Use one of: {', '.join('{' + f + '}' for f in sorted(PATTERN_FIELDS))}."
+                )
+            if conversion or "{" in spec:
+                raise ValueError(
+                    f"Conversions and nested placeholders are not supported in pattern '{pattern}'."
+                )
+            if field == "hash" and spec and not spec.isdigit():
+                raise ValueError(
+                    f"The {{hash}} spec must be a prefix length (e.g. {{hash:8}}), got '{spec}'."
+                )
+            self.parts.append((spec, field))
+
+        self.fields = {field for _, field in self.parts if field is not None}
+        self.needs_stat = bool(self.fields & {"size", "date"})
+        self.needs_digest = "hash" in self.fields
+
+        # Render sample values once so invalid format specs are reported up front
+        try:
+            self.render("name", "ext", 1, 0, 0, "0" * 40)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid format spec in pattern '{pattern}': {e}")
+
+    def render(self, name, ext, num, size=None, mtime_ns=None, digest=None) -> str:
+        """
+        Renders the new file name for one file.
+        """
+        values = []
+        for text, field in self.parts:
+            if field is None:
+                values.append(text)
+            elif field == "name":
+                values.append(format(name, text) if text else name)
+            elif field == "ext":
+                values.append(format(ext, text) if text else ext)
+            elif field == "num":
+                values.append(format(num, text))
+            elif field == "size":
+                values.append(format(size, text))
+            elif field == "date":
+                date = datetime.fromtimestamp(mtime_ns / 1e9)
+                values.append(date.strftime(text or "%Y-%m-%d"))
+            elif field == "hash":
+                values.append(digest[: int(text or 8)])
+        return "".join(values)
+
+
+def plan_renames(in_dir_safe, out_dir_safe, rename_pattern, recursive=False, digests=None):
+    """
+    Lazily plans the new name of every file in the input directory.
+    The files are numbered in scan order, so planning the same unchanged directory twice gives the same plan.
+
+    Args:
+        in_dir_safe (str): The safe absolute path to the directory containing the files.
+        out_dir_safe (str): The safe absolute path to the directory where renamed files will be saved.
+        rename_pattern (RenamePattern): The compiled renaming pattern.
+        recursive (bool): Also plan files in sub-directories.
+        digests (DigestIndex): The digest index, required if the pattern uses {hash}.
+
+    Yields:
+        tuple: The source path relative to in_dir_safe, the new path relative to out_dir_safe,
+            the absolute path of the source and the new absolute path.
+    """
+    files = scan_files(in_dir_safe, recursive, exclude_dirs=[out_dir_safe])
+    for i, (rel_dir, entry) in enumerate(files):
+        name, ext = os.path.splitext(entry.name)
+        size = None
+        mtime_ns = None
+        digest = None
+        if rename_pattern.needs_stat or rename_pattern.needs_digest:
+            file_stat = entry.stat()
+            size = file_stat.st_size
+            mtime_ns = file_stat.st_mtime_ns
+            if rename_pattern.needs_digest:
+                digest = digests.digest_file(entry.path, file_stat)
+
+        new_file_name = rename_pattern.render(
+            name, ext.lstrip("."), i + 1, size, mtime_ns, digest
+        )
+        # Path joins are a noticeable share of planning a huge flat directory, so skip them when there is no sub-directory
+        if rel_dir:
+            rel_path = os.path.join(rel_dir, entry.name)
+            new_name = os.path.join(rel_dir, new_file_name)
+        else:
+            rel_path = entry.name
+            new_name = new_file_name
+        yield rel_path, new_name, entry.path, os.path.join(out_dir_safe, new_name)
+
+
+def check_plan(plan, on_item=None, destinations=None) -> list:
+    """
+    Checks a whole rename plan before any bytes are moved: every new name must be a plain, non-empty file name
+    and no two files may be renamed to the same destination.
+
+    Args:
+        plan (iterable): The planned renames (see plan_renames).
+        on_item (callable): Called with each planned rename as it is checked (e.g. to print a dry run).
+        destinations (dict): Filled with the checked destinations, the normcased new name -> the source path
+            (see in_checked_plan).
+
+    Returns:
+        list: A description of each problem found (empty if the plan is safe to run).
+    """
+    problems = []
+    if destinations is None:
+        destinations = {}
+    for item in plan:
+        rel_path, new_name, _, _ = item
+        if on_item is not None:
+            on_item(item)
+
+        # The new name must stay in the same directory as the original
+        if (
+            new_name.count(os.sep) != rel_path.count(os.sep)
+            or (os.altsep and os.altsep in new_name)
+            or new_name.rpartition(os.sep)[2] in ("", ".", "..")
+        ):
+            problems.append(f"Unsafe new name '{new_name}' for '{rel_path}'.")
+            continue
+
+        key = os.path.normcase(new_name)
+        if key in destinations:
+            problems.append(
+                f"Name collision: '{destinations[key]}' and '{rel_path}' would both be renamed to '{new_name}'."
+            )
+        else:
+            destinations[key] = rel_path
+    return problems
+
+
+def in_checked_plan(item, destinations) -> bool:
+    """
+    Checks whether a planned rename is the one check_plan checked, i.e. the source still gets the same new name.
+    """
+    rel_path, new_name, _, _ = item
+    return destinations.get(os.path.normcase(new_name)) == rel_path
+
+
+def print_plan_item(item, lines):
+    """
+    Buffers a dry run plan line, writing the buffer to stdout in batches (much faster than one print per file).
+    """
+    rel_path, new_name, _, _ = item
+    lines.append(f"Plan: {rel_path} -> {new_name}\n")
+    if len(lines) >= DRY_RUN_BATCH:
+        sys.stdout.write("".join(lines))
+        lines.clear()
+
+
+def copy_renamed_file(filename, new_name, src_path, new_path, journal, options):
+    """
+    Copies a single file to its new name (run on a worker thread), skipping or continuing it
+    based on what the journal recorded for previous runs. Depending on the options, unchanged files are skipped
+    and content which already exists in the output directory is linked instead of copied.
+    """
+    try:
+        src_stat = os.stat(src_path)
+        digests = options["digests"]
+        if journal.is_done(
+            filename, src_stat.st_size, src_stat.st_mtime_ns, new_name, new_path
+        ):
+            log(f"Skip: {filename} -> {new_name} (already copied)")
+            return {"bytes": 0, "seconds": 0.0, "method": "skipped"}
+
+        if options["skip_unchanged"] and is_unchanged(
+            src_path, src_stat, new_path, digests
+        ):
+            log(f"Skip: {filename} -> {new_name} (unchanged)")
+            journal.record_done(
+                filename, src_stat.st_size, src_stat.st_mtime_ns, new_name
+            )
+            return {"bytes": 0, "seconds": 0.0, "method": "skipped"}
+
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+
+        digest = None
+        if options["dedupe"]:
+            digest = digests.digest_file(src_path, src_stat)
+            method = None
+            while method is None:
+                existing_path = digests.claim_copy(digest, new_path)
+                if existing_path is None:
+                    break
+                # Completed copies are never changed in place, so the linked inode must be the version that was hashed
+                method = link_file(
+                    existing_path,
+                    new_path,
+                    lambda file_stat: digests.lookup(file_stat) == digest,
+                )
+            if method is not None:
+                log(
+                    f"Dedupe: {filename} -> {new_name} ({method} to {os.path.relpath(existing_path, os.path.dirname(new_path))})"
+                )
+                journal.record_done(
+                    filename, src_stat.st_size, src_stat.st_mtime_ns, new_name
+                )
+                return {"bytes": 0, "seconds": 0.0, "method": f"dedupe-{method}"}
+
+        try:
+            offset = journal.resume_offset(
+                filename, src_stat.st_size, src_stat.st_mtime_ns, new_name, new_path
+            )
+
+            def on_progress(committed):
+                journal.record_partial(
+                    filename, src_stat.st_size, src_stat.st_mtime_ns, new_name, committed
+                )
+
+            # Hash while copying, unless the digest is already known
+            hasher = None
+            if digests is not None and digest is None:
+                hasher = new_hasher(digests.algorithm)
+
+            # Copy the file to the new location with the new name
+            # Technically this isn't a rename via os.rename, but since we are outputting to a seperate directory, we copy instead
+            if offset:
+                log(f"Copy: {filename} -> {new_name} (resuming at byte {offset})")
+            else:
+                log(f"Copy: {filename} -> {new_name}")
+            result = copy_file(src_path, new_path, offset, on_progress, hasher)
+            if result is not None:
+                # Keep the source mtime so the next run can tell the copy is unchanged
+                os.utime(new_path, ns=(src_stat.st_atime_ns, result["mtime_ns"]))
+                if digests is not None:
+                    digest = digest or result["digest"]
+                    if (result["size"], result["mtime_ns"]) == (
+                        src_stat.st_size,
+                        src_stat.st_mtime_ns,
+                    ):
+                        digests.record(src_stat, digest)
+                    digests.record(os.stat(new_path), digest, new_path)
+                journal.record_done(
+                    filename, result["size"], result["mtime_ns"], new_name
+                )
+            return result
+        finally:
+            if options["dedupe"]:
+                # The copy is recorded by now (unless it failed), so waiting workers link to it
+                digests.release_copy(digest)
+    except OSError as e:
+        log(f"Error renaming file {filename}: {e}")
+        return None
+
+
+def rename_files(
+    in_dir_safe,
+    out_dir_safe,
+    pattern,
+    jobs=arg_defaults["jobs"],
+    resume=False,
+    recursive=False,
+    skip_unchanged=False,
+    dedupe=False,
+    digest=None,
+    dry_run=False,
+):
     """
     Renames files in a directory based on a given pattern.
 
@@ -79,6 +1146,15 @@ def rename_files(in_dir_safe, out_dir_safe, pattern):
         in_dir_safe (str): The safe absolute path to the directory containing the files.
         out_dir_safe (str): The safe absolute path to the directory where renamed files will be saved.
         pattern (str): The renaming pattern with placeholders.
+        jobs (int): The number of files to copy in parallel.
+        resume (bool): Skip files a previous run already copied and continue partially copied files.
+        recursive (bool): Also rename files in sub-directories, keeping the directory layout under out_dir_safe.
+        skip_unchanged (bool): Skip files whose copy in out_dir_safe has the same size and mtime (or content digest).
+        dedupe (bool): Link files whose content already exists in out_dir_safe instead of copying the bytes again.
+        digest (str): The content digest algorithm ('blake2b' or 'xxhash') used to compare and dedupe files.
+            Digests are computed during the copy and kept in an index in out_dir_safe.
+            Defaults to 'blake2b' if dedupe is set or the pattern uses {hash}.
+        dry_run (bool): Only print and check the plan, without copying any files.
     """
     if not in_dir_safe or not out_dir_safe:
         print("ERROR: Input and output directory paths must be provided.")
@@ -89,31 +1165,129 @@ def rename_files(in_dir_safe, out_dir_safe, pattern):
         print(f"ERROR: Input directory '{in_dir_safe}' does not exist.")
         return
 
+    jobs = max(1, int(jobs))
+
+    try:
+        rename_pattern = RenamePattern(pattern)
+    except ValueError as e:
+        print(f"ERROR: Invalid pattern: {e}")
+        return
+
+    if (dedupe or rename_pattern.needs_digest) and digest is None:
+        digest = "blake2b"
+    if digest == "xxhash" and xxhash is None:
+        print("WARNING: The xxhash package is not installed, using blake2b instead.")
+        digest = "blake2b"
+
     print(
-        f"Renaming files\n  * From: {in_dir_safe}\n  * To: {out_dir_safe}\n  * Pattern: {pattern}\n"
+        f"Renaming files\n  * From: {in_dir_safe}\n  * To: {out_dir_safe}\n  * Pattern: {pattern}\n  * Jobs: {jobs}\n  * Resume: {resume}\n  * Recursive: {recursive}"
+        f"\n  * Skip unchanged: {skip_unchanged}\n  * Dedupe: {dedupe}\n  * Digest: {digest}\n  * Dry run: {dry_run}\n"
     )
 
     try:
+        digests = None
+        if digest is not None:
+            if not dry_run:
+                os.makedirs(out_dir_safe, exist_ok=True)
+            digests = DigestIndex(
+                os.path.join(out_dir_safe, DIGEST_INDEX_NAME.format(algorithm=digest)),
+                digest,
+                persist=not dry_run,
+            )
+
+        # Checking the whole plan first means nothing is copied if two files would collide.
+        # Only the checked destinations are kept (not the whole plan), the copy scans the directory again and
+        # skips files whose new name is not the checked one, so files which appeared in the meantime are never copied.
+        lines = []
+        destinations = {}
+        started = time.perf_counter()
+        try:
+            problems = check_plan(
+                plan_renames(
+                    in_dir_safe, out_dir_safe, rename_pattern, recursive, digests
+                ),
+                (lambda item: print_plan_item(item, lines)) if dry_run else None,
+                destinations,
+            )
+        except BaseException:
+            if digests is not None:
+                digests.close()
+            raise
+        sys.stdout.write("".join(lines))
+
+        for problem in problems:
+            print(f"ERROR: {problem}")
+        if problems or dry_run:
+            if digests is not None:
+                digests.close()
+        if problems:
+            print(f"\nFound {len(problems)} problems in the plan, no files were copied.")
+            return
+        if dry_run:
+            print(
+                f"\nDry run: the plan was checked in {time.perf_counter() - started:.3f}s, no files were copied."
+            )
+            return
+
         os.makedirs(out_dir_safe, exist_ok=True)
-        files = [
-            f
-            for f in os.listdir(in_dir_safe)
-            if os.path.isfile(os.path.join(in_dir_safe, f))
-        ]
-
-        for i, filename in enumerate(files):
-            name, ext = os.path.splitext(filename)
-            new_name = pattern.format(name=name, ext=ext.lstrip("."), num=i + 1)
-            old_path = os.path.join(in_dir_safe, filename)
-            new_path = os.path.join(out_dir_safe, new_name)
+        journal = Journal(os.path.join(out_dir_safe, JOURNAL_NAME), resume)
+        options = {
+            "skip_unchanged": skip_unchanged,
+            "dedupe": dedupe,
+            "digests": digests,
+        }
 
-            try:
-                # Copy the file to the new location with the new name
-                # Technically this isn't a rename via os.rename, but since we are outputting to a seperate directory, we copy instead
-                print(f"Copy: {filename} -> {new_name}")
-                copy_file(old_path, new_path)
-            except OSError as e:
-                print(f"Error renaming file {filename}: {e}")
+        unchecked = 0
+
+        def plan_tasks():
+            """Yields a copy task for each file of the checked plan while the input directory is scanned again."""
+            nonlocal unchecked
+            plan = plan_renames(
+                in_dir_safe, out_dir_safe, rename_pattern, recursive, digests
+            )
+            for item in plan:
+                rel_path, new_name, src_path, new_path = item
+                if not in_checked_plan(item, destinations):
+                    log(f"Skip: {rel_path} -> {new_name} (not in the checked plan)")
+                    unchecked += 1
+                    continue
+                yield (rel_path, new_name, src_path, new_path, journal, options)
+
+        started = time.perf_counter()
+        total_files = 0
+        copied = 0
+        skipped = 0
+        deduped = 0
+        total_bytes = 0
+        try:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                for result in run_bounded(
+                    executor, copy_renamed_file, plan_tasks(), jobs * 2
+                ):
+                    total_files += 1
+                    if result is None:
+                        continue
+                    if result["method"] == "skipped":
+                        skipped += 1
+                    elif result["method"].startswith("dedupe"):
+                        deduped += 1
+                    else:
+                        copied += 1
+                        total_bytes += result["bytes"]
+        finally:
+            journal.close()
+            if digests is not None:
+                digests.close()
+        elapsed = time.perf_counter() - started
+
+        print(
+            f"\nCopied {copied} of {total_files} files, skipped {skipped}, deduped {deduped} "
+            f"({format_bytes(total_bytes)} in {elapsed:.3f}s, {format_rate(total_bytes, elapsed)})."
+        )
+        if unchecked:
+            print(
+                f"{unchecked} files changed since the plan was checked and were not copied, run again to copy them."
+            )
 
     except FileNotFoundError as e:
         print(f"Error: File not found at '{e.filename}'")
@@ -141,9 +1315,53 @@ def create_arg_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument(
         "--pattern",
-        help=f"The renaming pattern. Use {{name}} for original name, {{ext}} for extension, and {{num}} for a sequential number. Default is '{arg_defaults['pattern']}'.",
+        help=f"The renaming pattern. Use {{name}} for original name, {{ext}} for extension, {{num}} for a sequential number (e.g. {{num:06}}), {{size}} for the size in bytes, {{date}} for the modification date (e.g. {{date:%%Y%%m%%d}}) and {{hash}} for a content hash prefix (e.g. {{hash:12}}). Default is '{arg_defaults['pattern']}'.",
         default=arg_defaults["pattern"],
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        help=f"The number of files to copy in parallel. Default is {arg_defaults['jobs']}.",
+        default=arg_defaults["jobs"],
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume an interrupted run: skip files already copied and continue partially copied files.",
+        default=arg_defaults["resume"],
+    )
+    parser.add_argument(
+        "--recursive",
+        action="store_true",
+        help="Also rename files in sub-directories, keeping the directory layout under the output directory.",
+        default=arg_defaults["recursive"],
+    )
+    parser.add_argument(
+        "--skip_unchanged",
+        "--skip-unchanged",
+        action="store_true",
+        help="Skip files whose copy in the output directory has the same size and mtime (or content digest if --digest is set).",
+        default=arg_defaults["skip_unchanged"],
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Reflink or hardlink files whose content already exists in the output directory instead of copying them again.",
+        default=arg_defaults["dedupe"],
+    )
+    parser.add_argument(
+        "--digest",
+        choices=["blake2b", "xxhash"],
+        help="Compute a content digest of each file during the copy and keep it in an index in the output directory. Default is none ('blake2b' with --dedupe).",
+        default=arg_defaults["digest"],
+    )
+    parser.add_argument(
+        "--dry_run",
+        "--dry-run",
+        action="store_true",
+        help="Only print and check the rename plan, without copying any files.",
+        default=arg_defaults["dry_run"],
+    )
     return parser
 
 
@@ -177,7 +1395,18 @@ def main():
     in_dir = args["in_dir_safe"]
     out_dir = args["out_dir_safe"]
     pattern = args["pattern"]
-    rename_files(in_dir, out_dir, pattern)
+    rename_files(
+        in_dir,
+        out_dir,
+        pattern,
+        args["jobs"],
+        args["resume"],
+        args["recursive"],
+        args["skip_unchanged"],
+        args["dedupe"],
+        args["digest"],
+        args["dry_run"],
+    )
 
 
 if __name__ == "__main__":
@@ -10,50 +10,338 @@ Requirements:
 - The program should extract the table containing the list of companies, including their rank, name, industry, revenue, and other relevant details.
 - The extracted data should be cleaned and formatted into a Pandas DataFrame.
 - Output should be displayed in a readable tabular format using Pandas.
+- Parsing:
+  * Only the wikitables (and the links, when crawling) are parsed into a tree, via a SoupStrainer, with Python's
+    html.parser or lxml (--parser, lxml by default when it is installed), or streamed with lxml's iterparse so elements
+    outside the tables are discarded as soon as they are parsed.
+  * Every wikitable of a page is extracted (--all_tables prints them all), and --parse_benchmark compares the parse time
+    and peak memory of the parsers.
+- Cleaning:
+  * The rowspan and colspan of the cells are expanded into a dense grid, so no row is dropped, and the texts of a column
+    in several header rows are joined into its name.
+  * Number columns (revenue, employees, growth, ...) are converted to numeric dtypes with vectorized pandas string
+    operations, removing currency symbols, thousands separators, footnote markers and percent signs (--raw keeps text).
+- Snapshots:
+  * Every scrape of the dataset is saved as a timestamped Feather or Parquet snapshot (needs pyarrow) named after the
+    content hash of the table, so an unchanged table is detected without reading the snapshot and is not processed
+    again.
+  * A changed table is diffed row by row against the previous snapshot by its --key column (added, removed and
+    changed companies), and --history queries the memory-mapped snapshots without scraping.
+- HTTP cache:
+  * Pages are fetched over one persistent requests.Session (keep-alive connections, retries of transient failures) and
+    kept in an on-disk SQLite cache keyed by URL, with their ETag/Last-Modified validators and zlib-compressed bodies.
+  * A cached page is revalidated with a conditional GET, and a 304 Not Modified reply is served from the cache.
+  * --offline does no network I/O at all: pages are replayed from the cache or from a --fixtures directory.
+- Crawl mode (--crawl URL ...):
+  * Fetch a list of pages, and optionally the pages they link to whose URL matches --follow, on a thread pool sharing
+    the pooled session, with at most --per_host concurrent requests and --delay seconds between requests to each host.
+  * Parse the pages on a process pool, so parsing is not serialized by the GIL, and print the table of every page.
+  * --serve_fixtures DIR serves a directory of fixture pages over a local HTTP server (with ETags), to crawl offline.
+- Fast startup:
+  * pandas, requests and Beautiful Soup are imported by the functions that use them, so --help and argument errors
+    return immediately and importing the module is cheap.
 """
 
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
 import re
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from urllib.parse import unquote, urljoin, urldefrag, urlsplit
+from typing import TYPE_CHECKING
 
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+if TYPE_CHECKING:
+    import pandas as pd
 
+LARGEST_US_COMPANIES_URL = "https://en.wikipedia.org/wiki/List_of_largest_companies_in_the_United_States_by_revenue"
+WIKITABLE_CLASS_REGEX = re.compile(r"(?:^|\s)wikitable(?:\s|$)")
+SNAPSHOT_DATASET = "largest_us_companies"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
 
-def fetch_webpage(url) -> str:
-    """Fetches the webpage content from the given URL via the requests library."""
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
-    }
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()  # Raise an error for bad responses
-    return response.text
+arg_defaults = {
+    "cache": os.path.join(os.path.dirname(os.path.abspath(__file__)), "http_cache.sqlite3"),
+    "no_cache": False,
+    "offline": False,
+    "fixtures": None,
+    "timeout": 30.0,
+    "crawl": None,
+    "follow": None,
+    "max_pages": 50,
+    "workers": 8,
+    "per_host": 2,
+    "delay": 0.5,
+    "parse_workers": os.cpu_count() or 1,
+    "parser": "auto",
+    "all_tables": False,
+    "raw": False,
+    "snapshots": os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots"),
+    "no_snapshot": False,
+    "snapshot_format": "feather",
+    "key": "name",
+    "history": False,
+    "history_key": None,
+    "parse_benchmark": False,
+    "parse_runs": 5,
+    "serve_fixtures": None,
+    "port": 8000,
+    "serve_latency": 0.0,
+}
 
 
-def fetch_largest_us_companies_dataset() -> pd.DataFrame:
-    """Fetches and processes the largest companies dataset from Wikipedia. End result is a Pandas DataFrame containing the data."""
+class HTTPCache:
+    """
+    An on-disk HTTP cache in an SQLite database, keyed by URL.
+    Every page is stored with its ETag and Last-Modified validators and its body compressed with zlib, so it can be
+    revalidated with a conditional GET (and served from disk on a 304 Not Modified) or replayed without any network I/O.
+    """
 
-    url = "https://en.wikipedia.org/wiki/List_of_largest_companies_in_the_United_States_by_revenue"
+    def __init__(self, path):
+        """:param path: The SQLite database file (created if it does not exist)."""
+        # The connection is shared between threads, so every access is made under the lock
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                encoding TEXT,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                fetched REAL NOT NULL,
+                validated REAL NOT NULL
+            )
+            """
+        )
+        self.db.commit()
 
-    try:
-        webpage_content = fetch_webpage(url)
-    except requests.RequestException as e:
-        raise Exception(f"Error fetching the webpage at '{url}': {e}")
+    def get(self, url):
+        """
+        Looks up a cached page.
 
-    soup = BeautifulSoup(webpage_content, "html.parser")
-    table = soup.find("table", {"class": "wikitable"})
+        :param url: The URL of the page.
+        :return: Tuple (text, etag, last_modified) of the page, or None if it is not cached.
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT etag, last_modified, encoding, body FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, encoding, body = row
+        return zlib.decompress(body).decode(encoding or "utf-8", errors="replace"), etag, last_modified
 
-    if not table:
-        raise Exception("Could not find the table on the webpage.")
+    def store(self, url, content, encoding, etag, last_modified):
+        """Stores (or replaces) the raw content of a page, with its text encoding and validators."""
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, encoding, zlib.compress(content, 6), len(content), now, now),
+            )
+            self.db.commit()
 
-    rows = table.find_all("tr")
-    if not rows:
-        raise Exception("No rows found in the table.")
+    def mark_validated(self, url):
+        """Records that the server confirmed (via a 304) that the cached page is still current."""
+        with self.lock:
+            self.db.execute("UPDATE responses SET validated = ? WHERE url = ?", (time.time(), url))
+            self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def fixture_path(fixtures_dir, url):
+    """Returns the path of the fixture page of a URL: the last segment of its path, plus .html."""
+    name = unquote(urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]) or "index"
+    name = re.sub(r"[^\w.-]", "_", name)
+    return os.path.join(fixtures_dir, name if name.endswith((".html", ".htm")) else f"{name}.html")
+
+
+def create_session(pool_size=10, retries=3):
+    """
+    Creates a persistent requests.Session, which keeps its connections alive between requests and retries transient
+    failures (connection errors, 429 and 5xx replies) with exponential backoff.
+
+    :param pool_size: The most connections kept open per host.
+    :param retries: The most retries of a failed request.
+    :return: The session.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class PageFetcher:
+    """
+    Fetches web pages over a persistent requests.Session, through an optional HTTPCache.
+    Cached pages are revalidated with conditional GETs. In offline mode, pages are served from the cache or the fixtures
+    directory and the network is never touched.
+    """
+
+    def __init__(self, cache=None, offline=False, fixtures_dir=None, timeout=30.0, session=None):
+        """
+        :param cache: An HTTPCache, or None to fetch every page in full.
+        :param offline: Serve pages from the cache or the fixtures directory only.
+        :param fixtures_dir: A directory of fixture pages (see fixture_path()), which are served instead of fetching.
+        :param timeout: The timeout of a request, in seconds.
+        :param session: The requests.Session to use (one is created on the first request if not given).
+        """
+        self.cache = cache
+        self.offline = offline
+        self.fixtures_dir = fixtures_dir
+        self.timeout = timeout
+        self.session = session
+        self.lock = threading.Lock()
+        # How the pages were served: fetched, not_modified (revalidated cache hit), cached (offline cache hit), fixture
+        self.stats = {"fetched": 0, "not_modified": 0, "cached": 0, "fixture": 0}
+
+    def count(self, served):
+        with self.lock:
+            self.stats[served] += 1
+
+    def read_fixture(self, url):
+        """Returns the fixture page of a URL, or None if there is none."""
+        if self.fixtures_dir is None:
+            return None
+        try:
+            with open(fixture_path(self.fixtures_dir, url), encoding="utf-8") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def get_session(self):
+        with self.lock:
+            if self.session is None:
+                self.session = create_session()
+            return self.session
+
+    def fetch(self, url) -> str:
+        """Fetches the content of the web page at the given URL."""
+        fixture = self.read_fixture(url)
+        if fixture is not None:
+            self.count("fixture")
+            return fixture
+
+        cached = self.cache.get(url) if self.cache is not None else None
+        if self.offline:
+            if cached is None:
+                raise Exception(f"'{url}' is not cached and there is no fixture for it (offline mode).")
+            self.count("cached")
+            return cached[0]
 
-    # Extract and clean table headings
-    table_headings = [th.get_text(strip=True) for th in rows[0].find_all("th")]
-    for i in range(len(table_headings)):
+        headers = {}
+        if cached is not None:
+            _, etag, last_modified = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        response = self.get_session().get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and cached is not None:
+            self.cache.mark_validated(url)
+            self.count("not_modified")
+            return cached[0]
+        response.raise_for_status()  # Raise an error for bad responses
+
+        self.count("fetched")
+        if self.cache is not None:
+            self.cache.store(
+                url,
+                response.content,
+                response.encoding or response.apparent_encoding,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+            )
+        return response.text
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+
+def cell_span(value):
+    """Parses a rowspan/colspan attribute (1 if it is missing or malformed, at most 1000)."""
+    match = re.match(r"\s*(\d+)", value or "")
+    return min(max(int(match.group(1)), 1), 1000) if match else 1
+
+
+def expand_spans(rows):
+    """
+    Expands the rowspan and colspan of the cells of a table into a dense grid, in which a spanning cell's text is
+    repeated in every row and column it covers.
+
+    :param rows: The cells of every row, as (text, rowspan, colspan) tuples.
+    :return: The grid, as a list of rows of cell texts (all of the same length, padded with "").
+    """
+    grid = []
+    carried = {}  # Column -> [rows left, text] of the cells spanning down from earlier rows
+    for cells in rows:
+        row = []
+        i = 0
+        while i < len(cells) or any(column >= len(row) for column in carried):
+            column = len(row)
+            if column in carried:
+                left, text = carried[column]
+                row.append(text)
+                if left == 1:
+                    del carried[column]
+                else:
+                    carried[column][0] -= 1
+            elif i < len(cells):
+                text, rowspan, colspan = cells[i]
+                i += 1
+                for _ in range(colspan):
+                    if rowspan > 1:
+                        carried[len(row)] = [rowspan - 1, text]
+                    row.append(text)
+            else:
+                # A gap in a short row, before a cell spanning down from an earlier row
+                row.append("")
+        grid.append(row)
+
+    width = max((len(row) for row in grid), default=0)
+    return [row + [""] * (width - len(row)) for row in grid]
+
+
+def clean_table(rows):
+    """
+    Cleans a table into a dense grid with a heading per column.
+
+    :param rows: The cells of every row, as (text, rowspan, colspan, is_heading) tuples.
+    :return: Tuple (headings, rows) with the lower_snake_case column names and the text of the cells of every row.
+             The leading rows of heading cells only are the header (the first row if there are none), and the texts of
+             a column in several header rows are joined into its name.
+    """
+    grid = expand_spans([[cell[:3] for cell in cells] for cells in rows])
+    header_rows = 0
+    while header_rows < len(rows) and rows[header_rows] and all(cell[3] for cell in rows[header_rows]):
+        header_rows += 1
+    header_rows = max(header_rows, 1)
+
+    table_headings = []
+    for i, texts in enumerate(zip(*grid[:header_rows])):
         # Attempt to create a valid column name formatted according to lower_snake_case
-        heading = table_headings[i]
+        heading = " ".join(dict.fromkeys(text for text in texts if text))
         heading = heading.strip().lower().replace(" ", "_")
         heading = re.sub(r"\W", "_", heading).strip("_")
 
@@ -61,30 +349,915 @@ def fetch_largest_us_companies_dataset() -> pd.DataFrame:
         if heading == "":
             heading = f"column_{i + 1}"
 
-        table_headings[i] = heading
+        # Columns under the same spanning heading get numbered names
+        if heading in table_headings:
+            number = 2
+            while f"{heading}_{number}" in table_headings:
+                number += 1
+            heading = f"{heading}_{number}"
 
-    table_data = []
-    for i in range(1, len(rows)):
-        cols = rows[i].find_all(["td", "th"])
-        cols = [col.get_text(strip=True) for col in cols]
+        table_headings.append(heading)
 
-        # If the number of columns matches the number of headings, add the row to the data
-        if len(cols) == len(table_headings):
-            table_data.append(cols)
+    # Skip empty rows and the header rows which some long tables repeat
+    header = grid[header_rows - 1] if grid else []
+    table_data = [row for row in grid[header_rows:] if any(row) and row != header]
+    return table_headings, table_data
 
-    ds = pd.DataFrame(table_data, columns=table_headings)
+
+def soup_table(table):
+    """Extracts a wikitable (a Beautiful Soup tag) as in clean_table(), or returns None if it has no rows."""
+    rows = [
+        [
+            (col.get_text(strip=True), cell_span(col.get("rowspan")), cell_span(col.get("colspan")), col.name == "th")
+            for col in row.find_all(["td", "th"], recursive=False)
+        ]
+        for row in table.find_all("tr")
+    ]
+    if not rows:
+        return None
+    return clean_table(rows)
+
+
+def element_text(element):
+    """The text of an lxml element, like Beautiful Soup's get_text(strip=True)."""
+    return "".join(text.strip() for text in element.itertext())
+
+
+def lxml_table(table):
+    """Extracts a wikitable (an lxml element) as in clean_table(), or returns None if it has no rows."""
+    rows = [
+        [
+            (element_text(col), cell_span(col.get("rowspan")), cell_span(col.get("colspan")), col.tag == "th")
+            for col in row.iterchildren("td", "th")
+        ]
+        for row in table.iter("tr")
+    ]
+    if not rows:
+        return None
+    return clean_table(rows)
+
+
+def is_wikitable(element):
+    return "wikitable" in (element.get("class") or "").split()
+
+
+def iterparse_wikitables(webpage_content, with_links):
+    """
+    Extracts the wikitables of a page with lxml's streaming iterparse. Every element outside a wikitable is dropped as
+    soon as it has been parsed, so the page is never held as a whole tree.
+    """
+    import io
+
+    from lxml import etree
+
+    tables = []
+    hrefs = []
+    open_tables = 0
+    source = io.BytesIO(webpage_content.encode("utf-8"))
+    for event, element in etree.iterparse(source, events=("start", "end"), html=True, encoding="utf-8"):
+        if element.tag == "table" and is_wikitable(element):
+            if event == "start":
+                open_tables += 1
+                continue
+            open_tables -= 1
+            table = lxml_table(element)
+            if table is not None:
+                tables.append(table)
+        elif event == "start":
+            continue
+        if with_links and element.tag == "a" and element.get("href") is not None:
+            hrefs.append(element.get("href"))
+        if open_tables == 0:
+            # The element and its earlier siblings have been handled (an element ends after its children)
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+    return tables, hrefs
+
+
+def resolve_parser(parser):
+    """Resolves the 'auto' parser to lxml if it is installed, otherwise to Python's html.parser."""
+    if parser != "auto":
+        return parser
+    import importlib.util
+
+    return "lxml" if importlib.util.find_spec("lxml") is not None else "html.parser"
+
+
+def parse_wikitables(webpage_content, parser="auto", with_links=False, strain=True):
+    """
+    Extracts every wikitable of a page.
+
+    :param webpage_content: The HTML of the page.
+    :param parser: 'html.parser' or 'lxml' (Beautiful Soup backends), 'iterparse' (streaming lxml) or 'auto'.
+    :param with_links: Also return the href of every link of the page.
+    :param strain: Only build the tree of the tables (and links), via a SoupStrainer. False builds the tree of the whole
+                   page (only for comparison in the parse benchmark).
+    :return: Tuple (tables, hrefs) with the (headings, rows) of every wikitable with rows, as in clean_table(), and the
+             hrefs (empty without with_links).
+    """
+    parser = resolve_parser(parser)
+    if parser == "iterparse":
+        return iterparse_wikitables(webpage_content, with_links)
+
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    if not strain:
+        parse_only = None
+    elif with_links:
+        parse_only = SoupStrainer(["table", "a"])
+    else:
+        # The strainer sees the class attribute before it is split into its classes
+        parse_only = SoupStrainer("table", class_=WIKITABLE_CLASS_REGEX)
+    soup = BeautifulSoup(webpage_content, parser, parse_only=parse_only)
+    tables = [table for table in map(soup_table, soup.find_all("table", class_="wikitable")) if table is not None]
+    hrefs = [anchor["href"] for anchor in soup.find_all("a", href=True)] if with_links else []
+    return tables, hrefs
+
+
+# Footnote markers, such as [1], [a], [note 2] and [citation needed]
+FOOTNOTE_REGEX = r"\[(?:\d+|[a-z]{1,2}|(?:note|nb) \d+|citation needed)\]"
+# Footnote markers, currency symbols and codes, thousands separators, trend arrows and approximation marks
+NUMERIC_NOISE_REGEX = r"\[[^\]]*\]|US\$|USD|[$€£¥,\s▲▼~+≈]"
+# Cells which mean "no value"
+MISSING_VALUE_REGEX = r"^(?:|-|–|—|n/?a|N/?A)$"
+
+
+def clean_numeric_columns(ds: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the text columns whose every (non-missing) cell is a number, such as revenue, employees and growth, to
+    numeric dtypes. The cleaning is vectorized with pandas string operations: footnote markers, currency symbols,
+    thousands separators and trend arrows are removed, Unicode minus signs and accounting parentheses become minus
+    signs, and percentages (such as growth) are kept in percentage points.
+    Whole numbers become the smallest integer dtype which holds them (a nullable one if cells are missing), and
+    other numbers become float64 columns. Other columns stay text, without their footnote markers.
+    """
+    import pandas as pd
+
+    ds = ds.copy()
+    for column in ds.columns:
+        values = ds[column]
+        if not (pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)):
+            continue
+        values = values.fillna("").astype(str).str.replace(NUMERIC_NOISE_REGEX, "", regex=True)
+        values = values.str.replace("\u2212", "-", regex=False).str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+        missing = values.str.fullmatch(MISSING_VALUE_REGEX)
+        if missing.all():
+            continue
+        present = values[~missing]
+        if present.str.endswith("%").all():
+            values = values.str.removesuffix("%")
+        numbers = pd.to_numeric(values.mask(missing), errors="coerce")
+        if numbers[~missing].isna().any():
+            ds[column] = ds[column].str.replace(FOOTNOTE_REGEX, "", regex=True)
+            continue
+
+        if (numbers.dropna() % 1 == 0).all():
+            if missing.any():
+                numbers = numbers.astype("Int64")
+            else:
+                numbers = pd.to_numeric(numbers, downcast="integer")
+        ds[column] = numbers
     return ds
 
 
+def table_dataframe(table_headings, table_data, raw=False) -> pd.DataFrame:
+    """Creates the DataFrame of an extracted table, with its number columns converted by clean_numeric_columns()."""
+    import pandas as pd
+
+    ds = pd.DataFrame(table_data, columns=table_headings)
+    return ds if raw else clean_numeric_columns(ds)
+
+
+def fetch_largest_us_companies_tables(fetcher, parser="auto"):
+    """Fetches the largest companies page from Wikipedia and extracts its wikitables, as in parse_wikitables()."""
+    import requests
+
+    url = LARGEST_US_COMPANIES_URL
+
+    try:
+        webpage_content = fetcher.fetch(url)
+    except requests.RequestException as e:
+        raise Exception(f"Error fetching the webpage at '{url}': {e}")
+
+    tables, _ = parse_wikitables(webpage_content, parser)
+    if not tables:
+        raise Exception("Could not find the table on the webpage.")
+    return tables
+
+
+def fetch_largest_us_companies_dataset(
+    fetcher, parser="auto", all_tables=False, raw=False
+) -> pd.DataFrame | list[pd.DataFrame]:
+    """
+    Fetches and processes the largest companies dataset from Wikipedia. End result is a Pandas DataFrame containing the
+    data (of the first wikitable of the page), or with all_tables a list with a DataFrame of every wikitable.
+    The number columns are converted to numeric dtypes unless raw is set.
+    """
+    tables = fetch_largest_us_companies_tables(fetcher, parser)
+    datasets = [table_dataframe(table_headings, table_data, raw) for table_headings, table_data in tables]
+    return datasets if all_tables else datasets[0]
+
+
+SNAPSHOT_FILE_REGEX = re.compile(r"^(?P<dataset>.+)-(?P<timestamp>\d{8}T\d{12}Z)-(?P<hash>[0-9a-f]{16})\.(?P<format>feather|parquet)$")
+
+
+def table_hash(table_headings, table_data):
+    """Returns the SHA-256 content hash of an extracted table (its headings and the text of its cells)."""
+    digest = hashlib.sha256()
+    for row in [table_headings, *table_data]:
+        # Unit and record separators, which cannot occur in the text of a cell
+        digest.update("\x1f".join(row).encode("utf-8") + b"\x1e")
+    return digest.hexdigest()
+
+
+class SnapshotStore:
+    """
+    A directory of timestamped columnar snapshots of scraped datasets, in Feather (uncompressed Arrow, read without
+    copying via a memory map) or Parquet (compressed) files named <dataset>-<UTC timestamp>-<content hash>.<format>.
+    The content hash in the name tells whether a table changed since its latest snapshot without reading the snapshot.
+    """
+
+    def __init__(self, directory, file_format="feather"):
+        self.directory = directory
+        self.file_format = file_format
+        os.makedirs(directory, exist_ok=True)
+
+    def snapshots(self, dataset):
+        """Returns the (path, timestamp, content_hash) of the snapshots of a dataset, oldest first."""
+        found = []
+        for entry in os.scandir(self.directory):
+            match = SNAPSHOT_FILE_REGEX.match(entry.name)
+            if match and match["dataset"] == dataset:
+                timestamp = datetime.strptime(match["timestamp"], "%Y%m%dT%H%M%S%fZ").replace(tzinfo=timezone.utc)
+                found.append((entry.path, timestamp, match["hash"]))
+        return sorted(found, key=lambda snapshot: snapshot[1])
+
+    def latest(self, dataset):
+        """Returns the (path, timestamp, content_hash) of the latest snapshot of a dataset, or None."""
+        snapshots = self.snapshots(dataset)
+        return snapshots[-1] if snapshots else None
+
+    def save(self, dataset, ds, content_hash):
+        """Saves a DataFrame as the latest snapshot of a dataset and returns its path."""
+        import pyarrow as pa
+
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        path = os.path.join(self.directory, f"{dataset}-{timestamp}-{content_hash[:16]}.{self.file_format}")
+        table = pa.Table.from_pandas(ds, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"content_hash": content_hash.encode()})
+
+        # Write to a temporary file first, so a crash never leaves a partial snapshot behind
+        temporary_path = f"{path}.tmp"
+        if self.file_format == "feather":
+            import pyarrow.feather as feather
+
+            feather.write_feather(table, temporary_path, compression="uncompressed")
+        else:
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, temporary_path)
+        os.replace(temporary_path, path)
+        return path
+
+    @staticmethod
+    def read_table(path, columns=None):
+        """Reads a snapshot as a pyarrow Table via a memory map (Feather snapshots are not even copied)."""
+        if path.endswith(".feather"):
+            import pyarrow.feather as feather
+
+            return feather.read_table(path, columns=columns, memory_map=True)
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path, columns=columns, memory_map=True)
+
+    def read(self, path, columns=None) -> pd.DataFrame:
+        """Reads a snapshot as a DataFrame."""
+        return self.read_table(path, columns).to_pandas()
+
+
+def diff_datasets(previous: pd.DataFrame, current: pd.DataFrame, key):
+    """
+    Compares two snapshots of a dataset row by row, matching the rows by their key column.
+
+    :return: Tuple (added, removed, changed): the DataFrames of the added and removed rows, and the changed cells as
+             a DataFrame with the key, column, previous and current values.
+    """
+    import pandas as pd
+
+    previous = previous.drop_duplicates(key).set_index(key)
+    current = current.drop_duplicates(key).set_index(key)
+    added = current.loc[current.index.difference(previous.index, sort=False)].reset_index()
+    removed = previous.loc[previous.index.difference(current.index, sort=False)].reset_index()
+
+    common = current.index.intersection(previous.index, sort=False)
+    columns = [column for column in current.columns if column in previous.columns]
+    before = previous.loc[common, columns].astype(object)
+    after = current.loc[common, columns].astype(object)
+    # Compare the whole frames at once, where two missing cells are equal
+    differs = before.ne(after) & ~(before.isna() & after.isna())
+    cells = differs.stack()
+    cells = cells[cells]
+    changed = pd.DataFrame(
+        {
+            key: cells.index.get_level_values(0),
+            "column": cells.index.get_level_values(1),
+            "previous": [before.at[row, column] for row, column in cells.index],
+            "current": [after.at[row, column] for row, column in cells.index],
+        }
+    )
+    return added, removed, changed
+
+
+def snapshot_dataset(args, table) -> pd.DataFrame:
+    """
+    Saves the extracted table as a snapshot of the dataset, unless its content hash matches the latest snapshot (in
+    which case it is not processed again and the latest snapshot is returned), and prints the row-level diff against
+    the previous snapshot.
+
+    :return: The DataFrame of the dataset.
+    """
+    table_headings, table_data = table
+    store = SnapshotStore(args.snapshots, args.snapshot_format)
+    content_hash = table_hash(table_headings, table_data)
+    latest = store.latest(SNAPSHOT_DATASET)
+    if latest is not None and latest[2] == content_hash[:16]:
+        print(f"The table has not changed since the snapshot of {latest[1]:%Y-%m-%d %H:%M:%S} UTC ({latest[0]}).\n")
+        return table_dataframe(table_headings, table_data, raw=True) if args.raw else store.read(latest[0])
+
+    ds = table_dataframe(table_headings, table_data)
+    path = store.save(SNAPSHOT_DATASET, ds, content_hash)
+    print(f"Saved the snapshot {path}.")
+    if latest is None:
+        print()
+    elif args.key not in ds.columns:
+        print(f"Could not diff against the previous snapshot: there is no '{args.key}' column.\n")
+    else:
+        added, removed, changed = diff_datasets(store.read(latest[0]), ds, args.key)
+        print(
+            f"Changes since the snapshot of {latest[1]:%Y-%m-%d %H:%M:%S} UTC: {len(added)} added, {len(removed)} "
+            f"removed, {changed[args.key].nunique()} changed ({len(changed)} cells)."
+        )
+        for title, rows in (("Added", added), ("Removed", removed), ("Changed", changed)):
+            if len(rows):
+                print(f"\n{title}:\n{rows.to_string(index=False)}")
+        print()
+    return table_dataframe(table_headings, table_data, raw=True) if args.raw else ds
+
+
+def run_history(args):
+    """Lists the snapshots of the dataset, or with --history_key prints the row of a key in every snapshot."""
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    store = SnapshotStore(args.snapshots, args.snapshot_format)
+    snapshots = store.snapshots(SNAPSHOT_DATASET)
+    if not snapshots:
+        print(f"There are no snapshots in '{args.snapshots}'.")
+        return
+
+    rows = []
+    for path, timestamp, content_hash in snapshots:
+        table = store.read_table(path)
+        if args.history_key is None:
+            rows.append({"snapshot": f"{timestamp:%Y-%m-%d %H:%M:%S}", "hash": content_hash, "rows": table.num_rows})
+        elif args.key in table.column_names:
+            column = table[args.key]
+            value_type = column.type.value_type if pa.types.is_dictionary(column.type) else column.type
+            try:
+                # The key is typed text, so parse it as the column type (e.g. a number for a cleaned Rank column)
+                key = pa.scalar(args.history_key).cast(value_type)
+                # Filter the memory-mapped table before converting the (few) matching rows to pandas
+                matches = table.filter(pc.equal(column, key)).to_pandas()
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                print(
+                    f"Snapshot {timestamp:%Y-%m-%d %H:%M:%S}: can not match {args.key} ({column.type}) "
+                    f"with '{args.history_key}': {e}"
+                )
+                continue
+            matches.insert(0, "snapshot", f"{timestamp:%Y-%m-%d %H:%M:%S}")
+            rows.extend(matches.to_dict("records"))
+    if not rows:
+        print(f"No snapshot has a row with {args.key} '{args.history_key}'.")
+        return
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+def parse_page(url, webpage_content, follow, parser):
+    """
+    Parses a crawled page: extracts its wikitables and the links to follow. This runs in the parse worker processes, so
+    it takes and returns plain picklable values.
+
+    :param url: The URL of the page (links are resolved against it).
+    :param webpage_content: The HTML of the page.
+    :param follow: A regular expression matched against the absolute URL of every link, or None to follow no links.
+    :param parser: The parser (see parse_wikitables()).
+    :return: Tuple (tables, links): the (headings, rows) of every wikitable and the URLs of the links to follow (without
+             fragments, in page order, without duplicates).
+    """
+    tables, hrefs = parse_wikitables(webpage_content, parser, with_links=follow is not None)
+
+    links = {}
+    if follow is not None:
+        pattern = re.compile(follow)
+        for href in hrefs:
+            link = urldefrag(urljoin(url, href))[0]
+            if link.startswith(("http://", "https://")) and pattern.search(link):
+                links[link] = None
+    return tables, list(links)
+
+
+class HostThrottle:
+    """
+    Limits the requests to each host: at most per_host at once, and one every delay seconds (a politeness delay, so the
+    crawl does not hammer a server even with many worker threads).
+    """
+
+    def __init__(self, per_host, delay):
+        self.per_host = per_host
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.semaphores = {}
+        self.next_request = {}
+
+    @contextmanager
+    def slot(self, url):
+        """A context manager which waits until a request to the host of the URL may be made."""
+        host = urlsplit(url).netloc.lower()
+        with self.lock:
+            semaphore = self.semaphores.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with semaphore:
+            with self.lock:
+                now = time.monotonic()
+                start = max(now, self.next_request.get(host, now))
+                self.next_request[host] = start + self.delay
+            time.sleep(start - now)
+            yield
+
+
+def crawl(fetcher, urls, follow, max_pages, workers, throttle, parse_workers, parser, on_page):
+    """
+    Crawls pages concurrently: they are fetched on a thread pool (through the throttle) and parsed on a process pool,
+    and the links matching follow are crawled too, until max_pages pages were crawled.
+
+    :param fetcher: The PageFetcher (shared by the threads, so its session pools the connections).
+    :param urls: The URLs to start from.
+    :param follow: A regular expression of the URLs of the links to follow, or None.
+    :param max_pages: The most pages to crawl.
+    :param workers: The number of fetching threads.
+    :param throttle: The HostThrottle limiting the requests to each host.
+    :param parse_workers: The number of parsing processes (0 parses on the fetching threads instead).
+    :param parser: The parser (see parse_wikitables()).
+    :param on_page: Called with (url, tables, error) for every crawled page, where error is set if it failed.
+    :return: The number of crawled pages.
+    """
+    import concurrent.futures
+
+    def fetch(url):
+        with throttle.slot(url):
+            return fetcher.fetch(url)
+
+    seen = set()
+    pending = {}
+
+    with concurrent.futures.ThreadPoolExecutor(workers) as fetch_pool, (
+        concurrent.futures.ProcessPoolExecutor(parse_workers) if parse_workers > 0 else nullcontext(fetch_pool)
+    ) as parse_pool:
+
+        def schedule(url):
+            if url not in seen and len(seen) < max_pages:
+                seen.add(url)
+                pending[fetch_pool.submit(fetch, url)] = ("fetch", url)
+
+        for url in urls:
+            schedule(url)
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                stage, url = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    on_page(url, None, f"Error {'fetching' if stage == 'fetch' else 'parsing'} the webpage: {e}")
+                    continue
+                if stage == "fetch":
+                    pending[parse_pool.submit(parse_page, url, result, follow, parser)] = ("parse", url)
+                else:
+                    tables, links = result
+                    on_page(url, tables, None)
+                    for link in links:
+                        schedule(link)
+    return len(seen)
+
+
+def run_crawl(args, fetcher):
+    """Crawls the --crawl URLs and prints the wikitables of every page, in crawl order."""
+    pages = {}
+
+    def on_page(url, tables, error):
+        pages[url] = (tables, error)
+        if error:
+            print(f"FAILED: {url}: {error}")
+        else:
+            print(f"OK: {url} ({len(tables)} tables, {sum(len(rows) for _, rows in tables)} rows)")
+
+    started = time.perf_counter()
+    throttle = HostThrottle(max(1, args.per_host), max(0.0, args.delay))
+    count = crawl(
+        fetcher,
+        args.crawl,
+        args.follow,
+        args.max_pages,
+        max(1, args.workers),
+        throttle,
+        max(0, args.parse_workers),
+        args.parser,
+        on_page,
+    )
+    elapsed = time.perf_counter() - started
+
+    for url, (tables, error) in pages.items():
+        for table_headings, table_data in tables or []:
+            print(f"\n{url}\n")
+            print(table_dataframe(table_headings, table_data, args.raw).to_string(index=False))
+    failed = sum(1 for _, error in pages.values() if error)
+    print(f"\nCrawled {count} pages ({failed} failed) in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.1f} pages/s).")
+    print("Served: " + ", ".join(f"{count} {served.replace('_', ' ')}" for served, count in fetcher.stats.items()))
+
+
+PARSE_BENCHMARK_BACKENDS = (
+    ("html.parser, full tree", "html.parser", False),
+    ("html.parser + SoupStrainer", "html.parser", True),
+    ("lxml + SoupStrainer", "lxml", True),
+    ("lxml iterparse", "iterparse", True),
+)
+
+
+def resident_memory():
+    """
+    Returns Tuple (current, peak) of the resident memory of the process in bytes, after resetting the peak to the
+    current value (Linux only, None elsewhere).
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        with open("/proc/self/status") as file:
+            status = dict(line.split(":", 1) for line in file if ":" in line)
+        return int(status["VmRSS"].split()[0]) * 1024, int(status["VmHWM"].split()[0]) * 1024
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def benchmark_parser(webpage_content, parser, strain, runs):
+    """
+    Measures a parser on a page. This runs in a fresh process for every parser, so the memory of one does not hide the
+    peak of the next.
+
+    :return: Tuple (seconds, python_peak, rss_peak, tables): the fastest of the runs, the peak of the Python allocations
+             and the growth of the resident memory of the process (which also counts lxml's C allocations, None if it
+             cannot be measured) in bytes during the first run, and the extracted tables.
+    """
+    import tracemalloc
+
+    # Import the parser's modules before the baseline is taken
+    parse_wikitables("<table></table>", parser, strain=strain)
+
+    baseline = resident_memory()
+    tracemalloc.start()
+    tables, _ = parse_wikitables(webpage_content, parser, strain=strain)
+    python_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    peak = resident_memory()
+    rss_peak = peak[1] - baseline[0] if baseline is not None and peak is not None else None
+
+    fastest = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        parse_wikitables(webpage_content, parser, strain=strain)
+        elapsed = time.perf_counter() - started
+        fastest = elapsed if fastest is None else min(fastest, elapsed)
+    return fastest, python_peak, rss_peak, tables
+
+
+def run_parse_benchmark(args, fetcher):
+    """Compares the parse time and peak memory of the parsers on the page (use --fixtures to benchmark another page)."""
+    import concurrent.futures
+    import importlib.util
+    import multiprocessing
+
+    try:
+        webpage_content = fetcher.fetch(LARGEST_US_COMPANIES_URL)
+    except Exception as e:
+        print(f"ERROR: Could not fetch the page to benchmark: {e}")
+        return
+
+    runs = max(1, args.parse_runs)
+    print(f"Parsing a {len(webpage_content.encode('utf-8')) / 1024:,.0f} KiB page (fastest of {runs} runs):\n")
+    print(f"{'Parser':<28}{'Time':>10}{'Python peak':>14}{'RSS peak':>12}{'Tables':>8}  Same tables")
+
+    expected = None
+    for name, parser, strain in PARSE_BENCHMARK_BACKENDS:
+        if parser != "html.parser" and importlib.util.find_spec("lxml") is None:
+            print(f"{name:<28}{'skipped (lxml is not installed)':>44}")
+            continue
+        with concurrent.futures.ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            seconds, python_peak, rss_peak, tables = pool.submit(
+                benchmark_parser, webpage_content, parser, strain, runs
+            ).result()
+        if expected is None:
+            expected = tables
+        print(
+            f"{name:<28}{seconds * 1000:>8.1f}ms{python_peak / 2**20:>11.1f}MiB"
+            + (f"{rss_peak / 2**20:>9.1f}MiB" if rss_peak is not None else f"{'n/a':>12}")
+            + f"{len(tables):>8}  {'yes' if tables == expected else 'NO'}"
+        )
+
+
+def serve_fixtures(fixtures_dir, port, latency=0.0):
+    """
+    Starts a local HTTP server of fixture pages on a background thread. The pages (named as in fixture_path()) are
+    served with ETag and Last-Modified validators, so crawls and the HTTP cache can be tried against it.
+
+    :param fixtures_dir: The directory of the fixture pages.
+    :param port: The port to listen on (0 picks a free port).
+    :param latency: Seconds to wait before answering each request, to simulate a remote server.
+    :return: The server (its server_port is the port it listens on, shutdown() stops it).
+    """
+    import http.server
+
+    class FixtureRequestHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            path = fixture_path(fixtures_dir, self.path.split("?", 1)[0])
+            try:
+                with open(path, "rb") as file:
+                    body = file.read()
+                    modified = os.fstat(file.fileno()).st_mtime
+            except OSError:
+                self.send_error(404)
+                return
+
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", self.date_time_string(modified))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), FixtureRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def create_arg_parser() -> argparse.ArgumentParser:
+    """
+    Creates and returns the argument parser for command-line arguments.
+
+    Returns:
+        argparse.ArgumentParser: The argument parser.
+    """
+    parser = argparse.ArgumentParser(
+        description="Scrape the list of the largest companies in the US by revenue from Wikipedia."
+    )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        help=f"The SQLite file of the HTTP cache. Default is '{arg_defaults['cache']}'.",
+        default=arg_defaults["cache"],
+    )
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Fetch the pages in full without the HTTP cache.",
+        default=arg_defaults["no_cache"],
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Do no network I/O: serve the pages from the HTTP cache or the --fixtures directory only.",
+        default=arg_defaults["offline"],
+    )
+    parser.add_argument(
+        "--fixtures",
+        type=str,
+        help="A directory of fixture pages (named after the last segment of the URL path, plus .html) which are served instead of fetching the pages. Default is None.",
+        default=arg_defaults["fixtures"],
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help=f"The timeout of an HTTP request, in seconds. Default is {arg_defaults['timeout']}.",
+        default=arg_defaults["timeout"],
+    )
+    parser.add_argument(
+        "--parser",
+        type=str,
+        choices=["auto", "html.parser", "lxml", "iterparse"],
+        help="How pages are parsed: Beautiful Soup with html.parser or lxml, or lxml's streaming iterparse. Default is auto (lxml if it is installed).",
+        default=arg_defaults["parser"],
+    )
+    parser.add_argument(
+        "--all_tables",
+        action="store_true",
+        help="Print every wikitable of the page, not just the first one.",
+        default=arg_defaults["all_tables"],
+    )
+    parser.add_argument(
+        "--raw",
+        action="store_true",
+        help="Keep every cell as text instead of converting the number columns to numeric dtypes.",
+        default=arg_defaults["raw"],
+    )
+    parser.add_argument(
+        "--snapshots",
+        type=str,
+        help=f"The directory of the snapshots of the dataset. Default is '{arg_defaults['snapshots']}'.",
+        default=arg_defaults["snapshots"],
+    )
+    parser.add_argument(
+        "--no_snapshot",
+        action="store_true",
+        help="Do not save a snapshot of the dataset (or diff it against the previous one).",
+        default=arg_defaults["no_snapshot"],
+    )
+    parser.add_argument(
+        "--snapshot_format",
+        type=str,
+        choices=["feather", "parquet"],
+        help=f"The file format of new snapshots: uncompressed Feather (fastest to read) or compressed Parquet (smallest). Default is {arg_defaults['snapshot_format']}.",
+        default=arg_defaults["snapshot_format"],
+    )
+    parser.add_argument(
+        "--key",
+        type=str,
+        help=f"The column which identifies a row when diffing snapshots. Default is {arg_defaults['key']}.",
+        default=arg_defaults["key"],
+    )
+    parser.add_argument(
+        "--history",
+        action="store_true",
+        help="List the snapshots of the dataset instead of scraping.",
+        default=arg_defaults["history"],
+    )
+    parser.add_argument(
+        "--history_key",
+        type=str,
+        help="Print the row with this --key value in every snapshot instead of scraping. Default is None.",
+        default=arg_defaults["history_key"],
+    )
+    parser.add_argument(
+        "--parse_benchmark",
+        action="store_true",
+        help="Compare the parse time and peak memory of the parsers on the page (or its --fixtures page).",
+        default=arg_defaults["parse_benchmark"],
+    )
+    parser.add_argument(
+        "--parse_runs",
+        type=int,
+        help=f"The number of runs of each parser in the parse benchmark (the fastest is reported). Default is {arg_defaults['parse_runs']}.",
+        default=arg_defaults["parse_runs"],
+    )
+    parser.add_argument(
+        "--crawl",
+        type=str,
+        nargs="+",
+        help="Crawl these URLs (and the links matching --follow) concurrently instead of scraping the default page. Default is None.",
+        default=arg_defaults["crawl"],
+    )
+    parser.add_argument(
+        "--follow",
+        type=str,
+        help="A regular expression of the absolute URLs of the links to follow when crawling. Default is None (follow no links).",
+        default=arg_defaults["follow"],
+    )
+    parser.add_argument(
+        "--max_pages",
+        type=int,
+        help=f"The most pages to crawl. Default is {arg_defaults['max_pages']}.",
+        default=arg_defaults["max_pages"],
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help=f"The number of threads fetching pages (and pooled connections). Default is {arg_defaults['workers']}.",
+        default=arg_defaults["workers"],
+    )
+    parser.add_argument(
+        "--per_host",
+        type=int,
+        help=f"The most concurrent requests to the same host. Default is {arg_defaults['per_host']}.",
+        default=arg_defaults["per_host"],
+    )
+    parser.add_argument(
+        "--delay",
+        type=float,
+        help=f"The seconds between the start of two requests to the same host. Default is {arg_defaults['delay']}.",
+        default=arg_defaults["delay"],
+    )
+    parser.add_argument(
+        "--parse_workers",
+        type=int,
+        help="The number of processes parsing crawled pages (0 parses them on the fetching threads). Default is the number of CPUs.",
+        default=arg_defaults["parse_workers"],
+    )
+    parser.add_argument(
+        "--serve_fixtures",
+        type=str,
+        help="Serve this directory of fixture pages over a local HTTP server on --port until CTRL+C, to crawl it. Default is None.",
+        default=arg_defaults["serve_fixtures"],
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        help=f"The port of --serve_fixtures. Default is {arg_defaults['port']}.",
+        default=arg_defaults["port"],
+    )
+    parser.add_argument(
+        "--serve_latency",
+        type=float,
+        help=f"Seconds --serve_fixtures waits before answering each request, to simulate a remote server. Default is {arg_defaults['serve_latency']}.",
+        default=arg_defaults["serve_latency"],
+    )
+    return parser
+
+
 def main():
+    args = create_arg_parser().parse_args()
+    if args.serve_fixtures is not None:
+        try:
+            server = serve_fixtures(args.serve_fixtures, args.port, args.serve_latency)
+        except OSError as e:
+            print(f"ERROR: Could not start the fixture server on port {args.port}: {e}")
+            return
+        print(f"Serving the fixture pages of '{args.serve_fixtures}' at http://127.0.0.1:{server.server_port}/ (CTRL+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    import pandas as pd
+
     pd.set_option("display.max_rows", None)
-    print("Web Scraping: Largest Companies in the US by Revenue\n")
+    if args.history or args.history_key is not None:
+        try:
+            run_history(args)
+        except ImportError:
+            print("Snapshots need pyarrow (pip install pyarrow).")
+        except OSError as e:
+            print(f"ERROR: Could not read the snapshots: {e}")
+        return
+    if args.crawl is None and not args.parse_benchmark:
+        print("Web Scraping: Largest Companies in the US by Revenue\n")
+    try:
+        cache = None if args.no_cache else HTTPCache(args.cache)
+    except sqlite3.Error as e:
+        print(f"ERROR: Could not open the HTTP cache '{args.cache}': {e}")
+        return
+    session = create_session(pool_size=max(1, args.workers)) if args.crawl is not None and not args.offline else None
+    fetcher = PageFetcher(cache, args.offline, args.fixtures, args.timeout, session)
     try:
-        df = fetch_largest_us_companies_dataset()
+        if args.parse_benchmark:
+            run_parse_benchmark(args, fetcher)
+            return
+        if args.crawl is not None:
+            run_crawl(args, fetcher)
+            return
+        if args.all_tables:
+            for i, df in enumerate(fetch_largest_us_companies_dataset(fetcher, args.parser, all_tables=True, raw=args.raw)):
+                print(f"{'' if i == 0 else chr(10)}Table {i + 1}:\n")
+                print(df.to_string(index=False))
+            return
+        if args.no_snapshot:
+            df = fetch_largest_us_companies_dataset(fetcher, args.parser, raw=args.raw)
+        else:
+            table = fetch_largest_us_companies_tables(fetcher, args.parser)[0]
+            try:
+                df = snapshot_dataset(args, table)
+            except ImportError:
+                print("Snapshots need pyarrow (pip install pyarrow), skipping the snapshot.\n")
+                df = table_dataframe(*table, raw=args.raw)
         print(df.to_string(index=False))
     except Exception as e:
         print(f"ERROR: {e}")
         return
+    finally:
+        fetcher.close()
+        if cache is not None:
+            cache.close()
 
 
 if __name__ == "__main__":
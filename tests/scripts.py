@@ -0,0 +1,25 @@
+"""Loads the project scripts, whose hyphenated file names can not be imported as modules."""
+
+import importlib.util
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_script(project_dir, filename):
+    """
+    Loads a project script as a module, without running its main().
+
+    :param project_dir: The project directory, e.g. "4-zodiac-sign".
+    :param filename: The script file name, e.g. "zodiac-sign.py".
+    :return: The loaded module.
+    """
+    path = os.path.join(ROOT_DIR, project_dir, filename)
+    name = os.path.splitext(filename)[0].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    # Registered like an imported module, so its functions can be pickled (e.g. for forked worker processes)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
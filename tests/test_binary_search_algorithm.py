@@ -0,0 +1,103 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from tests.scripts import load_script
+
+binary_search = load_script("2-binary-search-algorithm", "binary-search-algorithm.py")
+
+
+class SearchEngineTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.arr = np.sort(rng.integers(0, 500, size=1000))
+        self.targets = np.arange(-5, 510)
+
+    def expected(self, arr=None):
+        """The first index of every target, found the slow way."""
+        positions = {}
+        for index, value in enumerate((self.arr if arr is None else arr).tolist()):
+            positions.setdefault(value, index)
+        return np.array([positions.get(target, -1) for target in self.targets.tolist()])
+
+    def test_batch_search_matches_the_loop(self):
+        expected = self.expected()
+        np.testing.assert_array_equal(binary_search.binary_search_leftmost(self.arr, self.targets), expected)
+        loop = [binary_search.binary_search_loop(self.arr, target) for target in self.targets.tolist()]
+        found = np.array(loop) >= 0
+        np.testing.assert_array_equal(found, expected >= 0)
+        np.testing.assert_array_equal(self.arr[np.array(loop)[found]], self.targets[found])
+
+    def test_rightmost_and_ranges(self):
+        rightmost = binary_search.binary_search_rightmost(self.arr, self.targets)
+        for target, index in zip(self.targets.tolist(), rightmost.tolist()):
+            if index >= 0:
+                self.assertEqual(self.arr[index], target)
+                self.assertTrue(index == self.arr.size - 1 or self.arr[index + 1] != target)
+        self.assertEqual(binary_search.count_in_range(self.arr, 100, 200), np.sum((self.arr >= 100) & (self.arr <= 200)))
+        self.assertEqual(binary_search.count_in_range(self.arr, 200, 100), 0)
+
+    def test_eytzinger_matches_searchsorted(self):
+        for size in (0, 1, 2, 7, 8, 1000):
+            with self.subTest(size=size):
+                arr = self.arr[:size]
+                index = binary_search.EytzingerIndex(arr)
+                np.testing.assert_array_equal(index.search(self.targets), self.expected(arr))
+
+    def test_engines_agree(self):
+        for name in ("loop", "numpy", "eytzinger"):
+            search = binary_search.create_search_engine(name, self.arr)
+            for target in (-1, int(self.arr[0]), int(self.arr[-1]), 1000):
+                with self.subTest(engine=name, target=target):
+                    index = search(target)
+                    if target in (-1, 1000):
+                        self.assertEqual(index, -1)
+                    else:
+                        self.assertEqual(self.arr[index], target)
+
+
+class SortTest(unittest.TestCase):
+    def test_sort_algorithms(self):
+        values = np.random.default_rng(2).integers(-1000, 1000, size=5000, dtype=np.int32)
+        for algorithm in ("quicksort", "mergesort", "radix"):
+            with self.subTest(algorithm=algorithm):
+                np.testing.assert_array_equal(binary_search.sort_array(values, algorithm), np.sort(values))
+
+    def test_external_merge_sort_index(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "index.npy")
+            # More integers than sort_memory, so the index is built from several sorted runs
+            binary_search.build_index_file(path, 300_000, 0, 60_000, sort_memory=50_000)
+            index = binary_search.open_index_file(path)
+            self.assertEqual(index.size, 300_000)
+            self.assertEqual(index.dtype, np.uint16)
+            self.assertTrue(np.all(index[1:] >= index[:-1]))
+            self.assertEqual(os.listdir(temp_dir), ["index.npy"])
+            del index
+
+
+class MainTest(unittest.TestCase):
+    def run_main(self, *argv):
+        output = io.StringIO()
+        with mock.patch.object(sys, "argv", ["binary-search-algorithm.py", *argv]):
+            with contextlib.redirect_stdout(output):
+                binary_search.main()
+        return output.getvalue()
+
+    def test_index_build_errors_are_reported(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            missing_dir = os.path.join(temp_dir, "missing", "index.npy")
+            self.assertIn("Failed to build index file", self.run_main("--index", missing_dir))
+            index_path = os.path.join(temp_dir, "index.npy")
+            output = self.run_main("--index", index_path, "--min_value", "10", "--max_value", "1")
+            self.assertIn("Failed to build index file", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
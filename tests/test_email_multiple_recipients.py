@@ -0,0 +1,308 @@
+import asyncio
+import contextlib
+import io
+import os
+import smtplib
+import socket
+import tempfile
+import unittest
+
+from aiosmtpd.controller import Controller
+
+from tests.scripts import load_script
+
+email_sender = load_script("3-email-multiple-recipients", "email-multiple-recipients.py")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def smtp_config(port):
+    return {
+        "smtp_server": "127.0.0.1",
+        "smtp_port": port,
+        "use_tls": False,
+        "smtp_username": "",
+        "smtp_password": "",
+        "from_address": "sender@example.com",
+    }
+
+
+class SinkHandler:
+    """An aiosmtpd handler refusing 'bad*' (550) and 'busy*' (451) recipients and messages containing 'reject'."""
+
+    def __init__(self):
+        self.delivered = []
+        self.ehlo = 0
+        self.rset = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.ehlo += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("bad"):
+            return "550 No such user"
+        if address.startswith("busy"):
+            return "451 Try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if b"reject" in envelope.content:
+            return "554 Message rejected"
+        self.delivered.extend(envelope.rcpt_tos)
+        return "250 OK"
+
+    async def handle_RSET(self, server, session, envelope):
+        self.rset += 1
+        return "250 OK"
+
+
+class AddressValidatorTest(unittest.TestCase):
+    def test_validate_normalizes_and_drops_duplicates(self):
+        validator = email_sender.AddressValidator(deny_domains={"spam.example"})
+        valid, invalid = validator.validate(
+            [" Ada@Example.COM ", "ada@example.com", "no-at-sign", "x@mail.spam.example", "bad@-host.example"]
+        )
+        self.assertEqual(valid, ["Ada@example.com"])
+        self.assertEqual(
+            invalid,
+            [("no-at-sign", "invalid format"), ("x@mail.spam.example", "denied domain"), ("bad@-host.example", "invalid domain")],
+        )
+
+    def test_allow_list_includes_subdomains(self):
+        validator = email_sender.AddressValidator(allow_domains={"example.com"})
+        valid, invalid = validator.validate(["a@example.com", "b@mail.example.com", "c@example.org"])
+        self.assertEqual(valid, ["a@example.com", "b@mail.example.com"])
+        self.assertEqual(invalid, [("c@example.org", "domain not allowed")])
+
+
+class SMTPConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.handler = SinkHandler()
+        self.controller = Controller(self.handler, hostname="127.0.0.1", port=free_port())
+        self.controller.start()
+        self.addCleanup(self.controller.stop)
+        self.pool = email_sender.SMTPConnectionPool(smtp_config(self.controller.port), size=2)
+        self.addCleanup(self.pool.close)
+
+    def test_large_lists_are_sent_in_batches(self):
+        recipients = [f"user{i}@example.com" for i in range(25)] + ["bad@example.com"]
+        self.assertEqual([len(batch) for batch in email_sender.chunk_recipients(recipients, 10)], [10, 10, 6])
+        results = email_sender.send_in_batches(
+            self.pool, "sender@example.com", recipients, b"Subject: Hi\n\nhello\n", 10
+        )
+        self.assertEqual([batch for batch, _ in results], email_sender.chunk_recipients(recipients, 10))
+        self.assertEqual(results[2][1], {"bad@example.com": (550, b"No such user")})
+        self.assertEqual(sorted(self.handler.delivered), sorted(recipients[:-1]))
+        self.assertLessEqual(self.handler.ehlo, 2)
+
+
+class InstrumentedSMTPTest(unittest.TestCase):
+    def test_silent_server_times_out(self):
+        with socket.socket() as listener:
+            listener.bind(("127.0.0.1", 0))
+            listener.listen()
+            metrics = email_sender.SMTPMetrics()
+            # The server accepts the connection but never sends its greeting
+            with self.assertRaises((TimeoutError, smtplib.SMTPServerDisconnected)):
+                email_sender.InstrumentedSMTP("127.0.0.1", listener.getsockname()[1], metrics, timeout=0.2)
+        self.assertEqual(metrics.errors, {"connect": 1})
+
+
+class AsyncSMTPTest(unittest.TestCase):
+    def setUp(self):
+        self.handler = SinkHandler()
+        self.controller = Controller(self.handler, hostname="127.0.0.1", port=free_port())
+        self.controller.start()
+        self.addCleanup(self.controller.stop)
+        self.config = smtp_config(self.controller.port)
+
+    def send(self, messages, retries=0):
+        results = {}
+
+        def on_result(key, address, error):
+            results[key] = error
+
+        run = email_sender.send_bulk_async_run(
+            self.config, messages, 1, 100, retries, 0.0, 1, 0.01, on_result
+        )
+        asyncio.run(asyncio.wait_for(run, 10))
+        return results
+
+    def test_refusals_reset_the_transaction_and_keep_the_connection(self):
+        results = self.send(
+            [
+                (1, "a@example.com", b"Subject: 1\n\nhello\n"),
+                (2, "bad@example.com", b"Subject: 2\n\nhello\n"),
+                (3, "c@example.com", b"Subject: 3\n\nreject\n"),
+                (4, "d@example.com", b"Subject: 4\n\nhello\n"),
+            ]
+        )
+        self.assertIsNone(results[1])
+        self.assertIsInstance(results[2], smtplib.SMTPRecipientsRefused)
+        self.assertIsInstance(results[3], smtplib.SMTPDataError)
+        self.assertIsNone(results[4])
+        self.assertEqual(self.handler.delivered, ["a@example.com", "d@example.com"])
+        self.assertEqual(self.handler.ehlo, 1)
+        self.assertEqual(self.handler.rset, 2)
+
+    def test_temporary_failures_are_retried(self):
+        results = self.send([(1, "busy@example.com", b"Subject: 1\n\nhello\n")], retries=2)
+        self.assertTrue(email_sender.is_transient_error(results[1]))
+
+    def test_unexpected_error_fails_only_its_message(self):
+        # A message which can not be serialized raises a TypeError inside the worker
+        results = self.send(
+            [(1, "a@example.com", None), (2, "b@example.com", b"Subject: 2\n\nhello\n")]
+        )
+        self.assertIsInstance(results[1], TypeError)
+        self.assertIsNone(results[2])
+        self.assertEqual(self.handler.delivered, ["b@example.com"])
+
+
+class AsyncSMTPTimeoutTest(unittest.TestCase):
+    def serve(self, on_connection, scenario):
+        """Runs scenario(config) against a raw TCP server calling on_connection(reader, writer)."""
+
+        async def run():
+            server = await asyncio.start_server(on_connection, "127.0.0.1", 0)
+            async with server:
+                port = server.sockets[0].getsockname()[1]
+                return await asyncio.wait_for(scenario(smtp_config(port)), 10)
+
+        return asyncio.run(run())
+
+    def test_silent_server_times_out(self):
+        async def silent(reader, writer):
+            await reader.read()
+            writer.close()
+
+        async def scenario(config):
+            connection = email_sender.AsyncSMTPConnection(config, timeout=0.2)
+            with self.assertRaises(smtplib.SMTPServerDisconnected):
+                await connection.connect()
+            await connection.close()
+
+        self.serve(silent, scenario)
+
+    def test_malformed_reply_fails_the_message(self):
+        async def garbled(reader, writer):
+            writer.write(b"220 ready\r\n")
+            await reader.readline()
+            writer.write(b"garbage\r\n")
+            await writer.drain()
+            writer.close()
+
+        async def scenario(config):
+            results = {}
+            await email_sender.send_bulk_async_run(
+                config,
+                [(1, "a@example.com", b"hello\n"), (2, "b@example.com", b"hello\n")],
+                1,
+                100,
+                0,
+                0.0,
+                1,
+                0.01,
+                lambda key, address, error: results.__setitem__(key, error),
+            )
+            return results
+
+        results = self.serve(garbled, scenario)
+        self.assertIsInstance(results[1], smtplib.SMTPServerDisconnected)
+        self.assertIsInstance(results[2], smtplib.SMTPServerDisconnected)
+
+
+class SpoolTest(unittest.TestCase):
+    def setUp(self):
+        self.handler = SinkHandler()
+        self.controller = Controller(self.handler, hostname="127.0.0.1", port=free_port())
+        self.controller.start()
+        self.addCleanup(self.controller.stop)
+        self.config = smtp_config(self.controller.port)
+
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.dir = temp_dir.name
+        self.recipients = self.write("recipients.csv", "email,name\na@example.com,A\nbusy@example.com,B\n")
+        self.spool = email_sender.Spool(os.path.join(self.dir, "outbox.sqlite3"))
+        self.addCleanup(self.spool.close)
+
+    def write(self, filename, text):
+        path = os.path.join(self.dir, filename)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+        return path
+
+    def spool_bulk(self, template):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return email_sender.spool_bulk(
+                self.spool, self.config, self.recipients, template, email_sender.AddressValidator()
+            )
+
+    def drain(self, max_attempts=2):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return email_sender.drain_spool(self.spool, self.config, 1, 100, max_attempts, 0.01)
+
+    def test_campaign_is_spooled_once(self):
+        template = self.write("template.txt", "Subject: Hello {name}\n\nHi {name}\n")
+        self.assertEqual(self.spool_bulk(template), 2)
+        self.assertEqual(self.drain(), (1, 1))
+        # Spooling the same campaign again (e.g. after a crash) sends nothing twice
+        self.assertEqual(self.spool_bulk(template), 0)
+        self.assertEqual(self.drain(), (0, 0))
+        self.assertEqual(self.handler.delivered, ["a@example.com"])
+
+    def test_edited_recipients_file_only_spools_new_recipients(self):
+        template = self.write("template.txt", "Subject: Hello {name}\n\nHi {name}\n")
+        self.assertEqual(self.spool_bulk(template), 2)
+        self.drain()
+        # A row inserted at the top shifts every line number, the recipients below must not be spooled again
+        self.write("recipients.csv", "email,name\nc@example.com,C\nA@Example.com,A\nbusy@example.com,B\n")
+        self.assertEqual(self.spool_bulk(template), 1)
+        self.drain()
+        self.assertEqual(self.handler.delivered, ["a@example.com", "c@example.com"])
+
+    def test_new_template_is_a_new_campaign(self):
+        self.spool_bulk(self.write("first.txt", "Subject: Hello {name}\n\nHi\n"))
+        self.drain()
+        self.assertEqual(self.spool_bulk(self.write("second.txt", "Subject: Sale {name}\n\nBuy\n")), 2)
+        self.drain()
+        self.assertEqual(self.handler.delivered, ["a@example.com", "a@example.com"])
+
+    def test_failed_recipients_are_requeued(self):
+        self.spool_bulk(self.write("template.txt", "Subject: Hello {name}\n\nHi\n"))
+        self.drain()
+        self.assertEqual(self.spool.counts(), {"sent": 1, "failed": 1})
+        self.assertEqual(self.spool.retry_failed(), 1)
+        self.assertEqual(self.spool.counts(), {"sent": 1, "pending": 1})
+
+    def test_single_message_is_spooled_once(self):
+        config = dict(
+            self.config,
+            to_addresses=["a@example.com"],
+            cc_addresses=[],
+            bcc_addresses=["b@example.com"],
+            subject="Subject",
+            body="Body",
+        )
+        args = email_sender.create_arg_parser().parse_args(["--spool", "outbox.sqlite3"])
+        for _ in range(2):
+            with contextlib.redirect_stdout(io.StringIO()):
+                email_sender.send_email(args, config, self.spool, None)
+        self.assertEqual(self.handler.delivered, ["a@example.com", "b@example.com"])
+
+    def test_message_key_depends_on_content(self):
+        key = email_sender.message_key("a@example.com", ["b@example.com"], "Subject", "Body")
+        self.assertEqual(key, email_sender.message_key("a@example.com", ["b@example.com"], "Subject", "Body"))
+        self.assertNotEqual(key, email_sender.message_key("a@example.com", ["b@example.com"], "Subject", "Body 2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
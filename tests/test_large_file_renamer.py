@@ -0,0 +1,152 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from tests.scripts import load_script
+
+renamer = load_script("5-large-file-renamer", "large-file-renamer.py")
+
+
+class RenamePatternTest(unittest.TestCase):
+    def test_placeholders(self):
+        pattern = renamer.RenamePattern("{date:%Y}_{num:03}_{name}_{size}_{hash:4}.{ext}")
+        mtime_ns = 1_700_000_000 * 10**9
+        self.assertEqual(
+            pattern.render("report", "pdf", 7, 1234, mtime_ns, "abcdef"),
+            f"{renamer.datetime.fromtimestamp(mtime_ns / 1e9):%Y}_007_report_1234_abcd.pdf",
+        )
+        self.assertTrue(pattern.needs_stat)
+        self.assertTrue(pattern.needs_digest)
+
+    def test_invalid_patterns(self):
+        for pattern in ("{unknown}", "{num:q}", "{name!r}", "{hash:abc}", "{name"):
+            with self.subTest(pattern=pattern):
+                with self.assertRaises(ValueError):
+                    renamer.RenamePattern(pattern)
+
+
+class RenameFilesTest(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.in_dir = os.path.join(temp_dir.name, "in")
+        self.out_dir = os.path.join(temp_dir.name, "out")
+        os.makedirs(self.in_dir)
+        self.journal_path = os.path.join(self.out_dir, renamer.JOURNAL_NAME)
+
+    def write(self, directory, filename, data):
+        path = os.path.join(directory, filename)
+        with open(path, "wb") as file:
+            file.write(data)
+        return path
+
+    def read(self, filename):
+        with open(os.path.join(self.out_dir, filename), "rb") as file:
+            return file.read()
+
+    def rename(self, pattern="new_{name}.{ext}", **options):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            renamer.rename_files(self.in_dir, self.out_dir, pattern, **options)
+        return output.getvalue()
+
+    def test_files_are_copied_to_their_new_names(self):
+        self.write(self.in_dir, "a.txt", b"alpha")
+        self.write(self.in_dir, "b.txt", b"beta")
+        self.rename()
+        self.assertEqual(self.read("new_a.txt"), b"alpha")
+        self.assertEqual(self.read("new_b.txt"), b"beta")
+
+    def test_resume_skips_copied_files(self):
+        self.write(self.in_dir, "a.txt", b"alpha")
+        self.rename()
+        self.assertIn("skipped 1", self.rename(resume=True))
+        # Without --resume the journal starts empty and the file is copied again
+        self.assertIn("Copied 1 of 1 files", self.rename())
+
+    def test_resume_continues_a_partial_copy(self):
+        data = os.urandom(100_000)
+        self.write(self.in_dir, "big.bin", data)
+        self.rename()
+
+        # Turn the finished copy into a partial one: a journal entry at byte 40000 and a destination whose first
+        # 40000 bytes are marked, so they must not be copied again
+        with open(self.journal_path, encoding="utf-8") as journal_file:
+            entry = json.loads(journal_file.readline())
+        entry.update(event="partial", offset=40_000)
+        with open(self.journal_path, "w", encoding="utf-8") as journal_file:
+            journal_file.write(json.dumps(entry) + "\n")
+        self.write(self.out_dir, "new_big.bin", b"x" * 40_000)
+
+        output = self.rename(resume=True)
+        self.assertIn("resuming at byte 40000", output)
+        self.assertEqual(self.read("new_big.bin"), b"x" * 40_000 + data[40_000:])
+
+    def test_partial_entry_of_a_changed_source_is_ignored(self):
+        self.write(self.in_dir, "big.bin", b"old")
+        self.rename()
+        with open(self.journal_path, encoding="utf-8") as journal_file:
+            entry = json.loads(journal_file.readline())
+        entry.update(event="partial", offset=2)
+        with open(self.journal_path, "w", encoding="utf-8") as journal_file:
+            journal_file.write(json.dumps(entry) + "\n")
+        self.write(self.in_dir, "big.bin", b"newer content")
+        self.rename(resume=True)
+        self.assertEqual(self.read("new_big.bin"), b"newer content")
+
+    def test_collisions_copy_nothing(self):
+        self.write(self.in_dir, "a.txt", b"alpha")
+        self.write(self.in_dir, "b.txt", b"beta")
+        output = self.rename(pattern="same.{ext}")
+        self.assertIn("Name collision", output)
+        self.assertFalse(os.path.exists(os.path.join(self.out_dir, "same.txt")))
+
+    def test_files_added_after_the_check_are_not_copied(self):
+        self.write(self.in_dir, "a.txt", b"alpha")
+        check_plan = renamer.check_plan
+
+        def check_plan_then_add_a_file(*args):
+            problems = check_plan(*args)
+            self.write(self.in_dir, "b.txt", b"beta")
+            return problems
+
+        with mock.patch.object(renamer, "check_plan", check_plan_then_add_a_file):
+            output = self.rename()
+        self.assertIn("Skip: b.txt -> new_b.txt (not in the checked plan)", output)
+        self.assertIn("1 files changed since the plan was checked", output)
+        self.assertEqual(self.read("new_a.txt"), b"alpha")
+        self.assertFalse(os.path.exists(os.path.join(self.out_dir, "new_b.txt")))
+
+    def test_dedupe_never_writes_through_a_link(self):
+        self.write(self.in_dir, "a.txt", b"same")
+        self.write(self.in_dir, "b.txt", b"same")
+        self.assertIn("deduped 1", self.rename(dedupe=True))
+        self.write(self.in_dir, "a.txt", b"changed")
+        self.rename(dedupe=True)
+        self.assertEqual(self.read("new_a.txt"), b"changed")
+        self.assertEqual(self.read("new_b.txt"), b"same")
+
+    def test_parallel_workers_copy_identical_content_once(self):
+        for number in range(8):
+            self.write(self.in_dir, f"{number}.txt", b"same")
+        copy_file = renamer.copy_file
+
+        def slow_copy_file(*args):
+            # Keep the first copy in flight while the other workers look for an existing copy
+            time.sleep(0.05)
+            return copy_file(*args)
+
+        with mock.patch.object(renamer, "copy_file", slow_copy_file):
+            output = self.rename(dedupe=True, jobs=8)
+        self.assertIn("Copied 1 of 8 files, skipped 0, deduped 7", output)
+        for number in range(8):
+            self.assertEqual(self.read(f"new_{number}.txt"), b"same")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Checks with -X importtime that the scripts which are run in loops do not import heavy modules on startup
+(only the code paths which need them import them).
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+from tests.scripts import ROOT_DIR
+
+
+def imported_modules(script_args):
+    """
+    Runs a script in a fresh interpreter with -X importtime.
+
+    :param script_args: The script path (relative to the repository root) and its arguments.
+    :return: Tuple (modules, import_ms): the top-level names of the imported modules and the time spent importing
+             them (excluding 'site', which depends on the Python installation rather than on the script).
+    """
+    script_path, *args = script_args
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.join(ROOT_DIR, script_path), *args],
+        capture_output=True,
+        text=True,
+        stdin=subprocess.DEVNULL,
+        cwd=ROOT_DIR,
+    )
+    if result.returncode != 0:
+        raise AssertionError(f"The script failed: {result.stderr.strip()[-500:]}")
+
+    modules = set()
+    import_us = 0
+    for line in result.stderr.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if not line.startswith("import time:") or len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2]
+        modules.add(name.strip().split(".")[0])
+        # Top-level imports are indented by one space, the imports they trigger by more
+        if not name.startswith("  ") and name.strip() != "site":
+            import_us += int(fields[1])
+    return modules, import_us / 1000
+
+
+class StartupTest(unittest.TestCase):
+    def assert_lazy(self, script_args, heavy_modules):
+        modules, import_ms = imported_modules(script_args)
+        imported = sorted(modules.intersection(heavy_modules))
+        self.assertEqual(imported, [], f"heavy modules imported on startup ({import_ms:.1f}ms of imports)")
+
+    def test_zodiac_sign_single_lookup(self):
+        self.assert_lazy(["4-zodiac-sign/zodiac-sign.py", "--birthdate", "01-01"], ("pandas", "numpy", "pyarrow"))
+
+    def test_web_scraping_help(self):
+        self.assert_lazy(["6-web-scraping/web-scraping.py", "--help"], ("pandas", "numpy", "requests", "bs4"))
+
+
+if __name__ == "__main__":
+    unittest.main()
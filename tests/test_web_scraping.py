@@ -0,0 +1,245 @@
+import argparse
+import contextlib
+import importlib.util
+import io
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from tests.scripts import load_script
+
+web_scraping = load_script("6-web-scraping", "web-scraping.py")
+
+SPANNING_TABLE = """
+<html><body>
+<table class="wikitable sortable">
+  <tr><th rowspan="2">Rank</th><th rowspan="2">Name</th><th colspan="2">Revenue</th></tr>
+  <tr><th>USD millions</th><th>Growth</th></tr>
+  <tr><td>1</td><td>Walmart[1]</td><td>$648,125</td><td>6.0%</td></tr>
+  <tr><td>2</td><td rowspan="2">Amazon</td><td>$574,785</td><td>\u22125.2%</td></tr>
+  <tr><td>3</td><td>n/a</td><td>(1.5%)</td></tr>
+  <tr><th>Rank</th><th>Name</th><th>USD millions</th><th>Growth</th></tr>
+</table>
+<table class="navbox"><tr><td>Not a wikitable</td></tr></table>
+</body></html>
+"""
+
+
+def write_page(directory, filename, html):
+    with open(os.path.join(directory, filename), "w", encoding="utf-8") as file:
+        file.write(html)
+
+
+class FixtureServerTest(unittest.TestCase):
+    """Runs a local fixture server, so the tests never touch the network."""
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.dir = temp_dir.name
+        self.fixtures_dir = os.path.join(self.dir, "fixtures")
+        os.makedirs(self.fixtures_dir)
+        self.server = web_scraping.serve_fixtures(self.fixtures_dir, 0)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def fetcher(self, **options):
+        fetcher = web_scraping.PageFetcher(**options)
+        self.addCleanup(fetcher.close)
+        return fetcher
+
+    def cache(self):
+        cache = web_scraping.HTTPCache(os.path.join(self.dir, "http_cache.sqlite3"))
+        self.addCleanup(cache.close)
+        return cache
+
+
+class PageFetcherTest(FixtureServerTest):
+    def test_cached_page_is_revalidated(self):
+        write_page(self.fixtures_dir, "Page.html", SPANNING_TABLE)
+        fetcher = self.fetcher(cache=self.cache())
+        url = f"{self.base_url}/wiki/Page"
+        self.assertEqual(fetcher.fetch(url), SPANNING_TABLE)
+        self.assertEqual(fetcher.fetch(url), SPANNING_TABLE)
+        self.assertEqual(fetcher.stats["fetched"], 1)
+        self.assertEqual(fetcher.stats["not_modified"], 1)
+
+    def test_offline_replays_the_cache(self):
+        write_page(self.fixtures_dir, "Page.html", SPANNING_TABLE)
+        cache = self.cache()
+        self.fetcher(cache=cache).fetch(f"{self.base_url}/wiki/Page")
+        self.server.shutdown()
+
+        offline = self.fetcher(cache=cache, offline=True)
+        self.assertEqual(offline.fetch(f"{self.base_url}/wiki/Page"), SPANNING_TABLE)
+        self.assertEqual(offline.stats["cached"], 1)
+        with self.assertRaises(Exception):
+            offline.fetch(f"{self.base_url}/wiki/Other")
+
+    def test_fixtures_are_served_instead_of_fetching(self):
+        write_page(self.fixtures_dir, "Page.html", SPANNING_TABLE)
+        fetcher = self.fetcher(offline=True, fixtures_dir=self.fixtures_dir)
+        self.assertEqual(fetcher.fetch("https://en.wikipedia.org/wiki/Page"), SPANNING_TABLE)
+        self.assertEqual(fetcher.stats["fixture"], 1)
+
+
+class CrawlTest(FixtureServerTest):
+    def setUp(self):
+        super().setUp()
+        links = "".join(f'<a href="/wiki/Page_{number}">Page {number}</a>' for number in range(1, 4))
+        write_page(self.fixtures_dir, "index.html", f'<html><body>{links}<a href="/other">Other</a></body></html>')
+        for number in range(1, 4):
+            write_page(self.fixtures_dir, f"Page_{number}.html", SPANNING_TABLE)
+
+    def crawl(self, max_pages, parse_workers=0):
+        pages = {}
+        count = web_scraping.crawl(
+            self.fetcher(),
+            [f"{self.base_url}/"],
+            r"/wiki/Page_",
+            max_pages,
+            2,
+            web_scraping.HostThrottle(2, 0.0),
+            parse_workers,
+            "html.parser",
+            lambda url, tables, error: pages.__setitem__(url, (tables, error)),
+        )
+        self.assertEqual(count, len(pages))
+        return pages
+
+    def test_links_are_followed(self):
+        pages = self.crawl(10)
+        self.assertEqual(
+            sorted(pages),
+            [f"{self.base_url}/"] + [f"{self.base_url}/wiki/Page_{number}" for number in range(1, 4)],
+        )
+        for number in range(1, 4):
+            tables, error = pages[f"{self.base_url}/wiki/Page_{number}"]
+            self.assertIsNone(error)
+            self.assertEqual(len(tables), 1)
+
+    def test_max_pages(self):
+        self.assertEqual(len(self.crawl(2)), 2)
+
+    @unittest.skipUnless(
+        multiprocessing.get_start_method() == "fork",
+        "the script is not importable by name, so only forked workers can run its functions",
+    )
+    def test_pages_are_parsed_in_worker_processes(self):
+        pages = self.crawl(10, parse_workers=2)
+        self.assertTrue(all(error is None for _, error in pages.values()))
+        self.assertEqual(len(pages), 4)
+
+
+class SpanTest(unittest.TestCase):
+    def test_rowspan_and_colspan_are_repeated(self):
+        grid = web_scraping.expand_spans(
+            [
+                [("a", 2, 1), ("b", 1, 2)],
+                [("c", 1, 1), ("d", 1, 1)],
+                [("e", 1, 1)],
+            ]
+        )
+        self.assertEqual(grid, [["a", "b", "b"], ["a", "c", "d"], ["e", "", ""]])
+
+    def test_malformed_spans(self):
+        self.assertEqual(web_scraping.cell_span(None), 1)
+        self.assertEqual(web_scraping.cell_span("3;"), 3)
+        self.assertEqual(web_scraping.cell_span("0"), 1)
+        self.assertEqual(web_scraping.cell_span("100000"), 1000)
+
+    def test_parsers_expand_header_rows_and_spans(self):
+        for parser in ("html.parser", "lxml", "iterparse"):
+            with self.subTest(parser=parser):
+                if parser != "html.parser" and importlib.util.find_spec("lxml") is None:
+                    self.skipTest("lxml is not installed")
+                tables, _ = web_scraping.parse_wikitables(SPANNING_TABLE, parser)
+                self.assertEqual(len(tables), 1)
+                headings, rows = tables[0]
+                self.assertEqual(headings, ["rank", "name", "revenue_usd_millions", "revenue_growth"])
+                # The repeated header row at the end is dropped, the rowspan fills the name of rank 3
+                self.assertEqual([row[:2] for row in rows], [["1", "Walmart[1]"], ["2", "Amazon"], ["3", "Amazon"]])
+
+
+class NumericCleaningTest(unittest.TestCase):
+    def test_number_columns_are_converted(self):
+        tables, _ = web_scraping.parse_wikitables(SPANNING_TABLE, "html.parser")
+        ds = web_scraping.table_dataframe(*tables[0])
+        self.assertEqual(ds["rank"].dtype, "int8")
+        self.assertEqual(ds["name"].tolist(), ["Walmart", "Amazon", "Amazon"])
+        self.assertEqual(str(ds["revenue_usd_millions"].dtype), "Int64")
+        self.assertEqual(ds["revenue_usd_millions"].tolist()[:2], [648125, 574785])
+        self.assertTrue(pd.isna(ds["revenue_usd_millions"][2]))
+        self.assertEqual(ds["revenue_growth"].tolist(), [6.0, -5.2, -1.5])
+
+    def test_raw_keeps_the_text(self):
+        tables, _ = web_scraping.parse_wikitables(SPANNING_TABLE, "html.parser")
+        ds = web_scraping.table_dataframe(*tables[0], raw=True)
+        self.assertEqual(ds["revenue_usd_millions"].tolist()[0], "$648,125")
+
+    def test_text_columns_stay_text(self):
+        ds = web_scraping.clean_numeric_columns(pd.DataFrame({"industry": ["Retail[a]", "12 Tech"]}))
+        self.assertEqual(ds["industry"].tolist(), ["Retail", "12 Tech"])
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.store = web_scraping.SnapshotStore(temp_dir.name)
+
+    def save(self, table_headings, table_data):
+        ds = web_scraping.table_dataframe(table_headings, table_data)
+        content_hash = web_scraping.table_hash(table_headings, table_data)
+        return self.store.save(web_scraping.SNAPSHOT_DATASET, ds, content_hash)
+
+    def history(self, key, history_key):
+        args = argparse.Namespace(
+            snapshots=self.store.directory,
+            snapshot_format=self.store.file_format,
+            key=key,
+            history_key=history_key,
+        )
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            web_scraping.run_history(args)
+        return output.getvalue()
+
+    def test_diff_datasets(self):
+        previous = pd.DataFrame({"name": ["A", "B", "C"], "revenue": [1, 2, 3]})
+        current = pd.DataFrame({"name": ["A", "C", "D"], "revenue": [1, 30, 4]})
+        added, removed, changed = web_scraping.diff_datasets(previous, current, "name")
+        self.assertEqual(added["name"].tolist(), ["D"])
+        self.assertEqual(removed["name"].tolist(), ["B"])
+        self.assertEqual(
+            changed.to_dict("records"), [{"name": "C", "column": "revenue", "previous": 3, "current": 30}]
+        )
+
+    def test_snapshots_round_trip(self):
+        headings = ["rank", "name"]
+        path = self.save(headings, [["1", "A"], ["2", "B"]])
+        self.assertEqual(self.store.latest(web_scraping.SNAPSHOT_DATASET)[0], path)
+        self.assertEqual(self.store.read(path)["name"].tolist(), ["A", "B"])
+        self.assertNotEqual(
+            web_scraping.table_hash(headings, [["1", "A"]]), web_scraping.table_hash(headings, [["1", "B"]])
+        )
+
+    def test_history_of_a_numeric_key(self):
+        self.save(["rank", "name"], [["1", "A"], ["2", "B"]])
+        output = self.history("rank", "2")
+        self.assertIn("B", output)
+        self.assertNotIn("No snapshot", output)
+
+    def test_history_key_of_the_wrong_type_is_reported(self):
+        self.save(["rank", "name"], [["1", "A"]])
+        output = self.history("rank", "first")
+        self.assertIn("can not match rank", output)
+        self.assertIn("No snapshot has a row with rank 'first'", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+from tests.scripts import load_script
+
+zodiac_sign = load_script("4-zodiac-sign", "zodiac-sign.py")
+
+
+class UserZodiacStoreTest(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.csv_path = os.path.join(temp_dir.name, "users.csv")
+
+    def open_store(self):
+        store = zodiac_sign.UserZodiacStore(self.csv_path)
+        self.addCleanup(store.close)
+        return store
+
+    def write_csv(self, rows, mode="w"):
+        with open(self.csv_path, mode, encoding="utf-8", newline="") as csv_file:
+            if mode == "w":
+                csv_file.write("Name,Birth_Date,Zodiac_Sign\r\n")
+            for row in rows:
+                csv_file.write(",".join(row) + "\r\n")
+
+    def test_duplicates_are_not_appended(self):
+        store = self.open_store()
+        self.assertTrue(store.append("Ada", "10-12", "Sagittarius"))
+        self.assertFalse(store.append("Ada", "10-12", "Sagittarius"))
+        self.assertTrue(self.open_store().contains("Ada", "10-12"))
+
+    def test_rows_appended_by_another_program_are_indexed(self):
+        self.open_store().append("Ada", "10-12", "Sagittarius")
+        self.write_csv([("Alan", "23-06", "Cancer")], mode="a")
+        store = self.open_store()
+        self.assertTrue(store.contains("Alan", "23-06"))
+        self.assertEqual(store.stale_rows, 0)
+
+    def test_replaced_file_is_reindexed(self):
+        self.open_store().append("Ada", "10-12", "Sagittarius")
+        # A different file of the same or larger size must not be mistaken for an appended one
+        self.write_csv([("Bob", "10-12", "Sagittarius"), ("Grace", "09-12", "Sagittarius")])
+        store = self.open_store()
+        self.assertFalse(store.contains("Ada", "10-12"))
+        self.assertTrue(store.contains("Bob", "10-12"))
+        self.assertTrue(store.contains("Grace", "09-12"))
+
+    def test_rows_are_written_with_lf_line_endings(self):
+        store = self.open_store()
+        store.append("Ada", "10-12", "Sagittarius")
+        store.append("Alan", "23-06", "Cancer")
+        store.compact()
+        with open(self.csv_path, "rb") as csv_file:
+            self.assertEqual(
+                csv_file.read(), b"Name,Birth_Date,Zodiac_Sign\nAda,10-12,Sagittarius\nAlan,23-06,Cancer\n"
+            )
+
+    def test_compact_removes_duplicate_and_malformed_rows(self):
+        self.write_csv([("Ada", "10-12", "Sagittarius"), ("Ada", "10-12", "Sagittarius"), ("broken",)])
+        store = self.open_store()
+        self.assertEqual(store.stale_rows, 2)
+        self.assertEqual(store.compact(), 2)
+        self.assertEqual(list(store.read_rows()), [["Ada", "10-12", "Sagittarius"]])
+        self.assertEqual(self.open_store().stale_rows, 0)
+
+
+class ZodiacLookupTest(unittest.TestCase):
+    def test_cusps(self):
+        lookup = zodiac_sign.ZodiacLookup(zodiac_sign.load_zodiac_signs_dataset())
+        self.assertEqual(lookup.find(3, 21), "Aries")
+        self.assertEqual(lookup.find(12, 31), "Capricorn")
+        self.assertEqual(lookup.find(1, 1), "Capricorn")
+        self.assertEqual(lookup.find(2, 29), "Pisces")
+
+
+class BatchTest(unittest.TestCase):
+    def test_parse_birthdates(self):
+        days = zodiac_sign.parse_birthdates(["01-01", "29-02", "31-12", "31-02", "1-1", None])
+        self.assertEqual(days.tolist(), [0, 59, 365, -1, -1, -1])
+
+    def test_classify_file_in_chunks(self):
+        lookup = zodiac_sign.ZodiacLookup(zodiac_sign.load_zodiac_signs_dataset())
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, "people.csv")
+            output_path = os.path.join(temp_dir, "signs.csv")
+            with open(input_path, "w", encoding="utf-8") as input_file:
+                input_file.write("Name,Birth_Date\nAda,10-12\nAlan,23-06\nBad,99-99\n")
+            rows, invalid_rows, _ = zodiac_sign.classify_birthdates_file(
+                input_path, output_path, lookup, 2, "Name", "Birth_Date"
+            )
+            with open(output_path, encoding="utf-8") as output_file:
+                lines = output_file.read().splitlines()
+        self.assertEqual((rows, invalid_rows), (3, 1))
+        self.assertEqual(lines, ["Name,Birth_Date,Zodiac_Sign", "Ada,10-12,Sagittarius", "Alan,23-06,Cancer", "Bad,99-99,"])
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_parquet_output_in_several_chunks(self):
+        import pyarrow.parquet as pq
+
+        lookup = zodiac_sign.ZodiacLookup(zodiac_sign.load_zodiac_signs_dataset())
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, "people.csv")
+            output_path = os.path.join(temp_dir, "signs.parquet")
+            with open(input_path, "w", encoding="utf-8") as input_file:
+                input_file.write("Name,Birth_Date\nAda,10-12\nAlan,23-06\nBad,99-99\nGrace,09-12\nLinus,28-12\n")
+            rows, invalid_rows, _ = zodiac_sign.classify_birthdates_file(
+                input_path, output_path, lookup, 2, "Name", "Birth_Date"
+            )
+            table = pq.read_table(output_path).to_pydict()
+        self.assertEqual((rows, invalid_rows), (5, 1))
+        self.assertEqual(table["Name"], ["Ada", "Alan", "Bad", "Grace", "Linus"])
+        self.assertEqual(table["Zodiac_Sign"], ["Sagittarius", "Cancer", None, "Sagittarius", "Capricorn"])
+
+
+if __name__ == "__main__":
+    unittest.main()